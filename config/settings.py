@@ -37,15 +37,50 @@ class Settings:
     UAP_UAI_FOCUSED_PASS_INTERVAL: int = 2
     UAP_UAI_FOCUSED_PASS_CONF: float = 0.12
     UAP_UAI_FOCUSED_PASS_IMG_SIZE: int = 1280
+    UAP_UAI_FOCUSED_PASS_SHARED_FORWARD: bool = True  # imgsz eşitse odaklı geçiş primary forward'dan bölünür
     UAP_UAI_RESCUE_ENABLED: bool = True
     UAP_UAI_RESCUE_ABSENT_STREAK: int = 2
     UAP_UAI_RESCUE_MIN_CONF: float = 0.16
+    # Çok çözünürlüklü kaskad: ucuz geçiş + yalnızca sinyal varsa pahalı geçişe yükseltme
+    CASCADE_ENABLED: bool = False
+    CASCADE_CHEAP_IMG_SIZE: int = 640
+    CASCADE_CANDIDATE_CONF: float = 0.10  # Ucuz geçişte aday toplamak için tahmin eşiği
+    CASCADE_LOW_CONF_MIN_COUNT: int = 2  # [CANDIDATE_CONF, conf) aralığında bu kadar aday → tam geçiş
+    CASCADE_SMALL_BOX_FACTOR: float = 3.0  # Kısa kenar < MIN_BBOX_SIZE_FLOOR * faktör → küçük kutu
+    CASCADE_SMALL_BOX_MIN_COUNT: int = 3  # Bu kadar küçük kutu → SAHI (kapalıysa tam geçiş)
+    CASCADE_UAP_UAI_ABSENT_STREAK: int = 2  # UAP/UAİ yokluk serisi bu değere ulaşınca odaklı geçiş
     UAP_UAI_CONFLICT_IOU_THRESHOLD: float = 0.55
     UAP_UAI_CONFLICT_MIN_CONF_GAP: float = 0.12
     UAP_UAI_CONFLICT_MIN_AREA_RATIO: float = 1.30
     NMS_IOU_THRESHOLD: float = 0.15  # Çakışan kutuları bastırma eşiği
-    NMS_MODE: str = "class_aware"  # class_aware|agnostic|hybrid
+    NMS_MODE: str = "class_aware"  # class_aware|agnostic|hybrid|wbf
     HYBRID_NMS_IOU_THRESHOLD: float = 0.65
+    WBF_IOU_THRESHOLD: float = 0.55  # NMS_MODE="wbf": aynı kümeye giren kutular için IoU eşiği
+    NMS_BACKEND: str = "numpy"  # greedy|numpy|torchvision (post-process merge NMS)
+    NMS_VERIFY_BACKEND: bool = False  # Her çağrıda greedy referansla birebir karşılaştır (debug)
+    NMS_MATRIX_MAX_BOXES: int = 2048  # numpy backend N² matris sınırı; üstünde greedy'e düşer
+    INFERENCE_BACKEND: str = "ultralytics"  # ultralytics|direct|onnx (direct: nn.Module forward + kendi letterbox, onnx: ORT CPU)
+    INFERENCE_BACKEND_VERIFY_INTERVAL: int = 0  # Her N çağrıda bir predict() referansıyla karşılaştır (0=kapalı)
+    INFERENCE_BACKEND_VERIFY_TOL_PX: float = 1.0
+    INFERENCE_BACKEND_VERIFY_TOL_CONF: float = 0.01
+    # ONNX Runtime CPU backend (INFERENCE_BACKEND="onnx")
+    ONNX_CACHE_DIR: str = os.path.join(str(PROJECT_ROOT), "model", "onnx_cache")
+    ONNX_AUTO_EXPORT: bool = True  # Önbellekte yoksa ilk kullanımda export et
+    ONNX_EXPORT_OPSET: Optional[int] = None  # None = ultralytics varsayılanı
+    ONNX_EXPORT_SIMPLIFY: bool = True
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 = NON_CUDA_CPU_THREADS
+    ONNX_INTER_OP_THREADS: int = 1
+    ONNX_GRAPH_OPTIMIZATION: str = "all"  # disable|basic|extended|all
+    ONNX_LIGHT_PROFILE_INFERENCE_SIZE: int = 640  # CPU light profile'da NON_CUDA_LIGHT_PROFILE_INFERENCE_SIZE yerine
+    ONNX_PRECISION: str = "fp32"  # fp32|int8 (int8: tools/quantize_int8.py çıktısı, yoksa fp32'ye düşer)
+    ONNX_LIGHT_PROFILE_PRECISION: str = "fp32"  # light runtime profile'da kullanılacak hassasiyet
+    # INT8 post-training quantization (tools/quantize_int8.py)
+    INT8_CALIBRATION_FRAMES: int = 64
+    INT8_EVAL_FRAMES: int = 32
+    INT8_FRAME_STRIDE: int = 10  # Sekans içinde her N karede bir örnek (kalibrasyon/değerlendirme ayrık)
+    INT8_CALIBRATION_METHOD: str = "minmax"  # minmax|entropy|percentile
+    INT8_PER_CHANNEL: bool = True
+    INT8_EXCLUDE_NODE_PREFIXES: tuple = ("/model.22/",)  # Detect head FP32 kalır (kutu regresyonu hassas)
     DEVICE: str = "auto"  # auto|cuda|mps|cpu
     HALF_PRECISION: bool = True
     INFERENCE_SIZE: int = 1280
@@ -53,11 +88,20 @@ class Settings:
     MAX_DETECTIONS: int = 300
     AUGMENTED_INFERENCE: bool = False
     PIPELINE_STAGE_METRICS_ENABLED: bool = True
+    # Aşama başı süre (ön-işleme, her forward, her SAHI tile'ı, post-process aşamaları).
+    # Sayım metriklerinden ayrıdır ve non-CUDA'da da açık kalır (kare başı birkaç perf_counter).
+    PIPELINE_STAGE_TIMING_ENABLED: bool = True
+    PIPELINE_STAGE_TIMING_WINDOW: int = 1000  # p50/p95/p99 için aşama başı son N örnek
 
     # Ön-işleme (CLAHE)
     CLAHE_ENABLED: bool = True
     CLAHE_CLIP_LIMIT: float = 2.0
     CLAHE_TILE_SIZE: int = 8
+    # Ön-işleme model çözünürlüğünde: kare önce INFERENCE_SIZE'a küçültülür, CLAHE + keskinleştirme
+    # küçük görüntüde (SAHI tile'larında tile çözünürlüğünde) yapılır
+    PREPROCESS_AT_INFERENCE_RES: bool = False
+    PREPROCESS_THUMBNAIL_SIZE: int = 160  # Termal/parlaklık kararı için önizleme uzun kenarı
+    PREPROCESS_MODE_RECHECK_INTERVAL: int = 30  # Termal/RGB kararı her N karede yeniden kontrol edilir
     MIN_BBOX_SIZE: int = 20
     MIN_BBOX_SIZE_FLOOR: int = 8  # Yüksek irtifada min_size bu değerin altına düşmez
     CLASS_ADAPTIVE_FILTERS: dict = {
@@ -90,6 +134,35 @@ class Settings:
     SAHI_SLICE_SIZE: int = 640
     SAHI_OVERLAP_RATIO: float = 0.35
     SAHI_MERGE_IOU: float = 0.25
+    SAHI_BATCHED_INFERENCE: bool = True  # Tüm tile'lar tek predict çağrısında (batch) çalışır
+    SAHI_MAX_BATCH_SIZE: int = 8  # Tek forward'a giren maksimum tile sayısı (VRAM sınırı)
+    SAHI_BATCH_INCLUDE_FULL_FRAME: bool = False  # imgsz == SAHI_SLICE_SIZE ise full-frame pass de aynı batch'e girer
+    # İrtifa planı: translation_z / VO irtifasına göre kare başı imgsz + SAHI + tile boyutu/örtüşme
+    ALTITUDE_PLAN_ENABLED: bool = False
+    # (max_irtifa_m, imgsz, sahi, slice_size, overlap) — artan irtifa; son satır üst sınırsız
+    ALTITUDE_PLAN_TABLE: tuple = (
+        (25.0, 640, False, 640, 0.25),
+        (45.0, 960, False, 640, 0.30),
+        (90.0, 1280, True, 640, 0.35),
+        (1e9, 1280, True, 512, 0.35),
+    )
+    ALTITUDE_PLAN_HYSTERESIS_M: float = 3.0  # Satır sınırında plan sıçramasını önler
+    # Adaptif SAHI: full-frame sonucuna göre yalnızca belirsiz bölgelerdeki tile'lar çalışır
+    SAHI_ADAPTIVE_ENABLED: bool = False
+    SAHI_ADAPTIVE_SMALL_BOX_PX: int = 48  # max(w, h) bu değerin altındaki kutu → "küçük nesne" kanıtı
+    SAHI_ADAPTIVE_LOW_CONF: float = 0.45  # Bu güvenin altındaki kutu → "belirsiz" kanıtı
+    SAHI_ADAPTIVE_TEXTURE_MIN: float = 6.0  # Küçültülmüş gri görüntüde ortalama |Laplacian|; altı = boş zemin
+    SAHI_ADAPTIVE_TEXTURE_SCALE: float = 0.125  # Doku ölçümü için küçültme oranı
+    SAHI_ADAPTIVE_ABSENT_STREAK: int = 3  # UAP/UAİ bu kadar karedir yoksa tüm tile'lar çalışır
+    SAHI_ADAPTIVE_FULL_REFRESH_INTERVAL: int = 15  # Her N karede bir tam grid (kör nokta önlemi, 0=kapalı)
+    SAHI_ADAPTIVE_MAX_TILES: int = 0  # Kare başına tile bütçesi (0=sınırsız)
+    # Zamansal tile tekrar kullanımı: değişmeyen tile'ların tespitleri kamera kaymasıyla taşınır
+    SAHI_TILE_REUSE_ENABLED: bool = False
+    SAHI_TILE_REUSE_DIFF_THRESHOLD: float = 3.0  # Hizalanmış ortalama gri fark; altı = değişmemiş tile
+    SAHI_TILE_REUSE_SCALE: float = 0.25  # Değişim/kayma ölçümü için küçültme oranı
+    SAHI_TILE_REUSE_REFRESH_INTERVAL: int = 10  # Her N karede tüm tile'lar yeniden çalışır (bayatlık sınırı)
+    SAHI_TILE_REUSE_MAX_SHIFT_PX: float = 64.0  # Daha büyük kamera kaymasında tekrar kullanım yapılmaz
+    SAHI_TILE_REUSE_MIN_RESPONSE: float = 0.05  # phaseCorrelate güveni; altında kayma 0 kabul edilir
 
     WARMUP_ITERATIONS: int = 3
 
@@ -162,6 +235,11 @@ class Settings:
     EDGE_MARGIN_RATIO: float = 0.004  # UAP/UAİ kadraj kenarına değiyorsa → uygun değil
     UNKNOWN_OBJECTS_AS_OBSTACLES: bool = True
     UAP_CV_VERIFICATION: bool = False  # UAP/UAİ Hough daire doğrulaması
+    UAP_CV_VERIFICATION_MAX_SIDE: int = 128  # Hough kırpıntısı bu uzun kenara küçültülür
+    UAP_CV_VERIFICATION_REFRESH_FRAMES: int = 15  # İzlenen alanın önbellekli sonucu N karede bir yenilenir
+    UAP_CV_VERIFICATION_MATCH_IOU: float = 0.5  # Önceki karedeki alanla eşleşme IoU eşiği
+    LANDING_OBSTACLE_GRID_MIN: int = 1024  # Engel sayısı bunu aşarsa grid bucket indeksi kullanılır
+    LANDING_OBSTACLE_GRID_CELL_PX: int = 128
 
     LANDING_ZONE_CONTAINMENT_IOU: float = 0.70
 
@@ -251,9 +329,50 @@ class Settings:
     PROTECTIVE_INFERENCE_SIZE: int = 960
     PROTECTIVE_MAX_DETECTIONS: int = 180
     PROTECTIVE_CONFIDENCE_THRESHOLD: float = 0.50
-    PROTECTIVE_LOG_INTERVAL: int = 25
+    PROTECTIVE_LOG_INTERVAL: int = 25  # Kullanılmıyor; düşük FPS'te DYNAMIC_JSON_LOG_SLOW_INTERVAL geçerli
     PROTECTIVE_DEGRADE_SEND_INTERVAL_FRAMES: int = 8
     PROTECTIVE_DISABLE_SAHI: bool = True
+    # Gecikme bütçesi kontrolcüsü (LOW_FPS_GUARD_ENABLED ile açılır): kare başı değişmez plan,
+    # Settings'e yazmaz. Bütçe 0 ise 1000 / LOW_FPS_GUARD_THRESHOLD ms; üst seviyeye çıkış
+    # LOW_FPS_GUARD_RECOVERY_THRESHOLD'a karşılık gelen bütçeye sığınca (RECOVERY_STREAK kare).
+    LATENCY_FRAME_BUDGET_MS: float = 0.0
+    LATENCY_MODEL_EMA_ALPHA: float = 0.2
+    LATENCY_DOWNGRADE_STREAK: int = 2  # Tahmin bu kadar ardışık kare bütçeyi aşınca bir seviye düş
+    LATENCY_MIN_DWELL_FRAMES: int = 5  # Seviye değişiminden sonra yeni karar için min. kare
+    LATENCY_MODEL_STALE_FRAMES: int = 30  # Başka seviyenin eski ölçümüne güven bu kadar karede e-kat azalır
+    # Gecikme tablosu (tools/calibrate_latency.py): makine + model anahtarlı ölçümler light profile
+    # seçimini ve kontrolcü seviyelerini LIGHT_PROFILE_* / PROTECTIVE_* sabitleri yerine belirler
+    LATENCY_TABLE_ENABLED: bool = False
+    LATENCY_TABLE_DIR: str = os.path.join(str(PROJECT_ROOT), "model", "latency_tables")
+    LATENCY_TABLE_DETECT_SHARE: float = 0.8  # Kare bütçesinin tespite ayrılan payı (p90 ile karşılaştırılır)
+    LATENCY_TABLE_CALIBRATE_ON_STARTUP: bool = False  # Tablo yoksa yarışma oturumundan önce ölç
+    LATENCY_CALIBRATION_SIZES: tuple = (512, 640, 960, 1280)
+    LATENCY_CALIBRATION_THREADS: tuple = ()  # Boş = NON_CUDA_CPU_THREADS (araç --threads ile genişletir)
+    LATENCY_CALIBRATION_FRAMES: int = 8
+    # En kaliteliden en ucuza; eksik anahtar = profil değeri (imgsz/max_det üst sınır, conf alt sınır)
+    LATENCY_QUALITY_LEVELS: tuple = (
+        {"name": "full"},
+        {"name": "no_augment", "augment": False},
+        {"name": "no_sahi", "augment": False, "sahi_enabled": not PROTECTIVE_DISABLE_SAHI},
+        {
+            "name": "protective",
+            "augment": False,
+            "sahi_enabled": not PROTECTIVE_DISABLE_SAHI,
+            "imgsz": PROTECTIVE_INFERENCE_SIZE,
+            "max_det": PROTECTIVE_MAX_DETECTIONS,
+            "conf_floor": PROTECTIVE_CONFIDENCE_THRESHOLD,
+            "degrade_send_interval": PROTECTIVE_DEGRADE_SEND_INTERVAL_FRAMES,
+        },
+        {
+            "name": "minimal",
+            "augment": False,
+            "sahi_enabled": False,
+            "imgsz": 640,
+            "max_det": 120,
+            "conf_floor": PROTECTIVE_CONFIDENCE_THRESHOLD,
+            "degrade_send_interval": 12,
+        },
+    )
     LIGHT_PROFILE_INFERENCE_SIZE: int = 960
     LIGHT_PROFILE_MAX_DETECTIONS: int = 180
     LIGHT_PROFILE_CONFIDENCE_THRESHOLD: float = 0.50
@@ -288,6 +407,19 @@ class Settings:
     MOVEMENT_ADAPTIVE_PAN_PX: float = 15.0  # Ortalama kamera kayması/frame bu değeri aşarsa eşik artar
     MOVEMENT_ADAPTIVE_PAN_FACTOR: float = 1.35  # Büyük pan/tilt'ta eşik çarpanı (1.2–1.5)
     FROZEN_FRAME_DIFF_THRESHOLD: float = 1.0
+    # Keyframe zamanlayıcısı: tam tespit her N karede, ara kareler optik akışla taşınır
+    KEYFRAME_ENABLED: bool = False
+    KEYFRAME_MAX_INTERVAL: int = 4  # Ardışık iki keyframe arası en fazla kare
+    KEYFRAME_LATENCY_BUDGET_MS: float = 0.0  # Kare başı ortalama bütçe; 0 = aralık sabit (MAX_INTERVAL)
+    KEYFRAME_EMA_ALPHA: float = 0.2
+    KEYFRAME_FLOW_SCALE: float = 0.5  # Akış için gri görüntü ölçeği
+    KEYFRAME_MIN_INLIERS: int = 12  # Homografi RANSAC inlier alt sınırı (altı → keyframe)
+    KEYFRAME_SCENE_CHANGE_DIFF: float = 18.0  # Hizalama sonrası ortalama gri farkı (üstü → keyframe)
+    KEYFRAME_POINTS_PER_TRACK: int = 8
+    KEYFRAME_TRACK_MIN_POINTS: int = 3
+    KEYFRAME_TRACK_MIN_CONFIDENCE: float = 0.5  # İz başına geçerli nokta oranı
+    KEYFRAME_LOW_CONFIDENCE_RATIO: float = 0.25  # Düşük güvenli iz oranı (üstü → keyframe)
+    KEYFRAME_UAP_UAI_MIN_CONF: float = 0.35  # Altındaki UAP/UAİ taşınmaz, keyframe zorlanır
     MOTION_COMP_ENABLED: bool = True
     MOTION_COMP_MIN_FEATURES: int = 40
     MOTION_COMP_MAX_CORNERS: int = 200
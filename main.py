@@ -112,7 +112,7 @@ def run_simulation(
             log.error("Dataset loading failed, exiting.")
             return
 
-        detector = ObjectDetector()
+        detector = _wrap_keyframe_scheduler(ObjectDetector())
         odometry = VisualOdometry()
         movement = MovementEstimator()
         fps_counter = FPSCounter(report_interval=Settings.FPS_REPORT_INTERVAL)
@@ -222,6 +222,8 @@ def _process_simulation_step(
         frame,
         runtime_profile=detect_profile,
         altitude=current_z,
+        frame_ctx=frame_ctx,
+        frame_index=frame_idx,
     )
     detected_objects = movement.annotate(detected_objects, frame_ctx=frame_ctx)
 
@@ -490,6 +492,41 @@ def _rolling_fps_from_durations(frame_cycle_window: deque) -> float:
     return float(len(frame_cycle_window)) / float(total)
 
 
+def _wrap_keyframe_scheduler(detector: Any) -> Any:
+    """KEYFRAME_ENABLED ise detector'ü keyframe/taşıma zamanlayıcısıyla sarar."""
+    if not bool(getattr(Settings, "KEYFRAME_ENABLED", False)):
+        return detector
+    from src.keyframe import KeyframeScheduler
+
+    log = Logger("Main")
+    log.info(
+        "Keyframe scheduling active "
+        f"(max_interval={Settings.KEYFRAME_MAX_INTERVAL}, "
+        f"budget_ms={Settings.KEYFRAME_LATENCY_BUDGET_MS})"
+    )
+    return KeyframeScheduler(detector)
+
+
+def _detection_altitude(frame_data: Dict[str, Any], odometry: Any) -> Optional[float]:
+    """Tespit planı için irtifa: geçerli sunucu translation_z, yoksa son VO z.
+
+    Plan kapalıyken None döner; aksi halde _post_filter boyut eşiklerini
+    irtifaya göre ölçeklerdi ve varsayılan davranış değişirdi.
+    """
+    if not bool(getattr(Settings, "ALTITUDE_PLAN_ENABLED", False)):
+        return None
+    try:
+        altitude = float(frame_data.get("translation_z"))
+        if np.isfinite(altitude) and altitude > 0.0:
+            return altitude
+    except (TypeError, ValueError, AttributeError):
+        pass
+    try:
+        return float(odometry.get_position()["z"])
+    except Exception:
+        return None
+
+
 def _accumulate_detection_pipeline_metrics(
     kpi_counters: Dict[str, Any],
     detector: Any,
@@ -526,6 +563,34 @@ def _accumulate_detection_pipeline_metrics(
         int(metrics.get("uap_uai_absent_streak_max", 0)),
     )
 
+    for key in ("sahi_tiles_total", "sahi_tiles_run", "sahi_tiles_reused", "sahi_tiles_skipped"):
+        kpi_counters[key] = int(kpi_counters.get(key, 0)) + int(metrics.get(key, 0))
+
+    if "keyframe" in metrics:
+        key = "keyframe_frames" if metrics.get("keyframe") else "propagated_frames"
+        kpi_counters[key] = int(kpi_counters.get(key, 0)) + 1
+        reasons = kpi_counters.get("keyframe_reasons", {}) or {}
+        reason = str(metrics.get("keyframe_reason", ""))
+        if metrics.get("keyframe") and reason:
+            reasons[reason] = int(reasons.get(reason, 0)) + 1
+        kpi_counters["keyframe_reasons"] = reasons
+
+    if "cascade_escalated" in metrics:
+        kpi_counters["cascade_frames"] = int(kpi_counters.get("cascade_frames", 0)) + 1
+        escalations = kpi_counters.get("cascade_escalations", {}) or {}
+        for target in metrics.get("cascade_targets", []) or []:
+            escalations[str(target)] = int(escalations.get(str(target), 0)) + 1
+        kpi_counters["cascade_escalations"] = escalations
+
+    stage_timings = metrics.get("stage_timings") or ()
+    if stage_timings:
+        window = kpi_counters.get("stage_latency_window")
+        if window is None:
+            from src.stage_graph import StageLatencyWindow
+
+            window = kpi_counters["stage_latency_window"] = StageLatencyWindow()
+        window.add_many(stage_timings)
+
     incoming_drop = metrics.get("uap_uai_drop_by_stage", {}) or {}
     aggregated_drop = kpi_counters.get("uap_uai_drop_by_stage", {}) or {}
     if not isinstance(aggregated_drop, dict):
@@ -563,102 +628,88 @@ def _update_dynamic_json_log_interval(
     kpi_counters["json_log_interval"] = int(Settings.JSON_LOG_EVERY_N_FRAMES)
 
 
-def _maybe_toggle_low_fps_guard(
-    log: Logger,
-    rolling_fps: float,
-    guard_state: Dict[str, Any],
-    kpi_counters: Dict[str, Any],
-) -> None:
-    if not bool(getattr(Settings, "LOW_FPS_GUARD_ENABLED", True)):
+def _ensure_latency_table(log: Logger, detector: Any) -> None:
+    """LATENCY_TABLE_CALIBRATE_ON_STARTUP: bu makine + model için tablo yoksa oturumdan önce ölç."""
+    if not bool(getattr(Settings, "LATENCY_TABLE_ENABLED", False)):
         return
+    if not bool(getattr(Settings, "LATENCY_TABLE_CALIBRATE_ON_STARTUP", False)):
+        return
+    from src.latency_table import calibrate_and_save, load_latency_table
 
-    active = bool(guard_state.get("active", False))
-    low_threshold = float(getattr(Settings, "LOW_FPS_GUARD_THRESHOLD", 1.0))
-    recover_threshold = float(getattr(Settings, "LOW_FPS_GUARD_RECOVERY_THRESHOLD", 1.4))
-    recover_streak_needed = max(
-        1, int(getattr(Settings, "LOW_FPS_GUARD_RECOVERY_STREAK", 12))
-    )
+    if load_latency_table() is not None:
+        return
+    # KeyframeScheduler sarmalayıcısı yazmaları iç detektöre iletmez ve ölçüme taşıma
+    # süresini katar; tarama doğrudan ObjectDetector üzerinde çalışmalı.
+    detector = getattr(detector, "_detector", detector)
+    log.info("Gecikme tablosu bulunamadı; başlangıç kalibrasyonu çalışıyor...")
+    try:
+        path = calibrate_and_save(detector)
+    except Exception as exc:
+        log.warn(f"Başlangıç gecikme kalibrasyonu başarısız (sabit profiller kullanılacak): {exc}")
+        return
+    if path is None:
+        return
+    log.success(f"Gecikme tablosu yazıldı: {path}")
+    if getattr(detector, "device", "cuda") != "cuda":
+        detector._apply_latency_table_threads()
 
-    if not active and rolling_fps > 0.0 and rolling_fps < low_threshold:
-        guard_state["active"] = True
-        guard_state["recovery_streak"] = 0
 
-        Settings.SAHI_ENABLED = not bool(getattr(Settings, "PROTECTIVE_DISABLE_SAHI", True))
-        Settings.INFERENCE_SIZE = min(
-            int(Settings.INFERENCE_SIZE),
-            max(256, int(getattr(Settings, "PROTECTIVE_INFERENCE_SIZE", 960))),
-        )
-        Settings.MAX_DETECTIONS = min(
-            int(Settings.MAX_DETECTIONS),
-            max(1, int(getattr(Settings, "PROTECTIVE_MAX_DETECTIONS", 180))),
-        )
-        Settings.CONFIDENCE_THRESHOLD = max(
-            float(Settings.CONFIDENCE_THRESHOLD),
-            float(getattr(Settings, "PROTECTIVE_CONFIDENCE_THRESHOLD", 0.50)),
-        )
-        severe_fps_threshold = float(
-            getattr(Settings, "LOW_FPS_GUARD_UAP_UAI_CONF_TRIGGER", 0.60)
-        )
-        if rolling_fps < severe_fps_threshold:
-            protective_uap_uai_conf = getattr(
-                Settings, "PROTECTIVE_UAP_UAI_CONFIDENCE_THRESHOLD", None
-            )
-            if (
-                protective_uap_uai_conf is not None
-                and getattr(Settings, "CONFIDENCE_THRESHOLD_UAP_UAI", None) is not None
-            ):
-                Settings.CONFIDENCE_THRESHOLD_UAP_UAI = max(
-                    float(Settings.CONFIDENCE_THRESHOLD_UAP_UAI),
-                    float(protective_uap_uai_conf),
-                )
-        Settings.AUGMENTED_INFERENCE = False
-        Settings.DEGRADE_SEND_INTERVAL_FRAMES = max(
-            int(Settings.DEGRADE_SEND_INTERVAL_FRAMES),
-            max(1, int(getattr(Settings, "PROTECTIVE_DEGRADE_SEND_INTERVAL_FRAMES", 8))),
-        )
-        Settings.JSON_LOG_EVERY_N_FRAMES = max(
-            int(Settings.JSON_LOG_EVERY_N_FRAMES),
-            max(1, int(getattr(Settings, "PROTECTIVE_LOG_INTERVAL", 25))),
-        )
+def _create_latency_controller(detector: Any = None) -> Any:
+    """LOW_FPS_GUARD_ENABLED ise kare başı plan üreten gecikme kontrolcüsü, değilse None.
 
-        kpi_counters["fps_guard_activations"] = (
-            int(kpi_counters.get("fps_guard_activations", 0)) + 1
-        )
-        log.warn(
-            f"event=fps_guard_activated rolling_fps={rolling_fps:.2f} "
-            f"sahi={'on' if Settings.SAHI_ENABLED else 'off'} "
-            f"imgsz={Settings.INFERENCE_SIZE} max_det={Settings.MAX_DETECTIONS}"
-        )
-        return
+    Bu makine için gecikme tablosu varsa seviyeler tablodan, yoksa LATENCY_QUALITY_LEVELS'tan.
+    """
+    if not bool(getattr(Settings, "LOW_FPS_GUARD_ENABLED", True)):
+        return None
+    from src.latency_control import LatencyController, session_quality_levels
 
-    if not active:
-        return
+    levels = None
+    if detector is not None and hasattr(detector, "_latency_table_filters"):
+        levels = session_quality_levels(detector._latency_table_filters())
+    return LatencyController(levels=levels)
 
-    if rolling_fps >= recover_threshold:
-        guard_state["recovery_streak"] = int(guard_state.get("recovery_streak", 0)) + 1
-    else:
-        guard_state["recovery_streak"] = 0
 
-    if int(guard_state["recovery_streak"]) < recover_streak_needed:
+def _update_latency_controller(
+    log: Logger,
+    controller: Any,
+    success_info: Dict[str, Any],
+    cycle_sec: float,
+    kpi_counters: Dict[str, Any],
+) -> None:
+    """Tamamlanan karenin gecikmesini kontrolcüye işler; seviye geçişlerini loglar.
+
+    Settings'e yazılmaz: yeni seviye yalnızca sonraki fetch'e verilen plana yansır.
+    """
+    plan = success_info.get("runtime_plan")
+    if controller is None or plan is None:
+        return
+    previous = controller.current_plan()
+    previous_ms = controller.predict_ms(previous.level)
+    event = controller.observe(plan, cycle_sec * 1000.0, success_info.get("detect_ms"))
+    kpi_counters["latency_level"] = controller.current_plan().name
+    if event is None:
         return
 
-    guard_state["active"] = False
-    guard_state["recovery_streak"] = 0
-    Settings.SAHI_ENABLED = bool(guard_state["orig_sahi"])
-    Settings.INFERENCE_SIZE = int(guard_state["orig_inference_size"])
-    Settings.MAX_DETECTIONS = int(guard_state["orig_max_det"])
-    Settings.CONFIDENCE_THRESHOLD = float(guard_state["orig_conf"])
-    if "orig_uap_uai_conf" in guard_state:
-        Settings.CONFIDENCE_THRESHOLD_UAP_UAI = guard_state.get("orig_uap_uai_conf")
-    Settings.AUGMENTED_INFERENCE = bool(
-        guard_state.get("orig_augmented", Settings.AUGMENTED_INFERENCE)
-    )
-    Settings.JSON_LOG_EVERY_N_FRAMES = int(guard_state["orig_json_interval"])
-    Settings.DEGRADE_SEND_INTERVAL_FRAMES = int(guard_state["orig_degrade_interval"])
-    kpi_counters["fps_guard_recoveries"] = (
-        int(kpi_counters.get("fps_guard_recoveries", 0)) + 1
+    current = controller.current_plan()
+    kpi_counters["latency_level_changes"] = int(kpi_counters.get("latency_level_changes", 0)) + 1
+    predicted = "n/a" if previous_ms is None else f"{previous_ms:.0f}"
+    if event == "down" and previous.level == 0:
+        kpi_counters["fps_guard_activations"] = (
+            int(kpi_counters.get("fps_guard_activations", 0)) + 1
+        )
+    if event == "up" and current.level == 0:
+        kpi_counters["fps_guard_recoveries"] = (
+            int(kpi_counters.get("fps_guard_recoveries", 0)) + 1
+        )
+    message = (
+        f"event=latency_level_{event} old={previous.name} new={current.name} "
+        f"cycle_ms={cycle_sec * 1000.0:.0f} predicted_old_ms={predicted} "
+        f"budget_ms={controller.budget_ms:.0f}"
     )
-    log.info(f"event=fps_guard_recovered rolling_fps={rolling_fps:.2f}")
+    if event == "down":
+        log.warn(message)
+    else:
+        log.info(message)
 
 
 def _run_periodic_gpu_maintenance(
@@ -698,7 +749,7 @@ def run_competition(log: Logger) -> None:
 
     try:
         network = NetworkManager(simulation_mode=False)
-        detector = ObjectDetector()
+        detector = _wrap_keyframe_scheduler(ObjectDetector())
         odometry = VisualOdometry()
         movement = MovementEstimator()
         fps_counter = FPSCounter(report_interval=Settings.FPS_REPORT_INTERVAL)
@@ -715,6 +766,7 @@ def run_competition(log: Logger) -> None:
                 )
 
         visualizer: Optional[Visualizer] = Visualizer() if Settings.DEBUG else None
+        _ensure_latency_table(log, detector)
 
         log.success("All modules initialized successfully")
 
@@ -807,18 +859,8 @@ def run_competition(log: Logger) -> None:
     frame_cycle_window: deque = deque(
         maxlen=max(5, int(getattr(Settings, "LOW_FPS_GUARD_WINDOW", 20)))
     )
-    low_fps_guard_state: Dict[str, Any] = {
-        "active": False,
-        "recovery_streak": 0,
-        "orig_sahi": bool(Settings.SAHI_ENABLED),
-        "orig_inference_size": int(Settings.INFERENCE_SIZE),
-        "orig_max_det": int(Settings.MAX_DETECTIONS),
-        "orig_conf": float(Settings.CONFIDENCE_THRESHOLD),
-        "orig_uap_uai_conf": getattr(Settings, "CONFIDENCE_THRESHOLD_UAP_UAI", None),
-        "orig_augmented": bool(Settings.AUGMENTED_INFERENCE),
-        "orig_json_interval": int(Settings.JSON_LOG_EVERY_N_FRAMES),
-        "orig_degrade_interval": int(Settings.DEGRADE_SEND_INTERVAL_FRAMES),
-    }
+    latency_controller = _create_latency_controller(detector)
+    orig_json_interval = int(Settings.JSON_LOG_EVERY_N_FRAMES)
 
     valid_transitions = {
         FrameLifecycleState.IDLE: {
@@ -886,6 +928,7 @@ def run_competition(log: Logger) -> None:
         "degrade_replayed_detection_frames": 0,
         "degrade_empty_payload_count": 0,
         "frame_duplicate_drop": 0,
+        "frames_fetched": 0,
         "timeout_fetch": 0,
         "timeout_image": 0,
         "timeout_submit": 0,
@@ -911,8 +954,18 @@ def run_competition(log: Logger) -> None:
         "uap_uai_final_seen": 0,
         "uap_uai_drop_total": 0,
         "uap_uai_drop_by_stage": {},
+        "stage_latency_ms": {},
         "uap_uai_absent_streak_max": 0,
         "uap_uai_missing_landing_status_count": 0,
+        "sahi_tiles_total": 0,
+        "sahi_tiles_run": 0,
+        "sahi_tiles_reused": 0,
+        "sahi_tiles_skipped": 0,
+        "keyframe_frames": 0,
+        "propagated_frames": 0,
+        "keyframe_reasons": {},
+        "cascade_frames": 0,
+        "cascade_escalations": {},
         "reference_validation_stats": reference_validation_stats,
         "id_integrity_mode": id_integrity_mode,
         "id_integrity_reason_code": id_integrity_reason_code,
@@ -1061,10 +1114,11 @@ def run_competition(log: Logger) -> None:
                             rolling_fps=rolling_fps,
                             kpi_counters=kpi_counters,
                         )
-                        _maybe_toggle_low_fps_guard(
+                        _update_latency_controller(
                             log=log,
-                            rolling_fps=rolling_fps,
-                            guard_state=low_fps_guard_state,
+                            controller=latency_controller,
+                            success_info=success_info,
+                            cycle_sec=cycle_sec,
                             kpi_counters=kpi_counters,
                         )
 
@@ -1119,6 +1173,11 @@ def run_competition(log: Logger) -> None:
                             transient_budget,
                             degrade_replay_state,
                             degrade_fallback_window,
+                            (
+                                latency_controller.current_plan()
+                                if latency_controller is not None
+                                else None
+                            ),
                         )
 
                     if fetch_future.done():
@@ -1245,6 +1304,10 @@ def run_competition(log: Logger) -> None:
             cv2.destroyAllWindows()
             cv2.waitKey(1)
 
+        if latency_controller is not None:
+            kpi_counters["latency_time_at_level"] = latency_controller.time_at_level()
+        if hasattr(detector, "get_warmup_report"):
+            kpi_counters["warmup"] = detector.get_warmup_report()
         _print_summary(
             log,
             fps_counter,
@@ -1257,19 +1320,7 @@ def run_competition(log: Logger) -> None:
                 "transient_wall_time_sec": resilience_stats.transient_wall_time_sec,
             },
         )
-        Settings.SAHI_ENABLED = bool(low_fps_guard_state["orig_sahi"])
-        Settings.INFERENCE_SIZE = int(low_fps_guard_state["orig_inference_size"])
-        Settings.MAX_DETECTIONS = int(low_fps_guard_state["orig_max_det"])
-        Settings.CONFIDENCE_THRESHOLD = float(low_fps_guard_state["orig_conf"])
-        if "orig_uap_uai_conf" in low_fps_guard_state:
-            Settings.CONFIDENCE_THRESHOLD_UAP_UAI = low_fps_guard_state.get(
-                "orig_uap_uai_conf"
-            )
-        Settings.AUGMENTED_INFERENCE = bool(low_fps_guard_state["orig_augmented"])
-        Settings.JSON_LOG_EVERY_N_FRAMES = int(low_fps_guard_state["orig_json_interval"])
-        Settings.DEGRADE_SEND_INTERVAL_FRAMES = int(
-            low_fps_guard_state["orig_degrade_interval"]
-        )
+        Settings.JSON_LOG_EVERY_N_FRAMES = orig_json_interval
 
 
 def _print_competition_result(
@@ -1325,6 +1376,11 @@ def _print_summary(
         return f"{val:.0f}" if isinstance(val, (float, int)) else str(val)
 
     if kpi_counters is not None:
+        # The live percentile window is not JSON-serializable; fold it into
+        # plain stats before the counters are logged and written to disk.
+        stage_window = kpi_counters.pop("stage_latency_window", None)
+        if stage_window is not None:
+            kpi_counters["stage_latency_ms"] = stage_window.percentiles()
         log.info(
             "KPI: "
             f"Send OK={kpi_counters.get('send_ok', 0)} | "
@@ -1347,6 +1403,8 @@ def _print_summary(
             f"FPSGuard(A/R)="
             f"{kpi_counters.get('fps_guard_activations', 0)}/"
             f"{kpi_counters.get('fps_guard_recoveries', 0)} | "
+            f"LatencyLevel={kpi_counters.get('latency_level', '-')} "
+            f"changes={kpi_counters.get('latency_level_changes', 0)} | "
             f"GPUMaint={kpi_counters.get('gpu_maintenance_runs', 0)} | "
             f"Timeouts(fetch/image/submit)="
             f"{kpi_counters.get('timeout_fetch', 0)}/"
@@ -1359,8 +1417,45 @@ def _print_summary(
             f"Final={kpi_counters.get('uap_uai_final_seen', 0)} | "
             f"Drop={kpi_counters.get('uap_uai_drop_total', 0)} | "
             f"MissingLanding={kpi_counters.get('uap_uai_missing_landing_status_count', 0)} | "
-            f"AbsentStreakMax={kpi_counters.get('uap_uai_absent_streak_max', 0)}"
+            f"AbsentStreakMax={kpi_counters.get('uap_uai_absent_streak_max', 0)} | "
+            f"SAHITiles(run/reuse/skip)="
+            f"{kpi_counters.get('sahi_tiles_run', 0)}/"
+            f"{kpi_counters.get('sahi_tiles_reused', 0)}/"
+            f"{kpi_counters.get('sahi_tiles_skipped', 0)} | "
+            f"Keyframe/Propagated="
+            f"{kpi_counters.get('keyframe_frames', 0)}/"
+            f"{kpi_counters.get('propagated_frames', 0)} "
+            f"{kpi_counters.get('keyframe_reasons', {}) or ''} | "
+            f"Cascade={kpi_counters.get('cascade_frames', 0)} "
+            f"{kpi_counters.get('cascade_escalations', {}) or ''}"
         )
+        time_at_level = kpi_counters.get("latency_time_at_level") or {}
+        if time_at_level:
+            log.info(
+                "KPI Latency Levels: "
+                + " | ".join(
+                    f"{name}={stats['sec']:.1f}s/{stats['frames']}f"
+                    for name, stats in time_at_level.items()
+                )
+            )
+        stage_latency = kpi_counters.get("stage_latency_ms") or {}
+        if stage_latency:
+            log.info(
+                "KPI Stage Latency (p50/p95/p99 ms): "
+                + " | ".join(
+                    f"{stage}={stats['p50']:.1f}/{stats['p95']:.1f}/{stats['p99']:.1f}"
+                    for stage, stats in stage_latency.items()
+                )
+            )
+        warmup = kpi_counters.get("warmup") or []
+        if warmup:
+            log.info(
+                "KPI Warmup (cold/warm ms): "
+                + " | ".join(
+                    f"{entry['path']}={entry['cold_ms']:.0f}/{entry['warm_ms']:.0f}"
+                    for entry in warmup
+                )
+            )
         send_ok = int(kpi_counters.get("send_ok", 0))
         send_fail = int(kpi_counters.get("send_fail", 0))
         processed = max(1, int(fps_counter.frame_count))
@@ -1674,6 +1769,19 @@ def main() -> None:
         run_competition(log)
 
 
+def _competition_frame_index(frame_data: Dict[str, Any], kpi_counters: Dict[str, Any]) -> int:
+    """Detektöre verilen gerçek kare indeksi: sayısal sunucu frame_id'si, değilse alınan kare sayacı.
+
+    Degrade ile atlanan ve keyframe arasında taşınan kareler de sayılır; detektör (tile
+    reuse) kare boşluklarını detect() çağrı sayısından değil bu indeksten görür.
+    """
+    kpi_counters["frames_fetched"] = int(kpi_counters.get("frames_fetched", 0)) + 1
+    try:
+        return int(str(frame_data.get("frame_id")).strip())
+    except (TypeError, ValueError):
+        return int(kpi_counters["frames_fetched"])
+
+
 def _fetch_competition_step(
     log: Logger,
     network: Any,
@@ -1687,6 +1795,7 @@ def _fetch_competition_step(
     transient_budget: int,
     degrade_replay_state: Dict[str, Any],
     degrade_fallback_window: deque,
+    runtime_plan: Any = None,
 ):
     from src.network import FrameFetchStatus
     import time
@@ -1733,6 +1842,7 @@ def _fetch_competition_step(
     transient_failures = 0
     degrade_mode = Settings.DEGRADE_FETCH_ONLY_ENABLED and resilience.is_degraded()
     frame_id = frame_data.get("frame_id", "unknown")
+    frame_index = _competition_frame_index(frame_data, kpi_counters)
     frame_fetch_monotonic = time.monotonic()
 
     if degrade_replay_state.get("objects"):
@@ -1750,6 +1860,8 @@ def _fetch_competition_step(
 
     degrade_seq = 0
     heavy_every = max(1, int(Settings.DEGRADE_SEND_INTERVAL_FRAMES))
+    if runtime_plan is not None and runtime_plan.degrade_send_interval:
+        heavy_every = max(heavy_every, int(runtime_plan.degrade_send_interval))
     if degrade_mode:
         kpi_counters["degrade_frames"] += 1
         degrade_seq = resilience.record_degraded_frame()
@@ -1891,16 +2003,26 @@ def _fetch_competition_step(
             "detected_undefined_objects": [],
             "is_duplicate": fetch_result.is_duplicate,
             "used_detection_replay": replay_used,
+            "runtime_plan": runtime_plan,
         }
     else:
         frame_ctx = FrameContext(frame)
         detect_profile = "light" if (
             degrade_mode or getattr(detector, "prefers_light_profile", False)
         ) else "default"
+        detect_start = time.perf_counter()
         try:
-            detected_objects = detector.detect(frame, runtime_profile=detect_profile)
+            detected_objects = detector.detect(
+                frame,
+                runtime_profile=detect_profile,
+                frame_ctx=frame_ctx,
+                altitude=_detection_altitude(frame_data, odometry),
+                runtime_plan=runtime_plan,
+                frame_index=frame_index,
+            )
         except TypeError:
             detected_objects = detector.detect(frame)
+        detect_ms = (time.perf_counter() - detect_start) * 1000.0
         _accumulate_detection_pipeline_metrics(kpi_counters, detector)
         detected_objects = movement.annotate(detected_objects, frame_ctx=frame_ctx)
         if detected_objects:
@@ -1943,6 +2065,8 @@ def _fetch_competition_step(
             "frame_shape": frame.shape,
             "detected_undefined_objects": undefined_objects,
             "is_duplicate": fetch_result.is_duplicate,
+            "runtime_plan": runtime_plan,
+            "detect_ms": detect_ms,
         }
 
     if degrade_mode:
@@ -2089,6 +2213,8 @@ def _submit_competition_step(
             "frame_data": frame_data,
             "frame_fetch_monotonic": pending_result_snapshot.get("frame_fetch_monotonic"),
             "degraded": bool(pending_result_snapshot.get("degraded", False)),
+            "runtime_plan": pending_result_snapshot.get("runtime_plan"),
+            "detect_ms": pending_result_snapshot.get("detect_ms"),
         }
         return (
             pending_result,
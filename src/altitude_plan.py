@@ -0,0 +1,94 @@
+"""İrtifaya göre kare başı inference planı (imgsz, SAHI açık/kapalı, tile boyutu ve örtüşmesi).
+
+Alçakta nesneler büyüktür; 1280 + SAHI boşa hesaptır. Yüksekte küçük nesneler için tile
+gerekir. ALTITUDE_PLAN_TABLE satırları ``(max_altitude_m, imgsz, sahi, slice_size, overlap)``
+olarak verilir ve başlangıçta NumPy üst-sınır dizisine çevrilir; kare başı seçim tek
+``searchsorted``'dır. Satır sınırlarında ALTITUDE_PLAN_HYSTERESIS_M kadar histerezis
+uygulanır: plan değişimi ONNX oturumunu ve tile grid'ini (tile cache) de değiştirir.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import Settings
+
+PlanRow = Tuple[float, int, bool, int, float]
+
+
+class AltitudePlanner:
+    """İrtifa (translation_z / VO z) → inference planı, histerezisli."""
+
+    def __init__(
+        self,
+        table: Optional[Sequence[PlanRow]] = None,
+        hysteresis_m: Optional[float] = None,
+    ) -> None:
+        rows = table if table is not None else getattr(Settings, "ALTITUDE_PLAN_TABLE", ())
+        rows = sorted((tuple(row) for row in rows), key=lambda row: float(row[0]))
+        if not rows:
+            raise ValueError("ALTITUDE_PLAN_TABLE boş")
+        self._upper = np.asarray([float(row[0]) for row in rows], dtype=np.float64)
+        self._plans = [
+            {
+                "imgsz": int(row[1]),
+                "sahi_enabled": bool(row[2]),
+                "slice_size": int(row[3]),
+                "slice_overlap": float(row[4]),
+            }
+            for row in rows
+        ]
+        if hysteresis_m is None:
+            hysteresis_m = float(getattr(Settings, "ALTITUDE_PLAN_HYSTERESIS_M", 3.0))
+        self._hysteresis = max(0.0, float(hysteresis_m))
+        self._row: Optional[int] = None
+        self._altitude: Optional[float] = None
+
+    @property
+    def plans(self) -> Tuple[Dict[str, Any], ...]:
+        """Tablonun tüm satır planları (warmup her şekli önceden çalıştırmak için kullanır)."""
+        return tuple(dict(plan) for plan in self._plans)
+
+    @staticmethod
+    def _valid_altitude(altitude: Any) -> Optional[float]:
+        try:
+            value = float(altitude)
+        except (TypeError, ValueError):
+            return None
+        if not np.isfinite(value) or value <= 0.0:
+            return None
+        return value
+
+    def _row_for(self, altitude: float) -> int:
+        # Son satır üst sınırsız kabul edilir
+        return min(int(np.searchsorted(self._upper, altitude, side="left")), len(self._plans) - 1)
+
+    def plan(self, altitude: Any) -> Dict[str, Any]:
+        """Bu kare için planı döndürür; geçersiz irtifada son ölçüm (yoksa DEFAULT_ALTITUDE)."""
+        value = self._valid_altitude(altitude)
+        source = "measured"
+        if value is None:
+            if self._altitude is not None:
+                value, source = self._altitude, "last"
+            else:
+                value, source = float(getattr(Settings, "DEFAULT_ALTITUDE", 50.0)), "default"
+        else:
+            self._altitude = value
+
+        row = self._row
+        if row is None:
+            row = self._row_for(value)
+        else:
+            lower = self._upper[row - 1] - self._hysteresis if row > 0 else -np.inf
+            upper = (
+                self._upper[row] + self._hysteresis if row < len(self._plans) - 1 else np.inf
+            )
+            if not lower <= value <= upper:
+                row = self._row_for(value)
+        self._row = row
+        return {
+            "row": int(row),
+            "altitude_m": round(float(value), 2),
+            "altitude_source": source,
+            **self._plans[row],
+        }
@@ -1,11 +1,13 @@
 """YOLOv8 nesne tespiti + iniş uygunluğu (UAP/UAİ).
 Model COCO/VisDrone vb. eğitilmiş olabilir; sınıflar TEKNOFEST (0,1,2,3) formatına map edilir."""
 
+import functools
 import logging
 import os
+import time
 import unicodedata
 from collections import Counter
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
@@ -14,6 +16,16 @@ from ultralytics import YOLO
 
 from config.settings import Settings
 from src.class_contract import CompetitionClassContract
+from src.detection_batch import STATUS_UNSET, DetectionBatch, class_ids_from_keys
+from src.nms import (
+    NmsRunner,
+    class_aware_greedy_nms,
+    greedy_nms,
+    pairwise_iou_f32,
+    weighted_box_fusion,
+)
+from src.stage_graph import Stage, StageGraph, StageHook
+from src.tile_cache import TileReuseCache, downscaled_gray, window_means
 from src.utils import Logger
 
 
@@ -23,13 +35,19 @@ class ObjectDetector:
     def __init__(self) -> None:
         self.log = Logger("Detector")
         self._frame_count: int = 0
+        # Çağıranın verdiği gerçek kare indeksi (sunucu frame_id / sekans indeksi); None ise
+        # detect() çağrı sayacı kullanılır. Keyframe/degrade ile atlanan kareler boşluk olarak görünür.
+        self._frame_index: Optional[int] = None
         self._trace_seq: int = 0
         self._last_guardrail_stats: Dict[str, int] = {}
         self._last_pipeline_metrics: Dict[str, Any] = {}
         self._temporal_filter: Optional[Any] = None
+        self._landing_verifier: Optional[Any] = None
         self._use_half: bool = False
+        self._cpu_threads: Optional[int] = None  # Gecikme tablosunun seçtiği CPU thread sayısı
         self._class_map_mode: str = "unknown"
         self._model_class_map: Dict[int, int] = {}
+        self._class_lookup: Optional[np.ndarray] = None
         self._uap_uai_model_class_ids: List[int] = []
         self._uap_uai_absent_streak: int = 0
         self._uap_uai_absent_streak_max: int = 0
@@ -37,6 +55,28 @@ class ObjectDetector:
         self._prev_raw_has_uap_uai: bool = False
         self._warned_nms_mode_invalid: bool = False
         self._warned_nms_mode_legacy: bool = False
+        self._nms_runner: Optional[NmsRunner] = None
+        self._last_sahi_tile_stats: Dict[str, Any] = {}
+        self._tile_cache: Optional[TileReuseCache] = None
+        self._enhancement_mode: str = "none"
+        self._thermal_cache: Optional[Tuple[Tuple[int, ...], bool]] = None
+        self._thermal_checked_frame: int = -1
+        self._model_inputs: Dict[Tuple[int, int], Tuple[np.ndarray, Tuple[float, float]]] = {}
+        self._shared_focus_batch: Optional[DetectionBatch] = None
+        self._shared_focus_key: Optional[Tuple[int, float]] = None
+        self._inference_engine: Optional[Any] = None
+        self._inference_engine_failed: bool = False
+        self._engine_calls: int = 0
+        self._engine_verify_checks: int = 0
+        self._engine_verify_mismatches: int = 0
+        self._inference_precision: str = "fp32"
+        self._last_cascade_stats: Dict[str, Any] = {}
+        self._altitude_planner: Any = None
+        self._last_altitude_plan: Dict[str, Any] = {}
+        self._warmup_report: List[Dict[str, Any]] = []
+        self._postprocess_graph: Optional[StageGraph] = None
+        self._stage_timing_enabled: bool = False
+        self._stage_timings: List[Tuple[str, float]] = []
         self.prefers_light_profile: bool = False
 
         self.device = self._resolve_device()
@@ -70,13 +110,6 @@ class ObjectDetector:
             raise RuntimeError(f"YOLOv8 modeli yüklenemedi: {e}")
 
         self._apply_non_cuda_runtime_optimizations()
-        self._warmup()
-
-        uap_uai_conf = getattr(Settings, "CONFIDENCE_THRESHOLD_UAP_UAI", None)
-        if uap_uai_conf is not None:
-            self.log.info(
-                f"UAP/UAİ conf eşiği: {uap_uai_conf} (Taşıt/İnsan: {Settings.CONFIDENCE_THRESHOLD})"
-            )
 
         if Settings.CLAHE_ENABLED:
             self._clahe = cv2.createCLAHE(
@@ -90,6 +123,15 @@ class ObjectDetector:
         else:
             self._clahe = None
 
+        # Warmup ön-işlemeyi de (CLAHE dahil) üretimdeki haliyle çalıştırır
+        self._warmup()
+
+        uap_uai_conf = getattr(Settings, "CONFIDENCE_THRESHOLD_UAP_UAI", None)
+        if uap_uai_conf is not None:
+            self.log.info(
+                f"UAP/UAİ conf eşiği: {uap_uai_conf} (Taşıt/İnsan: {Settings.CONFIDENCE_THRESHOLD})"
+            )
+
     def _resolve_device(self) -> str:
         requested = str(getattr(Settings, "DEVICE", "auto")).strip().lower()
         mps_backend = getattr(torch.backends, "mps", None)
@@ -123,6 +165,7 @@ class ObjectDetector:
         if bool(getattr(Settings, "NON_CUDA_DISABLE_UAP_UAI_FOCUSED_PASS", False)):
             Settings.UAP_UAI_FOCUSED_PASS_ENABLED = False
         Settings.PIPELINE_STAGE_METRICS_ENABLED = False
+        self._apply_latency_table_threads()
 
         if self.device == "mps":
             self.log.info(
@@ -133,34 +176,321 @@ class ObjectDetector:
                 "Non-CUDA optimization profile applied for CPU runtime"
             )
 
+    def _apply_latency_table_threads(self) -> None:
+        """Kalibrasyon tablosu varsa light profile konfigürasyonunun en hızlı thread sayısı."""
+        from src.latency_table import detection_budget_ms, load_latency_table
+
+        table = load_latency_table()
+        entry = table.select(detection_budget_ms(), **self._latency_table_filters()) if table else None
+        if entry is None:
+            return
+        self._set_cpu_threads(max(1, int(entry["threads"])))
+        threads = self._cpu_threads
+        self.log.info(
+            f"Gecikme tablosu: imgsz={entry['imgsz']} sahi={entry['sahi']} "
+            f"threads={threads} p90={float(entry['p90_ms']):.0f} ms"
+        )
+
+    def _set_cpu_threads(self, threads: Optional[int]) -> None:
+        """CPU thread sayısını detektörde tutar (Settings'e yazılmaz); ONNX motoru buradan okur."""
+        self._cpu_threads = None if threads is None else max(1, int(threads))
+        if self._cpu_threads is not None:
+            try:
+                torch.set_num_threads(self._cpu_threads)
+            except Exception:
+                pass
+        engine = self._inference_engine
+        if engine is not None and getattr(engine, "intra_op_threads", self._cpu_threads) != self._cpu_threads:
+            self._inference_engine = None  # Oturumlar yeni thread sayısıyla yeniden kurulur
+
     def _warmup(self) -> None:
+        """Oturumun kullanacağı her forward yolunu gerçek kare şekliyle ısıtır.
+
+        İlk yarışma karesi allocator büyümesi / kernel seçimi / lazy init maliyetini
+        ödememeli. Yollar ``_warmup_paths`` ile oturum konfigürasyonundan türetilir; yol
+        başına ilk (soğuk) çağrı ve sonraki (sıcak) çağrıların medyanı raporlanır.
+        """
         iterations = int(Settings.WARMUP_ITERATIONS)
         if self.device != "cuda":
             iterations = max(
                 0,
                 int(getattr(Settings, "NON_CUDA_WARMUP_ITERATIONS", iterations)),
             )
-        self.log.info(f"Model ısınması başlıyor ({iterations} iterasyon)...")
+        self._warmup_report = []
         if iterations == 0:
             self.log.info("Warmup atlandı")
             return
+        # Soğuk/sıcak karşılaştırması için yol başına en az iki çağrı
+        calls = max(2, iterations)
         try:
-            dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+            frame = self._warmup_frame()
             with torch.no_grad():
-                for i in range(iterations):
-                    self.model.predict(
-                        source=dummy,
-                        imgsz=Settings.INFERENCE_SIZE,
-                        conf=Settings.CONFIDENCE_THRESHOLD,
-                        classes=None,
-                        device=self.device,
-                        verbose=False,
-                        save=False,
-                        half=self._use_half,
+                paths = self._warmup_paths(frame)
+                self.log.info(
+                    f"Model ısınması başlıyor ({len(paths)} yol × {calls} çağrı, "
+                    f"kare={frame.shape[1]}x{frame.shape[0]})..."
+                )
+                for name, run in paths:
+                    timings: List[float] = []
+                    for _ in range(calls):
+                        start = time.perf_counter()
+                        run()
+                        if self.device == "cuda":
+                            torch.cuda.synchronize()
+                        timings.append((time.perf_counter() - start) * 1000.0)
+                    entry = {
+                        "path": name,
+                        "cold_ms": round(timings[0], 2),
+                        "warm_ms": round(float(np.median(timings[1:])), 2),
+                        "calls": len(timings),
+                    }
+                    self._warmup_report.append(entry)
+                    self.log.info(
+                        f"Warmup {name}: soğuk={entry['cold_ms']:.1f} ms "
+                        f"sıcak={entry['warm_ms']:.1f} ms"
                     )
             self.log.success("Model ısınması tamamlandı ✓")
         except Exception as e:
             self.log.warn(f"Warmup sırasında hata (görmezden geliniyor): {e}")
+        finally:
+            self.reset_session_state()
+
+    def reset_session_state(self) -> None:
+        """Kare sayacı, zamansal geçmiş ve kare önbelleklerini oturum başı durumuna döndürür.
+
+        Model, inference motoru, derlenmiş aşama grafiği ve ısınma raporu korunur; ısınma /
+        kalibrasyon kareleri yarışmanın ilk karesine taşınmaz.
+        """
+        self._frame_count = 0
+        self._frame_index = None
+        self._trace_seq = 0
+        self._last_guardrail_stats = {}
+        self._last_pipeline_metrics = {}
+        self._uap_uai_absent_streak = 0
+        self._uap_uai_absent_streak_max = 0
+        self._last_uap_uai_missing_landing_status_count = 0
+        self._prev_raw_has_uap_uai = False
+        self._last_sahi_tile_stats = {}
+        self._thermal_cache = None
+        self._thermal_checked_frame = -1
+        self._model_inputs = {}
+        self._shared_focus_batch = None
+        self._shared_focus_key = None
+        self._engine_calls = 0
+        self._engine_verify_checks = 0
+        self._engine_verify_mismatches = 0
+        self._last_cascade_stats = {}
+        self._altitude_planner = None  # İrtifa histerezisi kalibrasyon karelerinden başlamasın
+        self._last_altitude_plan = {}
+        self._stage_timings = []
+        for component in (self._temporal_filter, self._landing_verifier, self._tile_cache):
+            if component is not None:
+                component.reset()
+
+    @staticmethod
+    def _warmup_frame() -> np.ndarray:
+        """Kamera profilinin kare boyutu (CAMERA_IMAGE_SIZE_HW; yoksa ana noktanın iki katı)."""
+        h, w = (int(v) for v in getattr(Settings, "CAMERA_IMAGE_SIZE_HW", (0, 0)))
+        if h <= 0 or w <= 0:
+            h = max(32, int(round(2.0 * float(Settings.CAMERA_CY))))
+            w = max(32, int(round(2.0 * float(Settings.CAMERA_CX))))
+        return np.zeros((h, w, 3), dtype=np.uint8)
+
+    def _warmup_configs(self) -> List[Dict[str, Any]]:
+        """Oturumda oluşabilecek inference konfigürasyonları.
+
+        default + light profil (degrade modunda light kullanılır) × irtifa planı satırları ×
+        gecikme kontrolcüsü seviyeleri.
+        """
+        configs: List[Dict[str, Any]] = []
+        planner = None
+        if bool(getattr(Settings, "ALTITUDE_PLAN_ENABLED", False)):
+            from src.altitude_plan import AltitudePlanner
+
+            planner = AltitudePlanner()
+        for profile in ("default", "light"):
+            base = self._build_inference_config(profile)
+            if planner is None:
+                configs.append(base)
+            else:
+                configs.extend(
+                    self._merge_altitude_plan(base, profile, plan) for plan in planner.plans
+                )
+        if bool(getattr(Settings, "LOW_FPS_GUARD_ENABLED", True)):
+            from src.latency_control import LatencyController, session_quality_levels
+
+            levels = session_quality_levels(self._latency_table_filters())
+            plans = LatencyController(levels=levels).plans()
+            configs.extend(self._apply_runtime_plan(cfg, plan) for cfg in list(configs) for plan in plans)
+        return configs
+
+    def _warmup_paths(self, frame: np.ndarray) -> List[Tuple[str, Callable[[], Any]]]:
+        """Konfigürasyonlardan benzersiz forward yolları: primary, kaskad ucuz geçişi, SAHI
+        tile batch'i ve sınıf filtreli odaklı UAP/UAİ geçişi. Aynı şekil bir kez çalışır."""
+        processed = self._prepare_frame(frame)
+        frame_h, frame_w = processed.shape[:2]
+        paths: Dict[tuple, Tuple[str, Callable[[], Any]]] = {}
+
+        def _fresh(fn: Callable[[], Any]) -> Callable[[], Any]:
+            # Her çağrı yeni bir kare gibi: model girdisi önbelleği ve ortak forward sıfırlanır
+            def run() -> Any:
+                self._model_inputs = {}
+                self._shared_focus_batch = None
+                self._shared_focus_key = None
+                return fn()
+
+            return run
+
+        for cfg in self._warmup_configs():
+            primaries = [cfg]
+            if self._cascade_active(cfg):
+                cheap = min(int(getattr(Settings, "CASCADE_CHEAP_IMG_SIZE", 640)), int(cfg["imgsz"]))
+                primaries.append(dict(cfg, imgsz=cheap))
+            for primary in primaries:
+                imgsz, augment = int(primary["imgsz"]), bool(primary["augment"])
+                paths.setdefault(
+                    ("full", imgsz, augment),
+                    (
+                        f"full@{imgsz}{'+aug' if augment else ''}",
+                        _fresh(functools.partial(self._standard_inference, processed, primary)),
+                    ),
+                )
+            if cfg["sahi_enabled"]:
+                slice_size, overlap = self._slice_params(cfg)
+                windows = self._compute_slice_windows(frame_h, frame_w, slice_size, overlap)
+                include_full = self._can_batch_full_frame_with_tiles(cfg)
+                augment = bool(cfg["augment"])
+                paths.setdefault(
+                    ("sahi", slice_size, len(windows), include_full, augment),
+                    (
+                        f"sahi@{slice_size}x{len(windows)}{'+full' if include_full else ''}"
+                        f"{'+aug' if augment else ''}",
+                        _fresh(
+                            functools.partial(
+                                self._predict_tiles,
+                                processed,
+                                cfg,
+                                windows,
+                                include_full_frame=include_full,
+                            )
+                        ),
+                    ),
+                )
+            if (
+                self._focused_pass_enabled(cfg)
+                and self.device == "cuda"
+                and self._uap_uai_model_class_ids
+            ):
+                focus_imgsz = self._focused_pass_params(cfg)[2]
+                paths.setdefault(
+                    ("focused", focus_imgsz),
+                    (
+                        f"focused@{focus_imgsz}",
+                        _fresh(
+                            functools.partial(
+                                self._focused_uap_uai_inference, processed, cfg, escalated=True
+                            )
+                        ),
+                    ),
+                )
+        return list(paths.values())
+
+    def get_warmup_report(self) -> List[Dict[str, Any]]:
+        """Yol başına soğuk / sıcak warmup gecikmesi (ms)."""
+        return [dict(entry) for entry in self._warmup_report]
+
+    def _predict(self, source: Any, **kwargs: Any) -> List[Any]:
+        """Tüm forward çağrılarının tek giriş noktası (INFERENCE_BACKEND seçimi burada)."""
+        engine = None
+        if not bool(kwargs.get("augment", False)):
+            engine = self._get_inference_engine()
+        if engine is not None:
+            try:
+                results = engine.predict(source, precision=self._inference_precision, **kwargs)
+            except Exception as exc:
+                self.log.warn(
+                    f"{engine.name} inference backend hatası, ultralytics predict()'e dönülüyor: {exc}"
+                )
+                self._inference_engine = None
+                self._inference_engine_failed = True
+            else:
+                self._engine_calls += 1
+                interval = int(getattr(Settings, "INFERENCE_BACKEND_VERIFY_INTERVAL", 0))
+                if interval > 0 and self._engine_calls % interval == 0:
+                    reference = self._predict_reference(source, **kwargs)
+                    if not self._engine_results_match(results, reference):
+                        return reference
+                return results
+        return self._predict_reference(source, **kwargs)
+
+    def _predict_reference(self, source: Any, **kwargs: Any) -> List[Any]:
+        return self.model.predict(
+            source=source,
+            device=self.device,
+            verbose=False,
+            save=False,
+            half=self._use_half,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _inference_backend_name() -> str:
+        return str(getattr(Settings, "INFERENCE_BACKEND", "ultralytics")).strip().lower()
+
+    def _get_inference_engine(self) -> Optional[Any]:
+        backend = self._inference_backend_name()
+        if backend == "ultralytics" or self._inference_engine_failed:
+            return None
+        if self._inference_engine is not None and self._inference_engine.name == backend:
+            return self._inference_engine
+        try:
+            if backend == "direct":
+                from src.inference_engine import DirectTorchEngine
+                self._inference_engine = DirectTorchEngine(self.model, self.device, self._use_half)
+            elif backend == "onnx":
+                from src.inference_engine import OnnxRuntimeEngine
+                if self.device != "cpu":
+                    self.log.warn(f"onnx backend yalnızca CPU provider kullanır (device={self.device})")
+                self._inference_engine = OnnxRuntimeEngine(
+                    Settings.MODEL_PATH, intra_op_threads=self._cpu_threads
+                )
+            else:
+                self.log.warn(f"Geçersiz INFERENCE_BACKEND={backend}; ultralytics kullanılıyor")
+                self._inference_engine_failed = True
+                return None
+        except Exception as exc:
+            self.log.warn(f"{backend} inference backend başlatılamadı, ultralytics kullanılıyor: {exc}")
+            self._inference_engine_failed = True
+            return None
+        self.log.info(f"Inference backend: {backend}")
+        return self._inference_engine
+
+    def _engine_results_match(self, results: List[Any], reference: List[Any]) -> bool:
+        """Motor çıktısını predict() referansıyla karşılaştırır (satır sayısı + kutu/conf farkı)."""
+        self._engine_verify_checks += 1
+        tol_px = float(getattr(Settings, "INFERENCE_BACKEND_VERIFY_TOL_PX", 1.0))
+        tol_conf = float(getattr(Settings, "INFERENCE_BACKEND_VERIFY_TOL_CONF", 0.01))
+        box_diff = conf_diff = 0.0
+        matched = len(results) == len(reference)
+        for ours, ref in zip(results, reference):
+            a = self._tensor_to_numpy(ours.boxes.data).astype(np.float64).reshape(-1, 6)
+            b = self._tensor_to_numpy(ref.boxes.data).astype(np.float64)
+            b = np.concatenate([b[:, :4], b[:, -2:]], axis=1) if b.ndim == 2 else b.reshape(-1, 6)
+            if a.shape != b.shape or not np.array_equal(a[:, 5], b[:, 5]):
+                matched = False
+                break
+            if len(a):
+                box_diff = max(box_diff, float(np.abs(a[:, :4] - b[:, :4]).max()))
+                conf_diff = max(conf_diff, float(np.abs(a[:, 4] - b[:, 4]).max()))
+        if not matched or box_diff > tol_px or conf_diff > tol_conf:
+            self._engine_verify_mismatches += 1
+            self.log.warn(
+                "Inference backend doğrulaması başarısız "
+                f"(satır_eşleşme={matched}, kutu_fark={box_diff:.3f}px, conf_fark={conf_diff:.4f}); "
+                "bu çağrıda predict() sonucu kullanılıyor"
+            )
+            return False
+        return True
 
     @staticmethod
     def _normalize_label(label: str) -> str:
@@ -261,6 +591,7 @@ class ObjectDetector:
         if not has_uai:
             self.log.warn("⚠ Model UAİ (class 3) sınıfı İÇERMİYOR — UAİ tespiti yapılamaz!")
 
+        self._class_lookup = self._build_class_lookup(self._model_class_map)
         self._uap_uai_model_class_ids = sorted(
             model_cls
             for model_cls, tf_cls in self._model_class_map.items()
@@ -275,10 +606,32 @@ class ObjectDetector:
     def _map_model_class_to_teknofest(self, model_cls_id: int) -> int:
         return self._model_class_map.get(model_cls_id, -1)
 
+    @staticmethod
+    def _build_class_lookup(class_map: Dict[int, int]) -> np.ndarray:
+        """Model sınıf id → TEKNOFEST id lookup dizisi (eşlenmeyenler -1)."""
+        valid_keys = [int(k) for k in class_map.keys() if int(k) >= 0]
+        size = (max(valid_keys) + 1) if valid_keys else 0
+        lookup = np.full(size, -1, dtype=np.int64)
+        for model_cls, tf_cls in class_map.items():
+            if int(model_cls) >= 0:
+                lookup[int(model_cls)] = int(tf_cls)
+        return lookup
+
+    def _map_model_classes_to_teknofest(self, model_cls_ids: np.ndarray) -> np.ndarray:
+        lookup = getattr(self, "_class_lookup", None)
+        if lookup is None:
+            lookup = self._build_class_lookup(self._model_class_map)
+            self._class_lookup = lookup
+        ids = np.asarray(model_cls_ids, dtype=np.int64)
+        in_range = (ids >= 0) & (ids < lookup.shape[0])
+        mapped = np.full(ids.shape, -1, dtype=np.int64)
+        mapped[in_range] = lookup[ids[in_range]]
+        return mapped
+
     def _resolve_nms_mode(self) -> str:
         mode = str(getattr(Settings, "NMS_MODE", "")).strip().lower()
         legacy_agnostic = bool(getattr(Settings, "AGNOSTIC_NMS", False))
-        valid_modes = {"class_aware", "agnostic", "hybrid"}
+        valid_modes = {"class_aware", "agnostic", "hybrid", "wbf"}
 
         if mode in valid_modes:
             if legacy_agnostic and mode != "agnostic" and not self._warned_nms_mode_legacy:
@@ -302,7 +655,9 @@ class ObjectDetector:
             light_imgsz = int(
                 getattr(
                     Settings,
-                    "NON_CUDA_LIGHT_PROFILE_INFERENCE_SIZE",
+                    "ONNX_LIGHT_PROFILE_INFERENCE_SIZE"
+                    if self._inference_backend_name() == "onnx"
+                    else "NON_CUDA_LIGHT_PROFILE_INFERENCE_SIZE",
                     getattr(
                         Settings,
                         "LIGHT_PROFILE_INFERENCE_SIZE",
@@ -333,7 +688,7 @@ class ObjectDetector:
                     Settings.MAX_DETECTIONS,
                 )
             )
-            return {
+            return self._apply_latency_table({
                 "imgsz": max(
                     256,
                     light_imgsz,
@@ -359,11 +714,20 @@ class ObjectDetector:
                 "sahi_enabled": bool(
                     getattr(Settings, "LIGHT_PROFILE_SAHI_ENABLED", False)
                 ),
+                "precision": str(
+                    getattr(
+                        Settings,
+                        "ONNX_LIGHT_PROFILE_PRECISION",
+                        getattr(Settings, "ONNX_PRECISION", "fp32"),
+                    )
+                ).strip().lower(),
+                "slice_size": int(Settings.SAHI_SLICE_SIZE),
+                "slice_overlap": float(Settings.SAHI_OVERLAP_RATIO),
                 "merge_iou": float(Settings.SAHI_MERGE_IOU),
                 "hybrid_iou": float(
                     getattr(Settings, "HYBRID_NMS_IOU_THRESHOLD", 0.65)
                 ),
-            }
+            })
 
         conf_global = float(Settings.CONFIDENCE_THRESHOLD)
         conf_uap_uai = getattr(Settings, "CONFIDENCE_THRESHOLD_UAP_UAI", None)
@@ -375,119 +739,85 @@ class ObjectDetector:
             "max_det": int(Settings.MAX_DETECTIONS),
             "augment": bool(Settings.AUGMENTED_INFERENCE),
             "sahi_enabled": bool(Settings.SAHI_ENABLED),
+            "precision": str(getattr(Settings, "ONNX_PRECISION", "fp32")).strip().lower(),
+            "slice_size": int(Settings.SAHI_SLICE_SIZE),
+            "slice_overlap": float(Settings.SAHI_OVERLAP_RATIO),
             "merge_iou": float(Settings.SAHI_MERGE_IOU),
             "hybrid_iou": float(getattr(Settings, "HYBRID_NMS_IOU_THRESHOLD", 0.65)),
         }
 
     def detect(self, frame: np.ndarray, runtime_profile: str = "default", **kwargs) -> List[Dict]:
+        detect_start = time.perf_counter()
+        frame_index = kwargs.get("frame_index")
+        self._frame_index = None if frame_index is None else int(frame_index)
+        self._stage_timing_enabled = bool(getattr(Settings, "PIPELINE_STAGE_TIMING_ENABLED", True))
+        self._stage_timings = []
         try:
-            inference_cfg = self._build_inference_config(runtime_profile)
-            processed = self._preprocess(frame)
+            inference_cfg = self._apply_runtime_plan(
+                self._apply_altitude_plan(
+                    self._build_inference_config(runtime_profile),
+                    runtime_profile,
+                    kwargs.get("altitude"),
+                ),
+                kwargs.get("runtime_plan"),
+            )
+            self._inference_precision = inference_cfg.get("precision", "fp32")
+            start = time.perf_counter()
+            processed = self._prepare_frame(frame)
+            self._record_stage_ms("preprocess", start)
             stage_trace: List[Dict[str, Any]] = []
-            if inference_cfg["sahi_enabled"]:
-                primary_detections = self._sahi_detect(processed, inference_cfg=inference_cfg)
+            self._last_sahi_tile_stats = {}
+            self._last_cascade_stats = {}
+            self._shared_focus_batch = None
+            self._shared_focus_key = None
+            focus_escalation: Optional[bool] = None
+            if self._cascade_active(inference_cfg):
+                primary_batch, focus_escalation = self._cascade_inference(
+                    processed, inference_cfg=inference_cfg
+                )
+            elif inference_cfg["sahi_enabled"]:
+                primary_batch = self._sahi_detect(processed, inference_cfg=inference_cfg)
             else:
-                primary_detections = self._standard_inference(
+                primary_batch = self._standard_inference(
                     processed, inference_cfg=inference_cfg
                 )
-            self._collect_stage_stats(stage_trace, "raw_model_primary", primary_detections)
+            self._collect_stage_stats(stage_trace, "raw_model_primary", primary_batch)
 
-            raw_detections = list(primary_detections)
-            focused_dets = self._focused_uap_uai_inference(
+            focus_start = time.perf_counter()
+            focused_batch = self._focused_uap_uai_inference(
                 processed,
                 inference_cfg=inference_cfg,
-                primary_detections=primary_detections,
-            )
-            if focused_dets:
-                raw_detections.extend(focused_dets)
-            self._collect_stage_stats(stage_trace, "raw_model_output", raw_detections)
-            self._track_uap_uai_absence(raw_detections)
-
-            raw_detections = self._filter_by_confidence(raw_detections)
-            self._collect_stage_stats(stage_trace, "confidence_filter", raw_detections)
-
-            nms_mode = self._resolve_nms_mode()
-            if nms_mode == "agnostic":
-                self._log_nms_mode_comparison(raw_detections, inference_cfg)
-            raw_detections = self._apply_runtime_nms(
-                raw_detections, inference_cfg=inference_cfg
+                primary_detections=primary_batch,
+                escalated=focus_escalation,
             )
-            self._collect_stage_stats(stage_trace, f"nms_{nms_mode}", raw_detections)
-            raw_detections = self._suppress_landing_zone_class_conflicts(raw_detections)
-            self._collect_stage_stats(stage_trace, "uap_uai_conflict_suppress", raw_detections)
-            raw_detections = self._post_filter(raw_detections, altitude=kwargs.get("altitude"))
-            self._collect_stage_stats(stage_trace, "min_size_post_filter", raw_detections)
-            
-            try:
-                from src.postprocess import apply_guardrails
-                raw_detections, self._last_guardrail_stats = apply_guardrails(raw_detections)
-            except ImportError:
-                self._last_guardrail_stats = {}
-            self._collect_stage_stats(stage_trace, "guardrails", raw_detections)
+            if focus_escalation:
+                self._last_cascade_stats["cascade_escalation_ms"] += (
+                    time.perf_counter() - focus_start
+                ) * 1000.0
+            batch = DetectionBatch.concat([primary_batch, focused_batch])
+            self._collect_stage_stats(stage_trace, "raw_model_output", batch)
+            self._track_uap_uai_absence(batch)
 
-            temporal_filter_enabled = bool(
-                getattr(Settings, "TEMPORAL_FILTER_ENABLED", True)
+            frame_h, frame_w = frame.shape[:2]
+            graph = self._get_postprocess_graph(runtime_profile, inference_cfg)
+            batch = graph.run(
+                batch,
+                {
+                    "frame": frame,
+                    "frame_w": frame_w,
+                    "frame_h": frame_h,
+                    "altitude": kwargs.get("altitude"),
+                },
+                hook=self._stage_hook(stage_trace),
             )
-            if runtime_profile == "light" and self.device != "cuda":
-                temporal_filter_enabled = False
-            if temporal_filter_enabled:
-                try:
-                    from src.temporal_filter import TemporalConsistencyFilter
-                    if self._temporal_filter is None:
-                        self._temporal_filter = TemporalConsistencyFilter()
-                    raw_detections = self._temporal_filter.filter(raw_detections)
-                except ImportError:
-                    pass
-            self._collect_stage_stats(stage_trace, "temporal_filter", raw_detections)
 
-            frame_h, frame_w = frame.shape[:2]
-            try:
-                from src.uap_uai import determine_landing_status
-                final_detections = determine_landing_status(
-                    raw_detections, frame_w, frame_h, frame
-                )
-            except ImportError:
-                final_detections = raw_detections
-            self._collect_stage_stats(stage_trace, "landing_status", final_detections)
-
-            output: List[Dict] = []
-            conf_tasit_insan = float(Settings.CONFIDENCE_THRESHOLD)
-            missing_landing_status_count = 0
-            for det in final_detections:
-                if det["cls_int"] == -1:
-                    continue
-                if det["cls_int"] in (Settings.CLASS_TASIT, Settings.CLASS_INSAN):
-                    if det["confidence"] < conf_tasit_insan:
-                        continue
-                # Şartname: motion_status → Taşıt(0)=0/1, İnsan(1)=-1, UAP(2)=-1, UAİ(3)=-1
-                # Varsayılan -1; MovementEstimator.annotate() taşıtlar için sonra günceller
-                cls_id = det["cls_int"]
-                default_motion = "-1"
-                if cls_id in (Settings.CLASS_UAP, Settings.CLASS_UAI):
-                    landing_status = str(det.get("landing_status", "0"))
-                    if landing_status not in {"0", "1"}:
-                        landing_status = "0"
-                else:
-                    landing_status = "-1"
-                if cls_id in (Settings.CLASS_UAP, Settings.CLASS_UAI) and "landing_status" not in det:
-                    self.log.warn(
-                        "UAP/UAİ detection missing landing_status; defaulting to 0"
-                    )
-                    missing_landing_status_count += 1
-                output.append({
-                    "cls": det["cls"],
-                    "landing_status": landing_status,
-                    "motion_status": default_motion,
-                    "top_left_x": det["top_left_x"],
-                    "top_left_y": det["top_left_y"],
-                    "bottom_right_x": det["bottom_right_x"],
-                    "bottom_right_y": det["bottom_right_y"],
-                    "confidence": det["confidence"],
-                    "trace_id": det.get("trace_id", ""),
-                })
+            start = time.perf_counter()
+            output, missing_landing_status_count = self._build_output(batch)
+            self._record_stage_ms("build_output", start)
 
             self._collect_stage_stats(stage_trace, "final_json_candidates", output)
             self._last_uap_uai_missing_landing_status_count = int(missing_landing_status_count)
+            self._record_stage_ms("detect_total", detect_start)
             self._last_pipeline_metrics = self._build_pipeline_metrics(stage_trace)
             self._last_pipeline_metrics["uap_uai_missing_landing_status_count"] = int(
                 missing_landing_status_count
@@ -532,6 +862,10 @@ class ObjectDetector:
                 "uap_uai_absent_streak": int(self._uap_uai_absent_streak),
                 "uap_uai_absent_streak_max": int(self._uap_uai_absent_streak_max),
                 "uap_uai_missing_landing_status_count": 0,
+                **self._sahi_tile_metrics(),
+                **self._cascade_metrics(),
+                **self._altitude_plan_metrics(),
+                **self._stage_timing_metrics(),
             }
             return []
         except Exception as e:
@@ -546,50 +880,238 @@ class ObjectDetector:
                 "uap_uai_absent_streak": int(self._uap_uai_absent_streak),
                 "uap_uai_absent_streak_max": int(self._uap_uai_absent_streak_max),
                 "uap_uai_missing_landing_status_count": 0,
+                **self._sahi_tile_metrics(),
+                **self._cascade_metrics(),
+                **self._altitude_plan_metrics(),
+                **self._stage_timing_metrics(),
             }
             return []
 
+    def _build_output(self, batch: DetectionBatch) -> Tuple[List[Dict], int]:
+        """Batch'i tek seferde yarışma payload dict'lerine çevirir."""
+        if len(batch) == 0:
+            return [], 0
+        keep = batch.class_ids != -1
+        # Taşıt/İnsan için genel eşik (UAP/UAİ daha düşük eşikle buraya kadar gelmiş olabilir)
+        keep &= ~(
+            batch.class_mask((Settings.CLASS_TASIT, Settings.CLASS_INSAN))
+            & (batch.scores < float(Settings.CONFIDENCE_THRESHOLD))
+        )
+        final = batch.select(keep)
+
+        # Şartname: landing_status → UAP/UAİ için 0/1, diğerleri -1
+        landing_zone = final.class_mask((Settings.CLASS_UAP, Settings.CLASS_UAI))
+        missing = landing_zone & (final.landing_status == STATUS_UNSET)
+        missing_count = int(np.count_nonzero(missing))
+        if missing_count > 0:
+            self.log.warn(
+                f"{missing_count} UAP/UAİ detection missing landing_status; defaulting to 0"
+            )
+        landing = np.where(
+            landing_zone,
+            np.where(final.landing_status == 1, 1, 0),
+            -1,
+        )
+
+        # Şartname: motion_status → Taşıt(0)=0/1, İnsan(1)=-1, UAP(2)=-1, UAİ(3)=-1
+        # Varsayılan -1; MovementEstimator.annotate() taşıtlar için sonra günceller
+        rounded = np.round(final.boxes, 2).tolist()
+        output: List[Dict] = []
+        for cls_id, landing_status, box, conf, trace_id in zip(
+            final.class_ids.tolist(),
+            landing.tolist(),
+            rounded,
+            final.scores.tolist(),
+            final.trace_ids(),
+        ):
+            output.append({
+                "cls": str(cls_id),
+                "landing_status": str(landing_status),
+                "motion_status": "-1",
+                "top_left_x": box[0],
+                "top_left_y": box[1],
+                "bottom_right_x": box[2],
+                "bottom_right_y": box[3],
+                "confidence": conf,
+                "trace_id": trace_id,
+            })
+        return output, missing_count
+
+    def _get_postprocess_graph(
+        self, runtime_profile: str, inference_cfg: Dict[str, Any]
+    ) -> StageGraph:
+        """Forward sonrası aşama grafiği; profil / gecikme planı değişince yeniden kurulur."""
+        key = (runtime_profile, inference_cfg.get("runtime_plan"))
+        graph = self._postprocess_graph
+        if graph is None or graph.key != key:
+            graph = self._build_postprocess_graph(runtime_profile, inference_cfg, key)
+            self._postprocess_graph = graph
+            self.log.debug(
+                f"Post-process grafı kuruldu (profile={key[0]}, plan={key[1]}): "
+                + " → ".join(graph.names)
+            )
+        return graph
+
+    def _build_postprocess_graph(
+        self,
+        runtime_profile: str,
+        inference_cfg: Dict[str, Any],
+        key: Any = None,
+    ) -> StageGraph:
+        """Güven filtresi → NMS → UAP/UAİ çakışması → boyut filtresi → guardrails →
+        zamansal filtre → iniş durumu zincirini çözümlenmiş parametrelerle kurar.
+
+        Kapalı aşamalar (eşik <= 0, GUARDRAILS_ENABLED / TEMPORAL_FILTER_ENABLED kapalı,
+        modül yok) grafa eklenmez; aşama adları stage_trace adlarıyla aynıdır.
+        """
+        stages: List[Stage] = []
+
+        thresholds = self._confidence_thresholds(
+            inference_cfg.get("conf_floor"), inference_cfg.get("uap_uai_conf_floor")
+        )
+        stages.append(
+            Stage(
+                "confidence_filter",
+                lambda batch, _inputs: self._filter_by_confidence_batch(
+                    batch, thresholds=thresholds
+                ),
+            )
+        )
+
+        nms_mode = self._resolve_nms_mode()
+        nms_cfg = {
+            "merge_iou": inference_cfg.get("merge_iou"),
+            "hybrid_iou": inference_cfg.get("hybrid_iou"),
+        }
+        compare_agnostic = nms_mode == "agnostic" and bool(getattr(Settings, "DEBUG", False))
+
+        def run_nms(batch: DetectionBatch, _inputs: Dict[str, Any]) -> DetectionBatch:
+            if compare_agnostic:
+                self._log_nms_mode_comparison(batch, inference_cfg)
+            return self._apply_runtime_nms_batch(batch, inference_cfg=nms_cfg, mode=nms_mode)
+
+        stages.append(Stage(f"nms_{nms_mode}", run_nms))
+
+        conflict_params = self._landing_zone_conflict_params()
+        if conflict_params[0] > 0.0:
+            stages.append(
+                Stage(
+                    "uap_uai_conflict_suppress",
+                    lambda batch, _inputs: self._suppress_landing_zone_class_conflicts_batch(
+                        batch, conflict_params
+                    ),
+                )
+            )
+
+        post_filter_params = self._post_filter_params()
+        stages.append(
+            Stage(
+                "min_size_post_filter",
+                lambda batch, inputs: self._post_filter_batch(
+                    batch, altitude=inputs.get("altitude"), params=post_filter_params
+                ),
+            )
+        )
+
+        self._last_guardrail_stats = {}
+        if bool(getattr(Settings, "GUARDRAILS_ENABLED", True)):
+            try:
+                from src.postprocess import apply_guardrails_batch, resolve_guardrail_params
+            except ImportError:
+                apply_guardrails_batch = None
+            if apply_guardrails_batch is not None:
+                guardrail_params = resolve_guardrail_params()
+
+                def run_guardrails(batch: DetectionBatch, _inputs: Dict[str, Any]) -> DetectionBatch:
+                    batch, self._last_guardrail_stats = apply_guardrails_batch(
+                        batch, guardrail_params
+                    )
+                    return batch
+
+                stages.append(Stage("guardrails", run_guardrails))
+
+        temporal_filter_enabled = bool(getattr(Settings, "TEMPORAL_FILTER_ENABLED", True))
+        if runtime_profile == "light" and self.device != "cuda":
+            temporal_filter_enabled = False
+        if temporal_filter_enabled:
+            try:
+                from src.temporal_filter import TemporalConsistencyFilter
+            except ImportError:
+                TemporalConsistencyFilter = None
+            if TemporalConsistencyFilter is not None:
+                if self._temporal_filter is None:
+                    self._temporal_filter = TemporalConsistencyFilter()
+                temporal_filter = self._temporal_filter
+                stages.append(
+                    Stage(
+                        "temporal_filter",
+                        lambda batch, _inputs: temporal_filter.filter_batch(batch),
+                    )
+                )
+
+        try:
+            from src.uap_uai import LandingZoneVerifier, determine_landing_status_batch
+        except ImportError:
+            determine_landing_status_batch = None
+        if determine_landing_status_batch is not None:
+            landing_verifier = None
+            if bool(getattr(Settings, "UAP_CV_VERIFICATION", False)):
+                # Hough sonucu izlenen iniş alanı başına kareler arası önbelleklenir
+                if self._landing_verifier is None:
+                    self._landing_verifier = LandingZoneVerifier()
+                landing_verifier = self._landing_verifier
+
+            def run_landing_status(batch: DetectionBatch, inputs: Dict[str, Any]) -> DetectionBatch:
+                determine_landing_status_batch(
+                    batch, inputs["frame_w"], inputs["frame_h"], inputs["frame"], landing_verifier
+                )
+                return batch
+
+            stages.append(Stage("landing_status", run_landing_status))
+
+        return StageGraph(stages, key=key)
+
     def _standard_inference(
         self,
         frame: np.ndarray,
         inference_cfg: Dict[str, Any],
-    ) -> List[Dict]:
+        stage: str = "forward_full",
+    ) -> DetectionBatch:
+        start = time.perf_counter()
+        conf = float(inference_cfg["conf"])
+        shared_conf = self._shared_focus_conf(inference_cfg)
+        predict_conf = min(conf, shared_conf) if shared_conf is not None else conf
+        image, scale = self._model_input(frame, int(inference_cfg["imgsz"]))
         with torch.no_grad():
-            results = self.model.predict(
-                source=frame,
+            results = self._predict(
+                source=image,
                 imgsz=int(inference_cfg["imgsz"]),
-                conf=float(inference_cfg["conf"]),
+                conf=predict_conf,
                 iou=float(inference_cfg["iou"]),
                 classes=None,
-                device=self.device,
-                verbose=False,
-                save=False,
-                half=self._use_half,
                 agnostic_nms=self._resolve_nms_mode() == "agnostic",
                 max_det=int(inference_cfg["max_det"]),
                 augment=bool(inference_cfg["augment"]),
             )
-        return self._parse_results(results)
-
-    def _focused_uap_uai_inference(
-        self,
-        frame: np.ndarray,
-        inference_cfg: Dict[str, Any],
-        primary_detections: Optional[List[Dict]] = None,
-    ) -> List[Dict]:
-        if not bool(getattr(Settings, "UAP_UAI_FOCUSED_PASS_ENABLED", False)):
-            return []
-        if self.device != "cuda":
-            return []
-        if not self._uap_uai_model_class_ids:
-            return []
-
-        should_run, trigger_reason = self._should_run_uap_uai_focused_pass(
-            primary_detections or []
+        batch = self._parse_results_batch(results, scales=[scale])
+        self._record_stage_ms(stage, start)
+        if shared_conf is None:
+            return batch
+
+        # Tek forward iki tüketiciye bölünür: primary eşiği geçenler primary'ye,
+        # altında kalan UAP/UAİ satırları odaklı geçiş için saklanır
+        primary_mask = batch.scores >= conf
+        reserve_mask = ~primary_mask & np.isin(
+            batch.source_class_ids, np.asarray(self._uap_uai_model_class_ids, dtype=np.int64)
         )
-        if not should_run:
-            return []
-
+        self._shared_focus_batch = batch.select(reserve_mask)
+        self._shared_focus_key = (int(inference_cfg["imgsz"]), float(predict_conf))
+        if bool(primary_mask.all()):
+            return batch
+        return batch.select(primary_mask)
+
+    def _focused_pass_params(self, inference_cfg: Dict[str, Any]) -> Tuple[float, float, int]:
+        """Odaklı geçiş için (temel conf, kurtarma conf tabanı, imgsz)."""
         base_focus_conf = float(
             getattr(
                 Settings,
@@ -600,168 +1122,762 @@ class ObjectDetector:
         rescue_floor_conf = float(
             getattr(Settings, "UAP_UAI_RESCUE_MIN_CONF", base_focus_conf)
         )
+        focus_imgsz = max(
+            256,
+            int(getattr(Settings, "UAP_UAI_FOCUSED_PASS_IMG_SIZE", inference_cfg["imgsz"])),
+        )
+        return base_focus_conf, rescue_floor_conf, focus_imgsz
+
+    @staticmethod
+    def _focused_pass_enabled(inference_cfg: Dict[str, Any]) -> bool:
+        if not bool(getattr(Settings, "UAP_UAI_FOCUSED_PASS_ENABLED", False)):
+            return False
+        return bool(inference_cfg.get("focused_pass", True))
+
+    def _shared_focus_conf(self, inference_cfg: Dict[str, Any]) -> Optional[float]:
+        """Primary forward odaklı geçişi de karşılayabiliyorsa gereken en düşük conf.
+
+        Odaklı geçiş aynı imgsz ile, augment'siz ve sınıf-bazlı NMS ile çalışır; primary
+        bu koşulları sağlıyorsa ikinci forward'un ham çıktısı primary'nin bir alt kümesidir.
+        """
+        if not bool(getattr(Settings, "UAP_UAI_FOCUSED_PASS_SHARED_FORWARD", True)):
+            return None
+        if not self._focused_pass_enabled(inference_cfg):
+            return None
+        if self.device != "cuda" or not self._uap_uai_model_class_ids:
+            return None
+        if bool(inference_cfg.get("augment", False)) or self._resolve_nms_mode() == "agnostic":
+            return None
+        base_focus_conf, rescue_floor_conf, focus_imgsz = self._focused_pass_params(inference_cfg)
+        if focus_imgsz != int(inference_cfg["imgsz"]):
+            return None
+        return max(0.001, min(1.0, base_focus_conf, rescue_floor_conf))
+
+    def _focused_uap_uai_inference(
+        self,
+        frame: np.ndarray,
+        inference_cfg: Dict[str, Any],
+        primary_detections: Optional[DetectionBatch] = None,
+        escalated: Optional[bool] = None,
+    ) -> DetectionBatch:
+        """UAP/UAİ odaklı ek geçiş.
+
+        ``escalated`` kaskad kararını taşır: None → kendi tetikleyicisi, False → atla,
+        True → kaskad yükseltmesi olarak çalıştır.
+        """
+        shared = self._shared_focus_batch
+        shared_key = self._shared_focus_key
+        self._shared_focus_batch = None
+        self._shared_focus_key = None
+        if not self._focused_pass_enabled(inference_cfg):
+            return DetectionBatch.empty()
+        if self.device != "cuda":
+            return DetectionBatch.empty()
+        if not self._uap_uai_model_class_ids:
+            return DetectionBatch.empty()
+
+        if escalated is None:
+            should_run, trigger_reason = self._should_run_uap_uai_focused_pass(
+                primary_detections if primary_detections is not None else DetectionBatch.empty()
+            )
+        else:
+            should_run, trigger_reason = bool(escalated), "cascade"
+        if not should_run:
+            return DetectionBatch.empty()
+
+        base_focus_conf, rescue_floor_conf, focus_imgsz = self._focused_pass_params(
+            inference_cfg
+        )
         focus_conf = (
             min(base_focus_conf, rescue_floor_conf)
             if trigger_reason != "interval"
             else base_focus_conf
         )
         focus_conf = max(0.001, min(1.0, focus_conf))
-        focus_imgsz = max(
-            256,
-            int(getattr(Settings, "UAP_UAI_FOCUSED_PASS_IMG_SIZE", inference_cfg["imgsz"])),
-        )
 
-        with torch.no_grad():
-            results = self.model.predict(
-                source=frame,
-                imgsz=focus_imgsz,
-                conf=focus_conf,
-                iou=float(inference_cfg["iou"]),
-                device=self.device,
-                verbose=False,
-                save=False,
-                half=self._use_half,
-                classes=list(self._uap_uai_model_class_ids),
-                agnostic_nms=False,
-                max_det=int(inference_cfg["max_det"]),
-                augment=False,
-            )
-        focused = self._parse_results(results)
-        if bool(getattr(Settings, "DEBUG", False)) and focused:
-            cls_counts = Counter(str(d.get("cls", "")) for d in focused)
+        if (
+            shared is not None
+            and shared_key is not None
+            and shared_key[0] == focus_imgsz
+            and shared_key[1] <= focus_conf
+        ):
+            # Primary forward bu eşiğe kadar inmişti → ikinci forward gerekmez
+            focused = shared.select(shared.scores >= focus_conf)
+            source = "shared"
+        else:
+            start = time.perf_counter()
+            image, scale = self._model_input(frame, focus_imgsz)
+            with torch.no_grad():
+                results = self._predict(
+                    source=image,
+                    imgsz=focus_imgsz,
+                    conf=focus_conf,
+                    iou=float(inference_cfg["iou"]),
+                    classes=list(self._uap_uai_model_class_ids),
+                    agnostic_nms=False,
+                    max_det=int(inference_cfg["max_det"]),
+                    augment=False,
+                )
+            focused = self._parse_results_batch(results, scales=[scale])
+            self._record_stage_ms("forward_focused", start)
+            source = "forward"
+        if bool(getattr(Settings, "DEBUG", False)) and len(focused) > 0:
             self.log.debug(
                 "FocusedPass(UAP/UAİ) "
-                f"total={len(focused)} uap={cls_counts.get('2', 0)} "
-                f"uai={cls_counts.get('3', 0)} conf={focus_conf:.2f} "
-                f"imgsz={focus_imgsz} trigger={trigger_reason}"
+                f"total={len(focused)} "
+                f"uap={int(np.count_nonzero(focused.class_ids == Settings.CLASS_UAP))} "
+                f"uai={int(np.count_nonzero(focused.class_ids == Settings.CLASS_UAI))} "
+                f"conf={focus_conf:.2f} "
+                f"imgsz={focus_imgsz} trigger={trigger_reason} source={source}"
             )
         return focused
 
+    def _latency_table_filters(self) -> Dict[str, Any]:
+        return {
+            "half": bool(self._use_half),
+            "backend": self._inference_backend_name(),
+            "max_imgsz": int(Settings.INFERENCE_SIZE),
+        }
+
+    def _apply_latency_table(self, inference_cfg: Dict[str, Any]) -> Dict[str, Any]:
+        """Light profile: LIGHT_PROFILE_* sabitleri yerine bu makinede ölçülmüş, tespit
+        bütçesine sığan en kaliteli (imgsz, SAHI, odaklı geçiş) konfigürasyonu."""
+        from src.latency_table import detection_budget_ms, load_latency_table
+
+        table = load_latency_table()
+        if table is None:
+            return inference_cfg
+        entry = table.select(detection_budget_ms(), **self._latency_table_filters())
+        if entry is None:
+            return inference_cfg
+        return dict(
+            inference_cfg,
+            imgsz=int(entry["imgsz"]),
+            sahi_enabled=bool(entry["sahi"]),
+            focused_pass=bool(entry["focused"]),
+        )
+
+    def _apply_altitude_plan(
+        self,
+        inference_cfg: Dict[str, Any],
+        runtime_profile: str,
+        altitude: Any,
+    ) -> Dict[str, Any]:
+        """ALTITUDE_PLAN_TABLE'dan imgsz / SAHI / tile boyutu ve örtüşmesini uygular.
+
+        Light profile'da plan yalnızca hesabı azaltabilir (imgsz = min, SAHI = ve).
+        """
+        if not bool(getattr(Settings, "ALTITUDE_PLAN_ENABLED", False)):
+            self._last_altitude_plan = {}
+            return inference_cfg
+        if self._altitude_planner is None:
+            from src.altitude_plan import AltitudePlanner
+
+            self._altitude_planner = AltitudePlanner()
+        plan = self._altitude_planner.plan(altitude)
+        cfg = self._merge_altitude_plan(inference_cfg, runtime_profile, plan)
+        self._last_altitude_plan = {
+            **plan,
+            "imgsz": int(cfg["imgsz"]),
+            "sahi_enabled": bool(cfg["sahi_enabled"]),
+        }
+        return cfg
+
+    @staticmethod
+    def _merge_altitude_plan(
+        inference_cfg: Dict[str, Any],
+        runtime_profile: str,
+        plan: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        cfg = dict(inference_cfg)
+        if runtime_profile == "light":
+            cfg["imgsz"] = min(int(cfg["imgsz"]), plan["imgsz"])
+            cfg["sahi_enabled"] = bool(cfg["sahi_enabled"]) and plan["sahi_enabled"]
+        else:
+            cfg["imgsz"] = plan["imgsz"]
+            cfg["sahi_enabled"] = plan["sahi_enabled"]
+        cfg["slice_size"] = plan["slice_size"]
+        cfg["slice_overlap"] = plan["slice_overlap"]
+        return cfg
+
+    @staticmethod
+    def _apply_runtime_plan(inference_cfg: Dict[str, Any], plan: Any) -> Dict[str, Any]:
+        """Gecikme kontrolcüsünün kare planını uygular (yalnızca hesabı azaltır).
+
+        Plan Settings'e yazılmaz; imgsz / max_det üst sınır, conf tabanları alt sınırdır.
+        """
+        if plan is None:
+            return inference_cfg
+        cfg = dict(inference_cfg)
+        if plan.imgsz:
+            cfg["imgsz"] = min(int(cfg["imgsz"]), int(plan.imgsz))
+        if plan.max_det:
+            cfg["max_det"] = min(int(cfg["max_det"]), int(plan.max_det))
+        cfg["sahi_enabled"] = bool(cfg["sahi_enabled"]) and plan.sahi_enabled
+        cfg["augment"] = bool(cfg["augment"]) and plan.augment
+        if not plan.focused_pass:
+            cfg["focused_pass"] = False
+        if plan.conf_floor is not None or plan.uap_uai_conf_floor is not None:
+            cfg["conf_floor"] = plan.conf_floor
+            cfg["uap_uai_conf_floor"] = plan.uap_uai_conf_floor
+            conf_global, conf_uap_uai = ObjectDetector._confidence_thresholds(
+                plan.conf_floor, plan.uap_uai_conf_floor
+            )
+            cfg["conf"] = max(float(cfg["conf"]), min(conf_global, conf_uap_uai))
+        cfg["runtime_plan"] = plan.name
+        return cfg
+
+    def _altitude_plan_metrics(self) -> Dict[str, Any]:
+        plan = getattr(self, "_last_altitude_plan", None) or {}
+        return {"altitude_plan": dict(plan)} if plan else {}
+
+    def _cascade_active(self, inference_cfg: Dict[str, Any]) -> bool:
+        if not bool(getattr(Settings, "CASCADE_ENABLED", False)):
+            return False
+        cheap = int(getattr(Settings, "CASCADE_CHEAP_IMG_SIZE", 640))
+        return cheap < int(inference_cfg["imgsz"]) or bool(inference_cfg["sahi_enabled"])
+
+    def _cascade_inference(
+        self,
+        frame: np.ndarray,
+        inference_cfg: Dict[str, Any],
+    ) -> Tuple[DetectionBatch, bool]:
+        """Ucuz geçiş; yalnızca sinyaller gerektiriyorsa tam geçiş / SAHI / odaklı geçiş.
+
+        Dönüş: (primary batch, odaklı geçiş yükseltildi mi).
+        """
+        conf = float(inference_cfg["conf"])
+        cheap_cfg = dict(
+            inference_cfg,
+            imgsz=min(int(getattr(Settings, "CASCADE_CHEAP_IMG_SIZE", 640)), int(inference_cfg["imgsz"])),
+            conf=min(conf, float(getattr(Settings, "CASCADE_CANDIDATE_CONF", 0.10))),
+        )
+        start = time.perf_counter()
+        candidates = self._standard_inference(frame, inference_cfg=cheap_cfg, stage="forward_cascade")
+        # Ucuz geçişin (daha düşük imgsz) ortak forward ayrımı odaklı geçişe uymaz
+        self._shared_focus_batch = None
+        self._shared_focus_key = None
+        cheap_ms = (time.perf_counter() - start) * 1000.0
+        confident = candidates.scores >= conf
+        primary = candidates if bool(confident.all()) else candidates.select(confident)
+
+        reasons = self._cascade_signals(candidates, confident)
+        targets: List[str] = []
+        if "small_boxes" in reasons and inference_cfg["sahi_enabled"]:
+            targets.append("sahi")
+        elif reasons.keys() & {"small_boxes", "low_conf"} and int(cheap_cfg["imgsz"]) < int(inference_cfg["imgsz"]):
+            # Aynı imgsz'de tam geçiş ucuz geçişi tekrarlar; güvenli alt küme zaten primary
+            targets.append("full")
+        focus_escalation = "uap_uai_absent" in reasons
+        if focus_escalation:
+            targets.append("focused")
+
+        start = time.perf_counter()
+        if "sahi" in targets:
+            primary = self._sahi_detect(frame, inference_cfg=inference_cfg)
+        elif "full" in targets:
+            primary = self._standard_inference(frame, inference_cfg=inference_cfg)
+        escalation_ms = (time.perf_counter() - start) * 1000.0
+
+        self._last_cascade_stats = {
+            "cascade_escalated": bool(targets),
+            "cascade_targets": targets,
+            "cascade_reasons": reasons,
+            "cascade_cheap_ms": cheap_ms,
+            "cascade_escalation_ms": escalation_ms,
+        }
+        return primary, focus_escalation
+
+    def _cascade_signals(self, candidates: DetectionBatch, confident: np.ndarray) -> Dict[str, int]:
+        """Ucuz geçiş çıktısından yükseltme sinyalleri (sinyal → sayı)."""
+        reasons: Dict[str, int] = {}
+        low_conf = int(np.count_nonzero(~confident))
+        if low_conf >= max(1, int(getattr(Settings, "CASCADE_LOW_CONF_MIN_COUNT", 2))):
+            reasons["low_conf"] = low_conf
+
+        if len(candidates):
+            short_side = np.minimum(
+                candidates.boxes[:, 2] - candidates.boxes[:, 0],
+                candidates.boxes[:, 3] - candidates.boxes[:, 1],
+            )
+            small_px = float(getattr(Settings, "MIN_BBOX_SIZE_FLOOR", 8)) * float(
+                getattr(Settings, "CASCADE_SMALL_BOX_FACTOR", 3.0)
+            )
+            small = int(np.count_nonzero(short_side < small_px))
+            if small >= max(1, int(getattr(Settings, "CASCADE_SMALL_BOX_MIN_COUNT", 3))):
+                reasons["small_boxes"] = small
+
+        has_uap_uai = bool(candidates.class_mask((Settings.CLASS_UAP, Settings.CLASS_UAI)).any())
+        streak_limit = max(1, int(getattr(Settings, "CASCADE_UAP_UAI_ABSENT_STREAK", 2)))
+        if not has_uap_uai and int(self._uap_uai_absent_streak) + 1 >= streak_limit:
+            reasons["uap_uai_absent"] = int(self._uap_uai_absent_streak) + 1
+        return reasons
+
+    def _cascade_metrics(self) -> Dict[str, Any]:
+        stats = getattr(self, "_last_cascade_stats", None) or {}
+        if not stats:
+            return {}
+        return {
+            "cascade_escalated": bool(stats.get("cascade_escalated", False)),
+            "cascade_targets": list(stats.get("cascade_targets", [])),
+            "cascade_reasons": dict(stats.get("cascade_reasons", {})),
+            "cascade_cheap_ms": round(float(stats.get("cascade_cheap_ms", 0.0)), 3),
+            "cascade_escalation_ms": round(float(stats.get("cascade_escalation_ms", 0.0)), 3),
+        }
+
     def _sahi_detect(
         self,
         frame: np.ndarray,
         inference_cfg: Dict[str, Any],
-    ) -> List[Dict]:
+    ) -> DetectionBatch:
         # Full-frame + parçalı inference birleştir, NMS ile duplikasyonu temizle
-        all_detections: List[Dict] = []
-        full_dets = self._standard_inference(frame, inference_cfg=inference_cfg)
-        all_detections.extend(full_dets)
-        slice_dets = self._sliced_inference(frame, inference_cfg=inference_cfg)
-        all_detections.extend(slice_dets)
-        return all_detections
+        h, w = frame.shape[:2]
+        windows = self._compute_slice_windows(h, w, *self._slice_params(inference_cfg))
+        selected = np.ones(len(windows), dtype=bool)
+        reasons: Dict[str, int] = {}
+        full_dets: Optional[DetectionBatch] = None
+        if bool(getattr(Settings, "SAHI_ADAPTIVE_ENABLED", False)):
+            # Tile seçimi full-frame sonucuna bağlı → full-frame ayrı çalışmak zorunda
+            full_dets = self._standard_inference(frame, inference_cfg=inference_cfg)
+            selected, reasons = self._select_adaptive_tiles(frame, windows, full_dets)
+
+        cache = self._get_tile_cache()
+        reuse = np.zeros(len(windows), dtype=bool)
+        if cache is not None:
+            reuse = selected & cache.plan(frame, windows, self._current_frame_index())
+        self._last_sahi_tile_stats = self._sahi_tile_stats(
+            len(windows), selected, reasons, reused=int(np.count_nonzero(reuse))
+        )
+
+        include_full_frame = full_dets is None and self._can_batch_full_frame_with_tiles(
+            inference_cfg
+        )
+        if full_dets is None and not include_full_frame:
+            full_dets = self._standard_inference(frame, inference_cfg=inference_cfg)
+        run_idx = np.flatnonzero(selected & ~reuse)
+        results, offsets, scales = self._predict_tiles(
+            frame, inference_cfg, windows[run_idx], include_full_frame=include_full_frame
+        )
+        tile_dets = self._parse_results_batch(results, offsets=offsets, scales=scales)
+        if cache is not None:
+            tile_dets = self._merge_reused_tiles(
+                cache, selected, reuse, run_idx, results, tile_dets, include_full_frame
+            )
+        return DetectionBatch.concat([full_dets, tile_dets])
+
+    def _current_frame_index(self) -> int:
+        return self._frame_count if self._frame_index is None else int(self._frame_index)
+
+    def _get_tile_cache(self) -> Optional[TileReuseCache]:
+        if not bool(getattr(Settings, "SAHI_TILE_REUSE_ENABLED", False)):
+            self._tile_cache = None
+            return None
+        if self._tile_cache is None:
+            self._tile_cache = TileReuseCache()
+        return self._tile_cache
+
+    def _merge_reused_tiles(
+        self,
+        cache: TileReuseCache,
+        selected: np.ndarray,
+        reuse: np.ndarray,
+        run_idx: np.ndarray,
+        results: List[Any],
+        fresh: DetectionBatch,
+        include_full_frame: bool,
+    ) -> DetectionBatch:
+        """Yeni tile tespitlerini tekrar kullanılanlarla birleştirir ve cache'i günceller."""
+        result_tiles = np.concatenate(
+            [np.full(1 if include_full_frame else 0, -1, dtype=np.int64), run_idx]
+        ).astype(np.int64)
+        row_counts = [self._result_row_count(result) for result in results]
+        if sum(row_counts) != len(fresh):
+            # Satır-tile eşlemesi kurulamıyor → bu kare tekrar kullanıma girmez
+            cache.reset()
+            return fresh
+        row_tiles = np.repeat(result_tiles, row_counts)
+        reused_dets, reused_tiles = cache.reused(reuse)
+        is_tile_row = row_tiles >= 0
+        cache.commit(
+            selected,
+            DetectionBatch.concat([fresh.select(is_tile_row), reused_dets]),
+            np.concatenate([row_tiles[is_tile_row], reused_tiles]),
+        )
+        return DetectionBatch.concat([fresh, reused_dets])
+
+    def _select_adaptive_tiles(
+        self,
+        frame: np.ndarray,
+        windows: np.ndarray,
+        full_dets: DetectionBatch,
+    ) -> Tuple[np.ndarray, Dict[str, int]]:
+        """Full-frame tespitlerine göre çalıştırılacak tile'ları seçer.
+
+        Küçük veya düşük güvenli kutu merkezi içeren tile'lar ve dokulu bölgeler
+        çalışır; kanıtsız ve düşük dokulu (boş zemin) tile'lar atlanır. UAP/UAİ
+        uzun süredir görülmüyorsa veya periyodik tazeleme karesindeysek tüm grid çalışır.
+        """
+        count = len(windows)
+        reasons: Dict[str, int] = {}
+        if count == 0:
+            return np.zeros(0, dtype=bool), reasons
+
+        refresh_interval = int(getattr(Settings, "SAHI_ADAPTIVE_FULL_REFRESH_INTERVAL", 15))
+        if refresh_interval > 0 and self._current_frame_index() % refresh_interval == 0:
+            reasons["refresh"] = count
+            return np.ones(count, dtype=bool), reasons
+        absent_streak = max(1, int(getattr(Settings, "SAHI_ADAPTIVE_ABSENT_STREAK", 3)))
+        if int(self._uap_uai_absent_streak) >= absent_streak:
+            reasons["absent_streak"] = count
+            return np.ones(count, dtype=bool), reasons
+
+        # Kanıt: kutu merkezi tile içinde olan küçük / düşük güvenli tespitler
+        small_px = float(getattr(Settings, "SAHI_ADAPTIVE_SMALL_BOX_PX", 48))
+        low_conf = float(getattr(Settings, "SAHI_ADAPTIVE_LOW_CONF", 0.45))
+        small = np.maximum(full_dets.widths(), full_dets.heights()) < small_px
+        uncertain = full_dets.scores < low_conf
+        cx = (full_dets.boxes[:, 0] + full_dets.boxes[:, 2]) * 0.5
+        cy = (full_dets.boxes[:, 1] + full_dets.boxes[:, 3]) * 0.5
+        inside = (
+            (cx[None, :] >= windows[:, 0:1])
+            & (cx[None, :] < windows[:, 2:3])
+            & (cy[None, :] >= windows[:, 1:2])
+            & (cy[None, :] < windows[:, 3:4])
+        )  # (K, N)
+        small_hits = np.count_nonzero(inside & small[None, :], axis=1)
+        uncertain_hits = np.count_nonzero(inside & uncertain[None, :], axis=1)
+        evidence = small_hits + uncertain_hits
+
+        texture = self._tile_texture_scores(frame, windows)
+        textured = texture >= float(getattr(Settings, "SAHI_ADAPTIVE_TEXTURE_MIN", 6.0))
+        selected = (evidence > 0) | textured
+
+        max_tiles = int(getattr(Settings, "SAHI_ADAPTIVE_MAX_TILES", 0))
+        if max_tiles > 0 and int(np.count_nonzero(selected)) > max_tiles:
+            # Önce kanıt sayısı, sonra doku skoru yüksek olan tile'lar
+            ranked = np.lexsort((-texture, -evidence))
+            ranked = ranked[selected[ranked]][:max_tiles]
+            selected = np.zeros(count, dtype=bool)
+            selected[ranked] = True
+
+        reasons["small_box"] = int(np.count_nonzero(selected & (small_hits > 0)))
+        reasons["low_conf"] = int(np.count_nonzero(selected & (uncertain_hits > 0)))
+        reasons["texture"] = int(np.count_nonzero(selected & (evidence == 0)))
+        return selected, reasons
+
+    @staticmethod
+    def _tile_texture_scores(frame: np.ndarray, windows: np.ndarray) -> np.ndarray:
+        """Her tile için küçültülmüş gri görüntüde ortalama |Laplacian| döndürür."""
+        scale = float(getattr(Settings, "SAHI_ADAPTIVE_TEXTURE_SCALE", 0.125))
+        scale = min(1.0, max(0.01, scale))
+        small = downscaled_gray(frame, scale)
+        lap = np.abs(cv2.Laplacian(small, cv2.CV_32F, ksize=1))
+        return window_means(lap, windows, scale)
+
+    @staticmethod
+    def _sahi_tile_stats(
+        total: int, selected: np.ndarray, reasons: Dict[str, int], reused: int = 0
+    ) -> Dict[str, Any]:
+        covered = int(np.count_nonzero(selected))
+        return {
+            "sahi_tiles_total": int(total),
+            "sahi_tiles_run": covered - int(reused),
+            "sahi_tiles_reused": int(reused),
+            "sahi_tiles_skipped": int(total) - covered,
+            "sahi_tile_reasons": dict(reasons),
+        }
+
+    @staticmethod
+    def _can_batch_full_frame_with_tiles(inference_cfg: Dict[str, Any]) -> bool:
+        """Full-frame pass tile batch'ine ancak aynı imgsz ile çalışıyorsa katılabilir."""
+        if not bool(getattr(Settings, "SAHI_BATCHED_INFERENCE", True)):
+            return False
+        if not bool(getattr(Settings, "SAHI_BATCH_INCLUDE_FULL_FRAME", False)):
+            return False
+        return int(inference_cfg["imgsz"]) == ObjectDetector._slice_params(inference_cfg)[0]
+
+    @staticmethod
+    def _slice_params(inference_cfg: Dict[str, Any]) -> Tuple[int, float]:
+        """(tile boyutu, örtüşme); irtifa planı yoksa SAHI_SLICE_SIZE / SAHI_OVERLAP_RATIO."""
+        return (
+            int(inference_cfg.get("slice_size", Settings.SAHI_SLICE_SIZE)),
+            float(inference_cfg.get("slice_overlap", Settings.SAHI_OVERLAP_RATIO)),
+        )
+
+    @staticmethod
+    def _compute_slice_windows(
+        frame_h: int,
+        frame_w: int,
+        slice_size: int,
+        overlap: float,
+    ) -> np.ndarray:
+        """SAHI tile pencerelerini (x1, y1, x2, y2) satır-öncelikli sırada döndürür.
+
+        Yarım tile'dan küçük kenar parçaları atlanır (eski döngü ile birebir aynı grid).
+        """
+        slice_size = max(1, int(slice_size))
+        step = max(1, int(slice_size * (1 - float(overlap))))
+        ys = np.arange(0, int(frame_h), step, dtype=np.int64)
+        xs = np.arange(0, int(frame_w), step, dtype=np.int64)
+        if ys.size == 0 or xs.size == 0:
+            return np.zeros((0, 4), dtype=np.int64)
+
+        y1, x1 = np.meshgrid(ys, xs, indexing="ij")
+        x1 = x1.ravel()
+        y1 = y1.ravel()
+        x2 = np.minimum(x1 + slice_size, int(frame_w))
+        y2 = np.minimum(y1 + slice_size, int(frame_h))
+        keep = ((x2 - x1) >= slice_size // 2) & ((y2 - y1) >= slice_size // 2)
+        return np.stack([x1, y1, x2, y2], axis=1)[keep]
 
     def _sliced_inference(
         self,
         frame: np.ndarray,
         inference_cfg: Dict[str, Any],
-    ) -> List[Dict]:
-        h, w = frame.shape[:2]
-        slice_size = Settings.SAHI_SLICE_SIZE
-        overlap = Settings.SAHI_OVERLAP_RATIO
-        step = int(slice_size * (1 - overlap))
+        include_full_frame: bool = False,
+        windows: Optional[np.ndarray] = None,
+    ) -> DetectionBatch:
+        if windows is None:
+            h, w = frame.shape[:2]
+            windows = self._compute_slice_windows(h, w, *self._slice_params(inference_cfg))
+        results, offsets, scales = self._predict_tiles(
+            frame, inference_cfg, windows, include_full_frame=include_full_frame
+        )
+        return self._parse_results_batch(results, offsets=offsets, scales=scales)
+
+    def _predict_tiles(
+        self,
+        frame: np.ndarray,
+        inference_cfg: Dict[str, Any],
+        windows: np.ndarray,
+        include_full_frame: bool = False,
+    ) -> Tuple[List[Any], List[Tuple[int, int]], List[Tuple[float, float]]]:
+        """Tile'ları (ve istenirse full-frame'i) batch'ler halinde çalıştırır.
+
+        Sonuçlar, ofsetler ve ölçekler kaynak sırasıyla döner (full-frame varsa ilk sırada).
+        """
+        slice_size = self._slice_params(inference_cfg)[0]
+
+        # Full-frame pass batch'e (0, 0) ofsetli bir "tile" olarak eklenir.
+        sources: List[np.ndarray] = []
+        offsets: List[Tuple[int, int]] = []
+        scales: List[Tuple[float, float]] = []
+        if include_full_frame:
+            image, scale = self._model_input(frame, slice_size)
+            sources.append(image)
+            offsets.append((0, 0))
+            scales.append(scale)
+        for x1, y1, x2, y2 in windows.tolist():
+            sources.append(self._tile_input(frame[y1:y2, x1:x2]))
+            offsets.append((x1, y1))
+            scales.append((1.0, 1.0))
+        if not sources:
+            return [], [], []
+
+        if bool(getattr(Settings, "SAHI_BATCHED_INFERENCE", True)):
+            batch_size = max(1, int(getattr(Settings, "SAHI_MAX_BATCH_SIZE", 8)))
+        else:
+            batch_size = 1
 
-        all_slice_dets: List[Dict] = []
+        agnostic = self._resolve_nms_mode() == "agnostic"
+        all_results: List[Any] = []
 
         with torch.no_grad():
-            for y_start in range(0, h, step):
-                for x_start in range(0, w, step):
-                    x_end = min(x_start + slice_size, w)
-                    y_end = min(y_start + slice_size, h)
-
-                    if (x_end - x_start) < slice_size // 2 or \
-                       (y_end - y_start) < slice_size // 2:
-                        continue
-
-                    tile = frame[y_start:y_end, x_start:x_end]
-
-                    results = self.model.predict(
-                        source=tile,
-                        imgsz=slice_size,
-                        conf=float(inference_cfg["conf"]),
-                        iou=float(inference_cfg["iou"]),
-                        classes=None,
-                        device=self.device,
-                        verbose=False,
-                        save=False,
-                        half=self._use_half,
-                        agnostic_nms=self._resolve_nms_mode() == "agnostic",
-                        max_det=int(inference_cfg["max_det"]),
-                        augment=bool(inference_cfg["augment"]),
-                    )
+            for start in range(0, len(sources), batch_size):
+                chunk = sources[start:start + batch_size]
+                chunk_start = time.perf_counter()
+                results = self._predict(
+                    source=chunk if len(chunk) > 1 else chunk[0],
+                    imgsz=slice_size,
+                    conf=float(inference_cfg["conf"]),
+                    iou=float(inference_cfg["iou"]),
+                    classes=None,
+                    agnostic_nms=agnostic,
+                    max_det=int(inference_cfg["max_det"]),
+                    augment=bool(inference_cfg["augment"]),
+                )
+                all_results.extend(results)
+                full_in_chunk = 1 if include_full_frame and start == 0 else 0
+                self._record_tile_chunk_ms(chunk_start, len(chunk) - full_in_chunk)
+
+        return all_results, offsets, scales
+
+    @classmethod
+    def _result_row_count(cls, result: Any) -> int:
+        """_parse_results_batch'in bu sonuçtan üreteceği satır sayısı."""
+        boxes = getattr(result, "boxes", None)
+        if boxes is None:
+            return 0
+        data = getattr(boxes, "data", None)
+        if data is not None:
+            shape = getattr(data, "shape", None)
+            if shape is None or len(shape) != 2:
+                return 0
+            return int(shape[0])
+        return int(cls._tensor_to_numpy(boxes.conf).reshape(-1).shape[0])
 
-                    tile_dets = self._parse_results(results)
-                    for det in tile_dets:
-                        det["top_left_x"] += x_start
-                        det["top_left_y"] += y_start
-                        det["bottom_right_x"] += x_start
-                        det["bottom_right_y"] += y_start
-                        det["bbox"] = (
-                            det["top_left_x"],
-                            det["top_left_y"],
-                            det["bottom_right_x"],
-                            det["bottom_right_y"],
-                        )
-                    all_slice_dets.extend(tile_dets)
-
-        return all_slice_dets
-
-    def _parse_results(self, results) -> List[Dict]:
-        detections: List[Dict] = []
-        for result in results:
-            if result.boxes is None:
+    @staticmethod
+    def _tensor_to_numpy(value: Any) -> np.ndarray:
+        """Tensor/array değerini tek transferle NumPy'ye taşır."""
+        if hasattr(value, "detach"):
+            value = value.detach()
+        if hasattr(value, "cpu"):
+            value = value.cpu()
+        if hasattr(value, "numpy"):
+            value = value.numpy()
+        return np.asarray(value)
+
+    def _parse_results_batch(
+        self,
+        results,
+        offsets: Optional[List[Tuple[int, int]]] = None,
+        scales: Optional[List[Tuple[float, float]]] = None,
+    ) -> DetectionBatch:
+        """Ultralytics sonuçlarını kolonsal DetectionBatch'e çevirir.
+
+        Her sonuç için ``boxes.data`` tek transferle NumPy'ye taşınır; sınıf eşlemesi
+        lookup dizisiyle, küçültülmüş girdi ölçekleri (``scales``) ve tile ofsetleri
+        (``offsets``) dizi çarpımı/toplamasıyla uygulanır.
+        """
+        data_parts: List[np.ndarray] = []
+        offset_parts: List[np.ndarray] = []
+        scale_parts: List[np.ndarray] = []
+        for result_idx, result in enumerate(results):
+            boxes = result.boxes
+            if boxes is None:
                 continue
-            for box in result.boxes:
-                model_cls_id = int(box.cls[0].item())
-                conf = float(box.conf[0].item())
-                coords = box.xyxy[0].tolist()
-                x1, y1, x2, y2 = (
-                    float(coords[0]), float(coords[1]),
-                    float(coords[2]), float(coords[3]),
+            data = getattr(boxes, "data", None)
+            if data is not None:
+                rows = self._tensor_to_numpy(data).astype(np.float64)
+                if rows.ndim != 2 or rows.shape[0] == 0:
+                    continue
+                # data kolonları: x1, y1, x2, y2, [track_id,] conf, cls
+                rows = np.concatenate([rows[:, :4], rows[:, -2:]], axis=1)
+            else:
+                rows = np.concatenate(
+                    [
+                        self._tensor_to_numpy(boxes.xyxy).astype(np.float64).reshape(-1, 4),
+                        self._tensor_to_numpy(boxes.conf).astype(np.float64).reshape(-1, 1),
+                        self._tensor_to_numpy(boxes.cls).astype(np.float64).reshape(-1, 1),
+                    ],
+                    axis=1,
+                )
+            if rows.shape[0] == 0:
+                continue
+            data_parts.append(rows)
+            if scales is not None:
+                sx, sy = scales[result_idx]
+                scale_parts.append(
+                    np.tile(np.array([sx, sy, sx, sy], dtype=np.float64), (rows.shape[0], 1))
+                )
+            if offsets is not None:
+                dx, dy = offsets[result_idx]
+                offset_parts.append(
+                    np.tile(np.array([dx, dy, dx, dy], dtype=np.float64), (rows.shape[0], 1))
                 )
 
-                tf_id = self._map_model_class_to_teknofest(model_cls_id)
-
-                detections.append({
-                    "trace_id": self._next_trace_id(),
-                    "cls_int": tf_id,
-                    "cls": str(tf_id),
-                    "class_label": CompetitionClassContract.display_name(tf_id),
-                    "source_cls_id": model_cls_id,
-                    "confidence": int(conf * 10000) / 10000,
-                    "top_left_x": round(x1, 2),
-                    "top_left_y": round(y1, 2),
-                    "bottom_right_x": round(x2, 2),
-                    "bottom_right_y": round(y2, 2),
-                    "bbox": (x1, y1, x2, y2),
-                })
-        return detections
-
-    def _next_trace_id(self) -> str:
-        self._trace_seq += 1
-        return f"f{self._frame_count:06d}-d{self._trace_seq:08d}"
+        if not data_parts:
+            return DetectionBatch.empty()
+
+        rows = np.concatenate(data_parts, axis=0)
+        boxes_xyxy = rows[:, :4]
+        if scale_parts:
+            boxes_xyxy = boxes_xyxy * np.concatenate(scale_parts, axis=0)
+        if offset_parts:
+            boxes_xyxy = boxes_xyxy + np.concatenate(offset_parts, axis=0)
+        model_cls_ids = rows[:, 5].astype(np.int64)
+        count = rows.shape[0]
+        trace_seqs = np.arange(
+            self._trace_seq + 1, self._trace_seq + 1 + count, dtype=np.int64
+        )
+        self._trace_seq += count
+
+        return DetectionBatch(
+            boxes=np.ascontiguousarray(boxes_xyxy),
+            scores=np.trunc(rows[:, 4] * 10000) / 10000,
+            class_ids=self._map_model_classes_to_teknofest(model_cls_ids),
+            source_class_ids=model_cls_ids,
+            trace_frames=np.full(count, int(self._frame_count), dtype=np.int64),
+            trace_seqs=trace_seqs,
+        )
+
+    def _parse_results(
+        self,
+        results,
+        offsets: Optional[List[Tuple[int, int]]] = None,
+    ) -> List[Dict]:
+        return self._parse_results_batch(results, offsets=offsets).to_dicts()
 
     @staticmethod
-    def _filter_by_confidence(detections: List[Dict]) -> List[Dict]:
+    def _confidence_thresholds(
+        conf_floor: Optional[float] = None,
+        uap_uai_conf_floor: Optional[float] = None,
+    ) -> Tuple[float, float]:
+        """(global, UAP/UAİ) güven eşikleri; gecikme planı tabanları varsa yükseltilir."""
         conf_global = float(Settings.CONFIDENCE_THRESHOLD)
+        if conf_floor is not None:
+            conf_global = max(conf_global, float(conf_floor))
         conf_uap_uai = getattr(Settings, "CONFIDENCE_THRESHOLD_UAP_UAI", None)
         if conf_uap_uai is None:
-            conf_uap_uai = conf_global
+            return conf_global, conf_global
         conf_uap_uai = float(conf_uap_uai)
+        if uap_uai_conf_floor is not None:
+            conf_uap_uai = max(conf_uap_uai, float(uap_uai_conf_floor))
+        return conf_global, conf_uap_uai
 
-        filtered: List[Dict] = []
-        for det in detections:
-            cls_int = int(det.get("cls_int", -1))
-            conf = float(det.get("confidence", 0.0))
-            threshold = conf_uap_uai if cls_int in (Settings.CLASS_UAP, Settings.CLASS_UAI) else conf_global
-            if conf >= threshold:
-                filtered.append(det)
-        return filtered
-
-    def _track_uap_uai_absence(self, detections: List[Dict]) -> None:
-        has_uap_uai = any(
-            int(det.get("cls_int", -1)) in (Settings.CLASS_UAP, Settings.CLASS_UAI)
-            for det in detections
+    @staticmethod
+    def _confidence_keep_mask(
+        scores: np.ndarray,
+        class_ids: np.ndarray,
+        conf_floor: Optional[float] = None,
+        uap_uai_conf_floor: Optional[float] = None,
+        thresholds: Optional[Tuple[float, float]] = None,
+    ) -> np.ndarray:
+        conf_global, conf_uap_uai = (
+            thresholds
+            if thresholds is not None
+            else ObjectDetector._confidence_thresholds(conf_floor, uap_uai_conf_floor)
         )
+
+        landing_zone = np.isin(class_ids, (Settings.CLASS_UAP, Settings.CLASS_UAI))
+        return scores >= np.where(landing_zone, conf_uap_uai, conf_global)
+
+    @staticmethod
+    def _filter_by_confidence(detections: List[Dict]) -> List[Dict]:
+        if not detections:
+            return []
+        scores = np.array([float(d.get("confidence", 0.0)) for d in detections])
+        class_ids = np.array([int(d.get("cls_int", -1)) for d in detections], dtype=np.int64)
+        keep = ObjectDetector._confidence_keep_mask(scores, class_ids)
+        return [det for det, kept in zip(detections, keep.tolist()) if kept]
+
+    @staticmethod
+    def _filter_by_confidence_batch(
+        batch: DetectionBatch,
+        conf_floor: Optional[float] = None,
+        uap_uai_conf_floor: Optional[float] = None,
+        thresholds: Optional[Tuple[float, float]] = None,
+    ) -> DetectionBatch:
+        if len(batch) == 0:
+            return batch
+        return batch.select(
+            ObjectDetector._confidence_keep_mask(
+                batch.scores, batch.class_ids, conf_floor, uap_uai_conf_floor, thresholds
+            )
+        )
+
+    def _track_uap_uai_absence(
+        self, detections: Union[DetectionBatch, List[Dict]]
+    ) -> None:
+        if isinstance(detections, DetectionBatch):
+            has_uap_uai = bool(
+                detections.class_mask((Settings.CLASS_UAP, Settings.CLASS_UAI)).any()
+            )
+        else:
+            has_uap_uai = any(
+                int(det.get("cls_int", -1)) in (Settings.CLASS_UAP, Settings.CLASS_UAI)
+                for det in detections
+            )
         self._prev_raw_has_uap_uai = has_uap_uai
         if has_uap_uai:
             self._uap_uai_absent_streak = 0
@@ -780,14 +1896,19 @@ class ObjectDetector:
             )
 
     @staticmethod
-    def _class_counts(detections: List[Dict]) -> Dict[str, int]:
+    def _class_counts(detections: Union[DetectionBatch, List[Dict]]) -> Dict[str, int]:
         canonical_ids = tuple(CompetitionClassContract.valid_id_strings())
         counts: Counter = Counter()
-        for det in detections:
-            raw_cls = det.get("cls")
-            if raw_cls is None:
-                raw_cls = det.get("cls_int", -1)
-            counts[str(raw_cls)] += 1
+        if isinstance(detections, DetectionBatch):
+            unique_ids, unique_counts = np.unique(detections.class_ids, return_counts=True)
+            for cls_id, cls_count in zip(unique_ids.tolist(), unique_counts.tolist()):
+                counts[str(cls_id)] = int(cls_count)
+        else:
+            for det in detections:
+                raw_cls = det.get("cls")
+                if raw_cls is None:
+                    raw_cls = det.get("cls_int", -1)
+                counts[str(raw_cls)] += 1
 
         class_counts: Dict[str, int] = {
             cls_id: int(counts.get(cls_id, 0)) for cls_id in canonical_ids
@@ -798,7 +1919,14 @@ class ObjectDetector:
         return class_counts
 
     @staticmethod
-    def _uap_uai_count_and_max_conf(detections: List[Dict]) -> Tuple[int, float]:
+    def _uap_uai_count_and_max_conf(
+        detections: Union[DetectionBatch, List[Dict]],
+    ) -> Tuple[int, float]:
+        if isinstance(detections, DetectionBatch):
+            mask = detections.class_mask((Settings.CLASS_UAP, Settings.CLASS_UAI))
+            if not mask.any():
+                return 0, 0.0
+            return int(np.count_nonzero(mask)), max(0.0, float(detections.scores[mask].max()))
         count = 0
         max_conf = 0.0
         for det in detections:
@@ -810,7 +1938,7 @@ class ObjectDetector:
         return count, max_conf
 
     def _should_run_uap_uai_focused_pass(
-        self, primary_detections: List[Dict]
+        self, primary_detections: Union[DetectionBatch, List[Dict]]
     ) -> Tuple[bool, str]:
         interval = max(1, int(getattr(Settings, "UAP_UAI_FOCUSED_PASS_INTERVAL", 2)))
         if self._frame_count % interval == 0:
@@ -848,7 +1976,7 @@ class ObjectDetector:
         self,
         stage_trace: List[Dict[str, Any]],
         stage: str,
-        detections: List[Dict],
+        detections: Union[DetectionBatch, List[Dict]],
     ) -> None:
         if not bool(getattr(Settings, "PIPELINE_STAGE_METRICS_ENABLED", True)):
             return
@@ -861,6 +1989,54 @@ class ObjectDetector:
             }
         )
 
+    def _record_stage_ms(self, stage: str, start: float) -> None:
+        """``start``'tan (perf_counter) bu yana geçen süreyi kare aşama zamanlarına ekler."""
+        if self._stage_timing_enabled:
+            self._stage_timings.append((stage, round((time.perf_counter() - start) * 1000.0, 3)))
+
+    def _record_tile_chunk_ms(self, start: float, tiles: int) -> None:
+        # Batch süresi tile başına eşit bölünür (tile'lar tek forward'da birlikte koşar)
+        if not self._stage_timing_enabled:
+            return
+        elapsed = (time.perf_counter() - start) * 1000.0
+        self._stage_timings.append(("forward_sahi_batch", round(elapsed, 3)))
+        per_tile = round(elapsed / max(1, tiles), 3)
+        self._stage_timings.extend(("sahi_tile", per_tile) for _ in range(tiles))
+
+    def _stage_hook(self, stage_trace: List[Dict[str, Any]]) -> Optional[StageHook]:
+        """Post-process grafı kancası: stage_trace sayımları ve/veya aşama süresi."""
+        collect = bool(getattr(Settings, "PIPELINE_STAGE_METRICS_ENABLED", True))
+        timing = self._stage_timing_enabled
+        if not collect and not timing:
+            return None
+
+        def hook(stage: str, batch: DetectionBatch, elapsed_ms: float) -> None:
+            if collect:
+                self._collect_stage_stats(stage_trace, stage, batch)
+            if timing:
+                self._stage_timings.append((stage, round(elapsed_ms, 3)))
+
+        return hook
+
+    def _stage_timing_metrics(self) -> Dict[str, Any]:
+        return {"stage_timings": list(getattr(self, "_stage_timings", None) or [])}
+
+    def _sahi_tile_metrics(self) -> Dict[str, Any]:
+        stats = getattr(self, "_last_sahi_tile_stats", None) or {}
+        total = int(stats.get("sahi_tiles_total", 0))
+        skipped = int(stats.get("sahi_tiles_skipped", 0))
+        return {
+            "sahi_tiles_total": total,
+            "sahi_tiles_run": int(stats.get("sahi_tiles_run", 0)),
+            "sahi_tiles_reused": int(stats.get("sahi_tiles_reused", 0)),
+            "sahi_tiles_skipped": skipped,
+            "sahi_tile_skip_ratio": round(skipped / total, 4) if total > 0 else 0.0,
+            "sahi_tile_reuse_ratio": (
+                round(int(stats.get("sahi_tiles_reused", 0)) / total, 4) if total > 0 else 0.0
+            ),
+            "sahi_tile_reasons": dict(stats.get("sahi_tile_reasons", {})),
+        }
+
     def _build_pipeline_metrics(self, stage_trace: List[Dict[str, Any]]) -> Dict[str, Any]:
         metrics: Dict[str, Any] = {
             "stage_count": 0,
@@ -875,6 +2051,10 @@ class ObjectDetector:
                 self._last_uap_uai_missing_landing_status_count
             ),
         }
+        metrics.update(self._sahi_tile_metrics())
+        metrics.update(self._cascade_metrics())
+        metrics.update(self._altitude_plan_metrics())
+        metrics.update(self._stage_timing_metrics())
         if not stage_trace:
             return metrics
 
@@ -957,18 +2137,18 @@ class ObjectDetector:
 
     def _log_nms_mode_comparison(
         self,
-        detections: List[Dict],
+        batch: DetectionBatch,
         inference_cfg: Dict[str, Any],
     ) -> None:
         if not bool(getattr(Settings, "DEBUG", False)):
             return
-        class_aware = self._merge_detections_nms(detections)
-        agnostic = self._merge_detections_nms_agnostic(
-            detections,
+        class_aware = self._merge_detections_nms_batch(batch)
+        agnostic = self._merge_detections_nms_agnostic_batch(
+            batch,
             iou_threshold=float(inference_cfg["merge_iou"]),
         )
-        aware_ids = {d.get("trace_id") for d in class_aware}
-        agnostic_ids = {d.get("trace_id") for d in agnostic}
+        aware_ids = set(class_aware.trace_ids())
+        agnostic_ids = set(agnostic.trace_ids())
         cross_class_drop = len(aware_ids - agnostic_ids)
         self.log.debug(
             "NMSCompare mode=agnostic "
@@ -985,6 +2165,10 @@ class ObjectDetector:
             return []
 
         mode = self._resolve_nms_mode()
+        if mode == "wbf":
+            return self._merge_detections_wbf_batch(
+                DetectionBatch.from_dicts(detections)
+            ).to_dicts()
         if mode == "agnostic":
             return self._merge_detections_nms_agnostic(
                 detections, iou_threshold=float(inference_cfg["merge_iou"])
@@ -997,6 +2181,82 @@ class ObjectDetector:
             )
         return self._merge_detections_nms(detections)
 
+    def _apply_runtime_nms_batch(
+        self,
+        batch: DetectionBatch,
+        inference_cfg: Dict[str, Any],
+        mode: Optional[str] = None,
+    ) -> DetectionBatch:
+        if len(batch) == 0:
+            return batch
+
+        if mode is None:
+            mode = self._resolve_nms_mode()
+        if mode == "wbf":
+            return self._merge_detections_wbf_batch(batch)
+        if mode == "agnostic":
+            return self._merge_detections_nms_agnostic_batch(
+                batch, iou_threshold=float(inference_cfg["merge_iou"])
+            )
+        if mode == "hybrid":
+            # İki geçiş aynı IoU matrisini paylaşır (numpy backend)
+            iou_matrix = None
+            if self._get_nms_runner().backend() == "numpy" and len(batch) <= int(
+                getattr(Settings, "NMS_MATRIX_MAX_BOXES", 2048)
+            ):
+                iou_matrix = pairwise_iou_f32(batch.boxes)
+            class_aware = self._merge_nms_keep(
+                batch, Settings.SAHI_MERGE_IOU, class_aware=True, iou_matrix=iou_matrix
+            )
+            hybrid = self._merge_nms_keep(
+                batch.select(class_aware),
+                float(inference_cfg["hybrid_iou"]),
+                class_aware=False,
+                iou_matrix=(
+                    iou_matrix[np.ix_(class_aware, class_aware)]
+                    if iou_matrix is not None
+                    else None
+                ),
+            )
+            return batch.select(class_aware[hybrid])
+        return self._merge_detections_nms_batch(batch)
+
+    def _get_nms_runner(self) -> NmsRunner:
+        if self._nms_runner is None:
+            self._nms_runner = NmsRunner(device=self.device)
+        return self._nms_runner
+
+    def _merge_nms_keep(
+        self,
+        batch: DetectionBatch,
+        iou_threshold: float,
+        class_aware: bool,
+        iou_matrix: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """NMS + containment sonrası korunan satır indeksleri."""
+        if len(batch) == 0:
+            return np.zeros(0, dtype=np.int64)
+        keep = self._get_nms_runner().run(
+            batch.boxes,
+            batch.scores,
+            batch.class_ids if class_aware else None,
+            float(iou_threshold),
+            iou_matrix=iou_matrix,
+        )
+        contained_keep = self._suppress_contained_indices(
+            batch.boxes[keep], batch.class_ids[keep]
+        )
+        return keep[np.asarray(contained_keep, dtype=np.int64)]
+
+    @staticmethod
+    def _class_aware_nms_indices(
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        class_ids: np.ndarray,
+        iou_threshold: float,
+    ) -> np.ndarray:
+        return class_aware_greedy_nms(boxes, scores, class_ids, iou_threshold)
+
     @staticmethod
     def _merge_detections_nms(detections: List[Dict]) -> List[Dict]:
         if not detections:
@@ -1004,31 +2264,37 @@ class ObjectDetector:
 
         boxes = np.array([d["bbox"] for d in detections], dtype=np.float32)
         scores = np.array([d["confidence"] for d in detections], dtype=np.float32)
-
         class_ids = np.array([d["cls_int"] for d in detections], dtype=np.int32)
-        unique_classes = np.unique(class_ids)
-
-        keep_indices: List[int] = []
-        for cls_id in unique_classes:
-            cls_mask = class_ids == cls_id
-            cls_indices = np.where(cls_mask)[0]
-
-            if len(cls_indices) == 0:
-                continue
-
-            cls_boxes = boxes[cls_indices]
-            cls_scores = scores[cls_indices]
-
-            nms_keep = ObjectDetector._nms_greedy(
-                cls_boxes, cls_scores, Settings.SAHI_MERGE_IOU
-            )
-            nms_indices = cls_indices[nms_keep]
-            keep_indices.extend(nms_indices.tolist())
-
-        nms_results = [detections[i] for i in keep_indices]
+        keep = ObjectDetector._class_aware_nms_indices(
+            boxes, scores, class_ids, Settings.SAHI_MERGE_IOU
+        )
+        nms_results = [detections[i] for i in keep.tolist()]
 
         return ObjectDetector._suppress_contained(nms_results)
 
+    def _merge_detections_wbf_batch(self, batch: DetectionBatch) -> DetectionBatch:
+        """SAHI tile sınırlarındaki kopyaları silmek yerine skor ağırlıklı birleştirir."""
+        if len(batch) == 0:
+            return batch
+        anchor_idx, fused_boxes, fused_scores = weighted_box_fusion(
+            batch.boxes,
+            batch.scores,
+            batch.class_ids,
+            float(getattr(Settings, "WBF_IOU_THRESHOLD", 0.55)),
+        )
+        fused = batch.select(anchor_idx)
+        fused.boxes = fused_boxes
+        fused.scores = np.trunc(fused_scores * 10000) / 10000
+        keep = self._suppress_contained_indices(fused.boxes, fused.class_ids)
+        return fused.select(np.asarray(keep, dtype=np.int64))
+
+    def _merge_detections_nms_batch(self, batch: DetectionBatch) -> DetectionBatch:
+        if len(batch) == 0:
+            return batch
+        return batch.select(
+            self._merge_nms_keep(batch, Settings.SAHI_MERGE_IOU, class_aware=True)
+        )
+
     @staticmethod
     def _merge_detections_nms_agnostic(
         detections: List[Dict],
@@ -1041,137 +2307,200 @@ class ObjectDetector:
         keep = ObjectDetector._nms_greedy(boxes, scores, float(iou_threshold))
         return ObjectDetector._suppress_contained([detections[i] for i in keep])
 
+    def _merge_detections_nms_agnostic_batch(
+        self,
+        batch: DetectionBatch,
+        iou_threshold: float,
+    ) -> DetectionBatch:
+        if len(batch) == 0:
+            return batch
+        return batch.select(self._merge_nms_keep(batch, iou_threshold, class_aware=False))
+
     @staticmethod
     def _suppress_contained(detections: List[Dict], threshold: float = 0.85) -> List[Dict]:
         if not detections:
             return []
 
         boxes = np.array([d["bbox"] for d in detections])
-        areas = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1e-6)
         cls_ints = np.array([d["cls_int"] for d in detections])
+        keep = ObjectDetector._suppress_contained_indices(boxes, cls_ints, threshold)
+        return [detections[i] for i in keep]
 
-        order = np.argsort(areas, kind="stable")[::-1]
-        keep: List[int] = []
-        is_suppressed = np.zeros(len(detections), dtype=bool)
-        landing_zone_ids = {Settings.CLASS_UAP, Settings.CLASS_UAI}
-
-        for i_idx, i in enumerate(order):
-            if is_suppressed[i]:
-                continue
-            keep.append(int(i))
+    @staticmethod
+    def _suppress_contained_indices(
+        boxes: np.ndarray, cls_ints: np.ndarray, threshold: float = 0.85
+    ) -> List[int]:
+        """Büyükten küçüğe greedy containment bastırma; korunan indeksleri döndürür.
 
-            remaining_indices = order[i_idx + 1:]
-            valid_mask = ~is_suppressed[remaining_indices] & (cls_ints[remaining_indices] == cls_ints[i])
-            valid_remaining = remaining_indices[valid_mask]
+        Aynı sınıftaki her çift için "küçük kutunun büyük kutu içinde kalan oranı"
+        tek matris olarak hesaplanır; Python döngüsü yalnızca bastırma yapabilen
+        çapa satırlarında, satır başına tek maske işlemiyle çalışır.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64)
+        cls_ints = np.asarray(cls_ints)
+        areas = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1e-6)
 
-            if len(valid_remaining) == 0:
+        order = np.argsort(areas, kind="stable")[::-1]
+        is_suppressed = np.zeros(len(boxes), dtype=bool)
+        landing_zone_ids = (Settings.CLASS_UAP, Settings.CLASS_UAI)
+        ordered_cls = cls_ints[order]
+
+        # Farklı sınıflar birbirini bastırmaz → matris sınıf bloklarına bölünür
+        for cls_id in np.unique(ordered_cls):
+            positions = np.flatnonzero(ordered_cls == cls_id)
+            if len(positions) < 2:
                 continue
+            members = order[positions]
+            cls_boxes = boxes[members]
+            cls_areas = areas[members]
+
+            inter_w = np.maximum(
+                0.0,
+                np.minimum(cls_boxes[:, None, 2], cls_boxes[None, :, 2])
+                - np.maximum(cls_boxes[:, None, 0], cls_boxes[None, :, 0]),
+            )
+            inter_h = np.maximum(
+                0.0,
+                np.minimum(cls_boxes[:, None, 3], cls_boxes[None, :, 3])
+                - np.maximum(cls_boxes[:, None, 1], cls_boxes[None, :, 1]),
+            )
+            # ios[a, b]: b kutusunun a içinde kalan oranı
+            ios = (inter_w * inter_h) / cls_areas[None, :]
 
-            box_a = boxes[i]
-            boxes_b = boxes[valid_remaining]
-            areas_b = areas[valid_remaining]
-
-            inter_x1 = np.maximum(box_a[0], boxes_b[:, 0])
-            inter_y1 = np.maximum(box_a[1], boxes_b[:, 1])
-            inter_x2 = np.minimum(box_a[2], boxes_b[:, 2])
-            inter_y2 = np.minimum(box_a[3], boxes_b[:, 3])
-
-            inter_w = np.maximum(0.0, inter_x2 - inter_x1)
-            inter_h = np.maximum(0.0, inter_y2 - inter_y1)
-            inter_area = inter_w * inter_h
-
-            ios = inter_area / areas_b
-
+            # UAP/UAİ çapası UAP/UAİ dışı kutuyu bastırmaz; blok tek sınıflı olduğundan
+            # bu muafiyet sınıf eşitliği şartıyla zaten sağlanır.
             effective_threshold = (
                 Settings.LANDING_ZONE_CONTAINMENT_IOU
-                if cls_ints[i] in landing_zone_ids
+                if cls_id in landing_zone_ids
                 else threshold
             )
+            # Satır a yalnızca kendisinden sonra gelen (daha küçük) kutuları bastırabilir
+            suppresses = np.triu(ios > effective_threshold, k=1)
 
-            suppress_mask = np.zeros(len(valid_remaining), dtype=bool)
+            suppressed_local = np.zeros(len(members), dtype=bool)
+            for anchor in np.flatnonzero(suppresses.any(axis=1)):
+                if not suppressed_local[anchor]:
+                    suppressed_local |= suppresses[anchor]
+            is_suppressed[members] = suppressed_local
 
-            for idx_b, b_idx in enumerate(valid_remaining):
-                if ios[idx_b] > effective_threshold:
-                    cls_a = cls_ints[i]
-                    cls_b = cls_ints[b_idx]
-
-                    if cls_a in landing_zone_ids and cls_b not in landing_zone_ids:
-                        continue
-
-                    suppress_mask[idx_b] = True
-
-            is_suppressed[valid_remaining[suppress_mask]] = True
-
-        return [detections[i] for i in keep]
+        return [int(i) for i in order[~is_suppressed[order]]]
 
     @staticmethod
     def _nms_greedy(
         boxes: np.ndarray, scores: np.ndarray, iou_threshold: float
     ) -> List[int]:
-        x1 = boxes[:, 0]
-        y1 = boxes[:, 1]
-        x2 = boxes[:, 2]
-        y2 = boxes[:, 3]
-        areas = np.maximum((x2 - x1) * (y2 - y1), 1e-6)
-
-        order = np.argsort(scores, kind="stable")[::-1]
-        keep: List[int] = []
+        return greedy_nms(boxes, scores, iou_threshold)
 
-        while order.size > 0:
-            i = order[0]
-            keep.append(int(i))
+    def _prepare_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Kare başına ön-işleme girişi.
 
-            if order.size == 1:
-                break
-
-            xx1 = np.maximum(x1[i], x1[order[1:]])
-            yy1 = np.maximum(y1[i], y1[order[1:]])
-            xx2 = np.minimum(x2[i], x2[order[1:]])
-            yy2 = np.minimum(y2[i], y2[order[1:]])
-
-            inter_w = np.maximum(0.0, xx2 - xx1)
-            inter_h = np.maximum(0.0, yy2 - yy1)
-            intersection = inter_w * inter_h
+        PREPROCESS_AT_INFERENCE_RES kapalıysa tam çözünürlükte iyileştirilmiş kare döner.
+        Açıksa yalnızca iyileştirme modu belirlenir; kare ham döner ve iyileştirme
+        _model_input (model çözünürlüğü) / _tile_input (tile çözünürlüğü) içinde yapılır.
+        """
+        self._model_inputs = {}
+        if not bool(getattr(Settings, "PREPROCESS_AT_INFERENCE_RES", False)):
+            return self._preprocess(frame)
+        self._enhancement_mode = self._resolve_enhancement_mode(frame)
+        return frame
+
+    def _model_input(
+        self, frame: np.ndarray, imgsz: int
+    ) -> Tuple[np.ndarray, Tuple[float, float]]:
+        """Full-frame pass girdisi ve kutuları kare koordinatına taşıyan (sx, sy) ölçeği."""
+        if not bool(getattr(Settings, "PREPROCESS_AT_INFERENCE_RES", False)):
+            return frame, (1.0, 1.0)
+        key = (id(frame), int(imgsz))
+        cached = self._model_inputs.get(key)
+        if cached is not None:
+            return cached
+        h, w = frame.shape[:2]
+        ratio = float(imgsz) / float(max(h, w))
+        image = frame
+        scale = (1.0, 1.0)
+        if ratio < 1.0:
+            # En-boy oranı korunur; letterbox dolgusunu YOLO kendi ekler
+            new_w = max(1, int(round(w * ratio)))
+            new_h = max(1, int(round(h * ratio)))
+            image = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+            scale = (w / float(new_w), h / float(new_h))
+        cached = (self._enhance(image, self._enhancement_mode), scale)
+        self._model_inputs[key] = cached
+        return cached
+
+    def _tile_input(self, tile: np.ndarray) -> np.ndarray:
+        if not bool(getattr(Settings, "PREPROCESS_AT_INFERENCE_RES", False)):
+            return tile
+        return self._enhance(tile, self._enhancement_mode)
 
-            union = areas[i] + areas[order[1:]] - intersection
-            iou = intersection / np.maximum(union, 1e-6)
+    def _preprocess(self, frame: np.ndarray) -> np.ndarray:
+        return self._enhance(frame, self._resolve_enhancement_mode(frame))
 
-            remaining = np.where(iou <= iou_threshold)[0]
-            order = order[remaining + 1]
+    def _resolve_enhancement_mode(self, frame: np.ndarray) -> str:
+        """Karenin CLAHE modunu ("thermal" | "lab" | "none") küçük önizlemeden belirler."""
+        # Otonom Adaptif CLAHE ve Termal/RGB kontrolü
+        if self._clahe is None:
+            return "none"
+        thumb = self._thumbnail(frame)
+        if self._is_thermal(frame, thumb):
+            return "thermal"
+        mean_brightness = float(np.mean(thumb))
+        # Apply CLAHE if it's RGB but too dark/foggy (low contrast)
+        if mean_brightness < 90.0 or mean_brightness > 200.0:  # Too dark (night) or too washed out (fog/snow)
+            return "lab"
+        # If RGB and normal brightness, skip CLAHE to save CPU and prevent artifacts
+        return "none"
 
-        return keep
+    @staticmethod
+    def _thumbnail(frame: np.ndarray) -> np.ndarray:
+        size = max(16, int(getattr(Settings, "PREPROCESS_THUMBNAIL_SIZE", 160)))
+        h, w = frame.shape[:2]
+        ratio = float(size) / float(max(h, w))
+        if ratio >= 1.0:
+            return frame
+        # Nearest örnekleme: ortalama/kanal farkı istatistiği için yeterli, tam kare taranmaz
+        return cv2.resize(
+            frame,
+            (max(1, int(round(w * ratio))), max(1, int(round(h * ratio)))),
+            interpolation=cv2.INTER_NEAREST,
+        )
 
-    def _preprocess(self, frame: np.ndarray) -> np.ndarray:
-        result = frame
-        
-        # Otonom Adaptif CLAHE ve Termal/RGB kontrolü
-        if self._clahe is not None:
-            # Check if thermal (single channel disguised as 3 or actually 1)
-            is_thermal = False
-            if len(frame.shape) == 2:
+    def _is_thermal(self, frame: np.ndarray, thumb: np.ndarray) -> bool:
+        """Termal/RGB kararı oturum boyunca önbelleklenir, periyodik olarak yeniden kontrol edilir."""
+        if frame.ndim == 2:
+            return True
+        interval = max(1, int(getattr(Settings, "PREPROCESS_MODE_RECHECK_INTERVAL", 30)))
+        cached = self._thermal_cache
+        if (
+            cached is not None
+            and cached[0] == frame.shape
+            and 0 <= self._frame_count - self._thermal_checked_frame < interval
+        ):
+            return cached[1]
+        is_thermal = False
+        if frame.ndim == 3 and frame.shape[2] == 3:
+            # If R, G, B channels are highly correlated/identical, it's likely grayscale/thermal
+            b, g, r = cv2.split(thumb)
+            diff_bg = cv2.absdiff(b, g)
+            diff_gr = cv2.absdiff(g, r)
+            if cv2.mean(diff_bg)[0] < 2.0 and cv2.mean(diff_gr)[0] < 2.0:
                 is_thermal = True
-            elif len(frame.shape) == 3 and frame.shape[2] == 3:
-                # If R, G, B channels are highly correlated/identical, it's likely grayscale/thermal
-                b, g, r = cv2.split(frame)
-                diff_bg = cv2.absdiff(b, g)
-                diff_gr = cv2.absdiff(g, r)
-                if cv2.mean(diff_bg)[0] < 2.0 and cv2.mean(diff_gr)[0] < 2.0:
-                    is_thermal = True
-
-            mean_brightness = np.mean(frame)
-            # Apply CLAHE if it's thermal OR if it's RGB but too dark/foggy (low contrast)
-            if is_thermal:
-                gray = cv2.cvtColor(result, cv2.COLOR_BGR2GRAY) if len(frame.shape) == 3 else result
-                enhanced = self._clahe.apply(gray)
-                result = cv2.cvtColor(enhanced, cv2.COLOR_GRAY2BGR)
-            elif mean_brightness < 90.0 or mean_brightness > 200.0: # Too dark (night) or too washed out (fog/snow)
-                lab = cv2.cvtColor(result, cv2.COLOR_BGR2LAB)
-                l_channel, a_channel, b_channel = cv2.split(lab)
-                l_enhanced = self._clahe.apply(l_channel)
-                lab_enhanced = cv2.merge([l_enhanced, a_channel, b_channel])
-                result = cv2.cvtColor(lab_enhanced, cv2.COLOR_LAB2BGR)
-            
-            # If RGB and normal brightness, skip CLAHE to save CPU and prevent artifacts
+        self._thermal_cache = (tuple(frame.shape), is_thermal)
+        self._thermal_checked_frame = int(self._frame_count)
+        return is_thermal
+
+    def _enhance(self, image: np.ndarray, mode: str) -> np.ndarray:
+        result = image
+        if self._clahe is not None and mode == "thermal":
+            gray = cv2.cvtColor(result, cv2.COLOR_BGR2GRAY) if result.ndim == 3 else result
+            enhanced = self._clahe.apply(gray)
+            result = cv2.cvtColor(enhanced, cv2.COLOR_GRAY2BGR)
+        elif self._clahe is not None and mode == "lab":
+            lab = cv2.cvtColor(result, cv2.COLOR_BGR2LAB)
+            l_channel, a_channel, b_channel = cv2.split(lab)
+            l_enhanced = self._clahe.apply(l_channel)
+            lab_enhanced = cv2.merge([l_enhanced, a_channel, b_channel])
+            result = cv2.cvtColor(lab_enhanced, cv2.COLOR_LAB2BGR)
 
         # Hafif keskinleştirme (bulanklık toleransı - FR-007)
         blurred = cv2.GaussianBlur(result, (0, 0), sigmaX=2.0)
@@ -1181,50 +2510,105 @@ class ObjectDetector:
 
     @staticmethod
     def _post_filter(detections: List[Dict], altitude: Optional[float] = None) -> List[Dict]:
-        filtered: List[Dict] = []
-        class_filters = getattr(Settings, "CLASS_ADAPTIVE_FILTERS", {}) or {}
+        if not detections:
+            return []
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float64)
+        class_ids = np.array(
+            [
+                ObjectDetector._class_key_to_id(d.get("cls_int", d.get("cls", "")))
+                for d in detections
+            ],
+            dtype=np.int64,
+        )
+        keep = ObjectDetector._post_filter_keep_mask(boxes, class_ids, altitude)
+        return [det for det, kept in zip(detections, keep.tolist()) if kept]
+
+    @staticmethod
+    def _post_filter_batch(
+        batch: DetectionBatch,
+        altitude: Optional[float] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> DetectionBatch:
+        if len(batch) == 0:
+            return batch
+        keep = ObjectDetector._post_filter_keep_mask(
+            batch.boxes, batch.class_ids, altitude, params
+        )
+        if bool(keep.all()):
+            return batch
+        return batch.select(keep)
+
+    @staticmethod
+    def _class_key_to_id(value: Any) -> int:
+        try:
+            return int(str(value).strip())
+        except ValueError:
+            return -1
+
+    @staticmethod
+    def _post_filter_params() -> Dict[str, Any]:
+        """Boyut/en-boy filtresinin Settings değerleri (aşama grafiği kurulurken bir kez)."""
         default_min_size = max(1, int(Settings.MIN_BBOX_SIZE))
-        default_max_size = max(default_min_size, int(getattr(Settings, "MAX_BBOX_SIZE", 9999)))
-        default_max_aspect = 4.5
-        
+        return {
+            "class_filters": dict(getattr(Settings, "CLASS_ADAPTIVE_FILTERS", {}) or {}),
+            "default_min_size": default_min_size,
+            "default_max_size": max(default_min_size, int(getattr(Settings, "MAX_BBOX_SIZE", 9999))),
+            "default_max_aspect": 4.5,
+            "default_min_floor": max(1, int(getattr(Settings, "MIN_BBOX_SIZE_FLOOR", 8))),
+            "ref_altitude": float(getattr(Settings, "DEFAULT_ALTITUDE", 50.0)),
+            "exempt_ids": class_ids_from_keys(
+                getattr(Settings, "GUARDRAIL_EXEMPT_CLASSES", ("2", "3"))
+            ),
+        }
+
+    @staticmethod
+    def _post_filter_keep_mask(
+        boxes: np.ndarray,
+        class_ids: np.ndarray,
+        altitude: Optional[float] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> np.ndarray:
+        if params is None:
+            params = ObjectDetector._post_filter_params()
+        class_filters = params["class_filters"]
+        default_min_size = params["default_min_size"]
+        default_max_size = params["default_max_size"]
+        default_max_aspect = params["default_max_aspect"]
+        default_min_floor = params["default_min_floor"]
+
         # Scale thresholds based on altitude (reference 50m)
         # Closer to ground (lower altitude) = larger boxes expected
         scale_factor = 1.0
         if altitude is not None and altitude > 1.0:
-            ref_altitude = getattr(Settings, "DEFAULT_ALTITUDE", 50.0)
-            scale_factor = ref_altitude / max(5.0, altitude)
+            scale_factor = params["ref_altitude"] / max(5.0, altitude)
 
-        post_filter_exempt = frozenset(str(c) for c in getattr(Settings, "GUARDRAIL_EXEMPT_CLASSES", ("2", "3")))
-        for det in detections:
-            cls_key = str(det.get("cls_int", det.get("cls", "")))
-            if cls_key in post_filter_exempt:
-                filtered.append(det)
-                continue
+        keep = np.isin(class_ids, params["exempt_ids"])
 
-            x1, y1, x2, y2 = det["bbox"]
-            w = x2 - x1
-            h = y2 - y1
+        w = boxes[:, 2] - boxes[:, 0]
+        h = boxes[:, 3] - boxes[:, 1]
+        short_side = np.minimum(w, h)
+        long_side = np.maximum(w, h)
+        aspect = long_side / np.maximum(short_side, 1)
 
-            cfg = class_filters.get(cls_key, {})
+        for cls_id in np.unique(class_ids[~keep]).tolist():
+            cls_mask = class_ids == cls_id
+            cfg = class_filters.get(str(cls_id), {})
             base_min = max(1, int(cfg.get("min_size", default_min_size)))
             base_max = max(base_min, int(cfg.get("max_size", default_max_size)))
             min_size = base_min * scale_factor
-            default_min_floor = max(1, int(getattr(Settings, "MIN_BBOX_SIZE_FLOOR", 8)))
             min_floor = max(1, int(cfg.get("min_floor", default_min_floor)))
             min_size = max(min_floor, min_size)
             max_size = base_max * scale_factor
             max_aspect = float(cfg.get("max_aspect", default_max_aspect))
 
-            if w < min_size or h < min_size:
-                continue
-            if w > max_size or h > max_size:
-                continue
-            aspect = max(w, h) / max(min(w, h), 1)
-            if aspect > max_aspect:
-                continue
-            filtered.append(det)
+            keep |= (
+                cls_mask
+                & (short_side >= min_size)
+                & (long_side <= max_size)
+                & (aspect <= max_aspect)
+            )
 
-        return filtered
+        return keep
 
     @staticmethod
     def _bbox_iou(
@@ -1254,27 +2638,6 @@ class ObjectDetector:
         if not detections:
             return []
 
-        threshold = float(
-            getattr(Settings, "UAP_UAI_CONFLICT_IOU_THRESHOLD", 0.55)
-        )
-        if threshold <= 0.0:
-            return detections
-        min_conf_gap = max(
-            0.0, float(getattr(Settings, "UAP_UAI_CONFLICT_MIN_CONF_GAP", 0.12))
-        )
-        min_area_ratio = max(
-            1.0, float(getattr(Settings, "UAP_UAI_CONFLICT_MIN_AREA_RATIO", 1.30))
-        )
-
-        landing_zone_ids = {Settings.CLASS_UAP, Settings.CLASS_UAI}
-        candidate_indices = [
-            idx
-            for idx, det in enumerate(detections)
-            if int(det.get("cls_int", -1)) in landing_zone_ids
-        ]
-        if len(candidate_indices) < 2:
-            return detections
-
         def _bbox(det: Dict) -> Tuple[float, float, float, float]:
             if "bbox" in det and len(det["bbox"]) == 4:
                 x1, y1, x2, y2 = det["bbox"]
@@ -1285,59 +2648,121 @@ class ObjectDetector:
                 y2 = float(det.get("bottom_right_y", y1 + 1.0))
             return (float(x1), float(y1), float(x2), float(y2))
 
-        def _area(box: Tuple[float, float, float, float]) -> float:
-            return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+        keep_mask = self._landing_zone_conflict_keep_mask(
+            np.array([_bbox(det) for det in detections], dtype=np.float64),
+            np.array([float(det.get("confidence", 0.0)) for det in detections]),
+            np.array([int(det.get("cls_int", -1)) for det in detections], dtype=np.int64),
+        )
+        if keep_mask is None:
+            return detections
+        return [det for idx, det in enumerate(detections) if bool(keep_mask[idx])]
 
-        keep_mask = np.ones(len(detections), dtype=bool)
-        ranked_indices = sorted(
-            candidate_indices,
-            key=lambda idx: (
-                float(detections[idx].get("confidence", 0.0)),
-                _area(_bbox(detections[idx])),
-            ),
-            reverse=True,
+    def _suppress_landing_zone_class_conflicts_batch(
+        self,
+        batch: DetectionBatch,
+        params: Optional[Tuple[float, float, float]] = None,
+    ) -> DetectionBatch:
+        if len(batch) == 0:
+            return batch
+        keep_mask = self._landing_zone_conflict_keep_mask(
+            batch.boxes, batch.scores, batch.class_ids, params
         )
+        if keep_mask is None or bool(keep_mask.all()):
+            return batch
+        return batch.select(keep_mask)
 
-        suppressed = 0
-        for rank_pos, idx in enumerate(ranked_indices):
-            if not keep_mask[idx]:
-                continue
-            det_i = detections[idx]
-            cls_i = int(det_i.get("cls_int", -1))
-            box_i = _bbox(det_i)
-            area_i = _area(box_i)
-            conf_i = float(det_i.get("confidence", 0.0))
-            for jdx in ranked_indices[rank_pos + 1 :]:
-                if not keep_mask[jdx]:
-                    continue
-                det_j = detections[jdx]
-                cls_j = int(det_j.get("cls_int", -1))
-                if cls_i == cls_j:
-                    continue
-                box_j = _bbox(det_j)
-                if self._bbox_iou(box_i, box_j) < threshold:
-                    continue
+    @staticmethod
+    def _landing_zone_conflict_params() -> Tuple[float, float, float]:
+        """(IoU eşiği, min conf farkı, min alan oranı); eşik <= 0 ise aşama kapalıdır."""
+        return (
+            float(getattr(Settings, "UAP_UAI_CONFLICT_IOU_THRESHOLD", 0.55)),
+            max(0.0, float(getattr(Settings, "UAP_UAI_CONFLICT_MIN_CONF_GAP", 0.12))),
+            max(1.0, float(getattr(Settings, "UAP_UAI_CONFLICT_MIN_AREA_RATIO", 1.30))),
+        )
 
-                area_j = _area(box_j)
-                conf_j = float(det_j.get("confidence", 0.0))
-                conf_gap = abs(conf_i - conf_j)
-                area_ratio = max(area_i, area_j) / max(min(area_i, area_j), 1e-6)
+    def _landing_zone_conflict_keep_mask(
+        self,
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        class_ids: np.ndarray,
+        params: Optional[Tuple[float, float, float]] = None,
+    ) -> Optional[np.ndarray]:
+        """UAP/UAİ sınıf çakışmalarında korunacak satırların maskesi (işlem yoksa None)."""
+        threshold, min_conf_gap, min_area_ratio = (
+            params if params is not None else self._landing_zone_conflict_params()
+        )
+        if threshold <= 0.0:
+            return None
 
-                # Belirsiz (yakın güven + yakın alan) durumlarında iki aday da korunur.
-                if conf_gap < min_conf_gap and area_ratio < min_area_ratio:
-                    continue
+        candidate_indices = np.flatnonzero(
+            np.isin(class_ids, (Settings.CLASS_UAP, Settings.CLASS_UAI))
+        )
+        if len(candidate_indices) < 2:
+            return None
+
+        areas = np.maximum(0.0, boxes[:, 2] - boxes[:, 0]) * np.maximum(
+            0.0, boxes[:, 3] - boxes[:, 1]
+        )
+        # (güven, alan) azalan; eşitlikte giriş sırası korunur
+        ranked = candidate_indices[
+            np.lexsort(
+                (candidate_indices, -areas[candidate_indices], -scores[candidate_indices])
+            )
+        ]
+        r_boxes = boxes[ranked]
+        r_areas = areas[ranked]
+        r_conf = scores[ranked]
+        r_cls = class_ids[ranked]
+
+        # Sıralı adaylar arasında IoU / güven farkı / alan oranı matrisleri
+        inter_w = np.maximum(
+            0.0,
+            np.minimum(r_boxes[:, None, 2], r_boxes[None, :, 2])
+            - np.maximum(r_boxes[:, None, 0], r_boxes[None, :, 0]),
+        )
+        inter_h = np.maximum(
+            0.0,
+            np.minimum(r_boxes[:, None, 3], r_boxes[None, :, 3])
+            - np.maximum(r_boxes[:, None, 1], r_boxes[None, :, 1]),
+        )
+        inter = inter_w * inter_h
+        union = np.maximum(r_areas[:, None] + r_areas[None, :] - inter, 1e-6)
+        iou = np.where(inter > 0, inter / union, 0.0)
+        conf_diff = r_conf[None, :] - r_conf[:, None]
+        area_ratio = np.maximum(r_areas[:, None], r_areas[None, :]) / np.maximum(
+            np.minimum(r_areas[:, None], r_areas[None, :]), 1e-6
+        )
 
-                loser_idx = jdx
-                if conf_j > conf_i:
-                    loser_idx = idx
-                elif abs(conf_j - conf_i) <= 1e-6 and area_j > area_i:
-                    loser_idx = idx
+        # Belirsiz (yakın güven + yakın alan) durumlarında iki aday da korunur.
+        ambiguous = (np.abs(conf_diff) < min_conf_gap) & (area_ratio < min_area_ratio)
+        conflicts = np.triu(
+            (r_cls[:, None] != r_cls[None, :]) & (iou >= threshold) & ~ambiguous,
+            k=1,
+        )
+        # Çapa kaybeder: sonraki aday daha güvenli ya da eşit güvenle daha büyük
+        anchor_loses = (conf_diff > 0) | (
+            (np.abs(conf_diff) <= 1e-6) & (r_areas[None, :] > r_areas[:, None])
+        )
+
+        # Greedy sıra korunur: her çapa, kendisini yenen ilk adaya kadar olanları bastırır
+        removed = np.zeros(len(ranked), dtype=bool)
+        for anchor in np.flatnonzero(conflicts.any(axis=1)):
+            if removed[anchor]:
+                continue
+            rivals = np.flatnonzero(conflicts[anchor] & ~removed)
+            if len(rivals) == 0:
+                continue
+            loses = anchor_loses[anchor, rivals]
+            if loses.any():
+                first_winner = int(np.argmax(loses))
+                removed[rivals[:first_winner]] = True
+                removed[anchor] = True
+            else:
+                removed[rivals] = True
 
-                if keep_mask[loser_idx]:
-                    keep_mask[loser_idx] = False
-                    suppressed += 1
-                if loser_idx == idx:
-                    break
+        keep_mask = np.ones(len(class_ids), dtype=bool)
+        keep_mask[ranked[removed]] = False
+        suppressed = int(np.count_nonzero(removed))
 
         if suppressed > 0 and bool(getattr(Settings, "DEBUG", False)):
             self.log.debug(
@@ -1346,7 +2771,7 @@ class ObjectDetector:
                 f"min_conf_gap={min_conf_gap:.2f} min_area_ratio={min_area_ratio:.2f}"
             )
 
-        return [det for idx, det in enumerate(detections) if bool(keep_mask[idx])]
+        return keep_mask
 
     # =========================================================================
 
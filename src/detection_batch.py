@@ -0,0 +1,201 @@
+"""Kolonsal (struct-of-arrays) tespit temsili.
+Model çıktısı kutu kutu dict'e çevrilmez; kolonlar NumPy dizilerinde taşınır,
+dict'ler yalnızca payload tarafı ihtiyaç duyduğunda üretilir."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.class_contract import CompetitionClassContract
+
+# Durum kolonlarında "henüz hesaplanmadı" işareti (şartname değerleri -1/0/1)
+STATUS_UNSET = -2
+
+_TRACE_ID_RE = re.compile(r"^f(\d+)-d(\d+)$")
+
+
+def _status_column(count: int) -> np.ndarray:
+    return np.full(count, STATUS_UNSET, dtype=np.int8)
+
+
+def class_ids_from_keys(keys: Iterable) -> np.ndarray:
+    """"2", 3 gibi sınıf anahtarlarını int id dizisine çevirir (sayısal olmayanlar atlanır)."""
+    ids: List[int] = []
+    for key in keys:
+        try:
+            ids.append(int(str(key).strip()))
+        except ValueError:
+            continue
+    return np.array(sorted(set(ids)), dtype=np.int64)
+
+
+@dataclass
+class DetectionBatch:
+    """Bir karedeki tespitlerin kolonsal temsili (satır i = tespit i)."""
+
+    boxes: np.ndarray  # (N, 4) float64 — x1, y1, x2, y2 (kare koordinatı)
+    scores: np.ndarray  # (N,) float64 — 4 haneye kesilmiş güven
+    class_ids: np.ndarray  # (N,) int64 — TEKNOFEST sınıf id (-1 = tanımsız)
+    source_class_ids: np.ndarray  # (N,) int64 — model sınıf id
+    trace_frames: np.ndarray  # (N,) int64 — trace id kare numarası
+    trace_seqs: np.ndarray  # (N,) int64 — trace id sıra numarası
+    landing_status: Optional[np.ndarray] = field(default=None)  # (N,) int8, STATUS_UNSET
+    motion_status: Optional[np.ndarray] = field(default=None)  # (N,) int8, STATUS_UNSET
+
+    def __post_init__(self) -> None:
+        count = int(self.scores.shape[0])
+        if self.landing_status is None:
+            self.landing_status = _status_column(count)
+        if self.motion_status is None:
+            self.motion_status = _status_column(count)
+
+    @classmethod
+    def empty(cls) -> "DetectionBatch":
+        return cls(
+            boxes=np.zeros((0, 4), dtype=np.float64),
+            scores=np.zeros(0, dtype=np.float64),
+            class_ids=np.zeros(0, dtype=np.int64),
+            source_class_ids=np.zeros(0, dtype=np.int64),
+            trace_frames=np.zeros(0, dtype=np.int64),
+            trace_seqs=np.zeros(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["DetectionBatch"]) -> "DetectionBatch":
+        parts = [b for b in batches if b is not None and len(b) > 0]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            boxes=np.concatenate([b.boxes for b in parts], axis=0),
+            scores=np.concatenate([b.scores for b in parts]),
+            class_ids=np.concatenate([b.class_ids for b in parts]),
+            source_class_ids=np.concatenate([b.source_class_ids for b in parts]),
+            trace_frames=np.concatenate([b.trace_frames for b in parts]),
+            trace_seqs=np.concatenate([b.trace_seqs for b in parts]),
+            landing_status=np.concatenate([b.landing_status for b in parts]),
+            motion_status=np.concatenate([b.motion_status for b in parts]),
+        )
+
+    @classmethod
+    def from_dicts(cls, detections: Sequence[Dict]) -> "DetectionBatch":
+        """Dict listesini kolonlara çevirir (satır sırası korunur)."""
+        count = len(detections)
+        if count == 0:
+            return cls.empty()
+        boxes = np.zeros((count, 4), dtype=np.float64)
+        scores = np.zeros(count, dtype=np.float64)
+        class_ids = np.full(count, -1, dtype=np.int64)
+        source_ids = np.full(count, -1, dtype=np.int64)
+        trace_frames = np.full(count, -1, dtype=np.int64)
+        trace_seqs = np.full(count, -1, dtype=np.int64)
+        landing = _status_column(count)
+        motion = _status_column(count)
+        for idx, det in enumerate(detections):
+            bbox = det.get("bbox")
+            if bbox is not None and len(bbox) == 4:
+                boxes[idx] = bbox
+            else:
+                boxes[idx] = (
+                    float(det.get("top_left_x", 0.0)),
+                    float(det.get("top_left_y", 0.0)),
+                    float(det.get("bottom_right_x", 0.0)),
+                    float(det.get("bottom_right_y", 0.0)),
+                )
+            scores[idx] = float(det.get("confidence", 0.0))
+            raw_cls = det.get("cls_int", det.get("cls", -1))
+            try:
+                class_ids[idx] = int(raw_cls)
+            except (TypeError, ValueError):
+                class_ids[idx] = -1
+            source_ids[idx] = int(det.get("source_cls_id", -1))
+            match = _TRACE_ID_RE.match(str(det.get("trace_id", "")))
+            if match:
+                trace_frames[idx] = int(match.group(1))
+                trace_seqs[idx] = int(match.group(2))
+            for column, key in ((landing, "landing_status"), (motion, "motion_status")):
+                if key in det:
+                    try:
+                        column[idx] = int(det[key])
+                    except (TypeError, ValueError):
+                        pass
+        return cls(
+            boxes=boxes,
+            scores=scores,
+            class_ids=class_ids,
+            source_class_ids=source_ids,
+            trace_frames=trace_frames,
+            trace_seqs=trace_seqs,
+            landing_status=landing,
+            motion_status=motion,
+        )
+
+    def __len__(self) -> int:
+        return int(self.scores.shape[0])
+
+    def select(self, index: np.ndarray) -> "DetectionBatch":
+        """Boolean maske veya indeks dizisiyle alt küme döndürür."""
+        return DetectionBatch(
+            boxes=self.boxes[index],
+            scores=self.scores[index],
+            class_ids=self.class_ids[index],
+            source_class_ids=self.source_class_ids[index],
+            trace_frames=self.trace_frames[index],
+            trace_seqs=self.trace_seqs[index],
+            landing_status=self.landing_status[index],
+            motion_status=self.motion_status[index],
+        )
+
+    def widths(self) -> np.ndarray:
+        return self.boxes[:, 2] - self.boxes[:, 0]
+
+    def heights(self) -> np.ndarray:
+        return self.boxes[:, 3] - self.boxes[:, 1]
+
+    def class_mask(self, class_ids: Iterable[int]) -> np.ndarray:
+        return np.isin(self.class_ids, np.asarray(list(class_ids), dtype=np.int64))
+
+    def trace_ids(self) -> List[str]:
+        return [
+            f"f{frame:06d}-d{seq:08d}" if seq >= 0 else ""
+            for frame, seq in zip(self.trace_frames.tolist(), self.trace_seqs.tolist())
+        ]
+
+    def to_dicts(self) -> List[Dict]:
+        """Pipeline'ın beklediği tespit dict formatına tek seferde dönüştürür."""
+        if len(self) == 0:
+            return []
+        rounded = np.round(self.boxes, 2)
+        detections: List[Dict] = []
+        for box, rbox, conf, tf_id, src_id, trace_id, landing, motion in zip(
+            self.boxes.tolist(),
+            rounded.tolist(),
+            self.scores.tolist(),
+            self.class_ids.tolist(),
+            self.source_class_ids.tolist(),
+            self.trace_ids(),
+            self.landing_status.tolist(),
+            self.motion_status.tolist(),
+        ):
+            det = {
+                "trace_id": trace_id,
+                "cls_int": tf_id,
+                "cls": str(tf_id),
+                "class_label": CompetitionClassContract.display_name(tf_id),
+                "source_cls_id": src_id,
+                "confidence": conf,
+                "top_left_x": rbox[0],
+                "top_left_y": rbox[1],
+                "bottom_right_x": rbox[2],
+                "bottom_right_y": rbox[3],
+                "bbox": (box[0], box[1], box[2], box[3]),
+            }
+            if landing != STATUS_UNSET:
+                det["landing_status"] = str(landing)
+            if motion != STATUS_UNSET:
+                det["motion_status"] = str(motion)
+            detections.append(det)
+        return detections
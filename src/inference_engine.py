@@ -0,0 +1,427 @@
+"""Ultralytics predict() sarmalayıcısı olmadan inference backend'leri.
+
+- direct : YOLO içindeki nn.Module doğrudan çağrılır; letterbox tekrar kullanılan bir
+           staging dizisine yazılır, tensör cihazda tutulur, NMS ham çıktı üzerinde çalışır.
+- onnx   : MODEL_PATH'ten export edilmiş (model hash + imgsz anahtarlı) .onnx dosyası
+           ONNX Runtime CPU oturumunda çalışır; ön/son işlem tamamen numpy'dır.
+
+Geometri ve NMS argümanları predict() ile birebir aynıdır; predict() referans yol
+olarak kalır (INFERENCE_BACKEND_VERIFY_INTERVAL)."""
+
+import hashlib
+import math
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+import torch
+
+from config.settings import Settings
+from src.nms import class_aware_greedy_nms, greedy_nms, matrix_nms
+from src.utils import Logger
+
+_PAD_VALUE = 114
+# ultralytics non_max_suppression ile aynı: NMS'e girecek en fazla aday
+_MAX_NMS_CANDIDATES = 30000
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+_model_hash_cache: Dict[Tuple[str, int, int], str] = {}
+
+
+def letterbox_geometry(
+    shape: Tuple[int, int],
+    new_shape: Tuple[int, int],
+    stride: int,
+    auto: bool,
+) -> Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int]]:
+    """Ultralytics LetterBox(center=True) ile aynı ölçek/dolgu hesabı.
+
+    Dönüş: ((yeni_w, yeni_h), (sol, üst), (çıktı_h, çıktı_w)).
+    """
+    h, w = int(shape[0]), int(shape[1])
+    r = min(new_shape[0] / h, new_shape[1] / w)
+    new_unpad = (int(round(w * r)), int(round(h * r)))
+    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+    dw /= 2
+    dh /= 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    out_shape = (new_unpad[1] + top + bottom, new_unpad[0] + left + right)
+    return new_unpad, (left, top), out_shape
+
+
+def letterbox_into(image: np.ndarray, dst: np.ndarray, new_unpad: Tuple[int, int], pad: Tuple[int, int]) -> None:
+    """Görüntüyü dolgu değeriyle doldurulmuş hedef dizinin içine yeniden boyutlandırır."""
+    left, top = pad
+    dst[...] = _PAD_VALUE
+    region = dst[top:top + new_unpad[1], left:left + new_unpad[0]]
+    if (image.shape[1], image.shape[0]) == new_unpad:
+        region[...] = image
+    else:
+        cv2.resize(image, new_unpad, dst=region, interpolation=cv2.INTER_LINEAR)
+
+
+def scale_boxes_to_source(
+    input_shape: Tuple[int, int], boxes: np.ndarray, source_shape: Tuple[int, ...]
+) -> np.ndarray:
+    """ultralytics ops.scale_boxes'un numpy karşılığı: letterbox uzayından kaynak görüntüye."""
+    gain = min(input_shape[0] / source_shape[0], input_shape[1] / source_shape[1])
+    pad_x = round((input_shape[1] - source_shape[1] * gain) / 2 - 0.1)
+    pad_y = round((input_shape[0] - source_shape[0] * gain) / 2 - 0.1)
+    boxes[:, [0, 2]] -= pad_x
+    boxes[:, [1, 3]] -= pad_y
+    boxes[:, :4] /= gain
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, source_shape[1])
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, source_shape[0])
+    return boxes
+
+
+def decode_predictions(
+    pred: np.ndarray,
+    conf: float,
+    iou: float,
+    classes: Optional[List[int]] = None,
+    agnostic_nms: bool = False,
+    max_det: int = 300,
+) -> np.ndarray:
+    """Ham YOLOv8 çıktısını (4 + nc, anchor) → (N, 6) [x1, y1, x2, y2, conf, cls].
+
+    ultralytics non_max_suppression ile aynı kurallar: sınıf skoru maksimumu ``conf``'tan
+    büyük olmalı, ``classes`` filtresi NMS'ten önce uygulanır, çıktı skor azalan sıradadır.
+    """
+    rows = np.asarray(pred, dtype=np.float32).T
+    if rows.shape[0] == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    class_scores = rows[:, 4:]
+    cls = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(rows)), cls]
+    keep = scores > float(conf)
+    if classes is not None:
+        keep &= np.isin(cls, np.asarray(classes, dtype=np.int64))
+    idx = np.flatnonzero(keep)
+    if len(idx) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    if len(idx) > _MAX_NMS_CANDIDATES:
+        idx = idx[np.argsort(-scores[idx], kind="stable")[:_MAX_NMS_CANDIDATES]]
+
+    xywh = rows[idx, :4]
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+    scores = scores[idx]
+    cls = cls[idx]
+
+    class_ids = None if agnostic_nms else cls
+    if len(idx) <= int(getattr(Settings, "NMS_MATRIX_MAX_BOXES", 2048)):
+        nms_keep = matrix_nms(boxes, scores, class_ids, float(iou))
+    elif class_ids is None:
+        nms_keep = np.asarray(greedy_nms(boxes, scores, float(iou)), dtype=np.int64)
+    else:
+        nms_keep = class_aware_greedy_nms(boxes, scores, class_ids, float(iou))
+    nms_keep = nms_keep[np.argsort(-scores[nms_keep], kind="stable")][: int(max_det)]
+
+    out = np.empty((len(nms_keep), 6), dtype=np.float32)
+    out[:, :4] = boxes[nms_keep]
+    out[:, 4] = scores[nms_keep]
+    out[:, 5] = cls[nms_keep]
+    return out
+
+
+def model_file_hash(model_path: str) -> str:
+    """Model dosyasının SHA-256 özeti (yol + mtime + boyut ile süreç içinde önbelleklenir)."""
+    stat = os.stat(model_path)
+    key = (os.path.abspath(model_path), int(stat.st_mtime_ns), int(stat.st_size))
+    cached = _model_hash_cache.get(key)
+    if cached is None:
+        digest = hashlib.sha256()
+        with open(model_path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+        cached = digest.hexdigest()
+        _model_hash_cache[key] = cached
+    return cached
+
+
+def onnx_cache_path(
+    model_path: str, imgsz: int, cache_dir: Optional[str] = None, precision: str = "fp32"
+) -> str:
+    """Model hash'i, giriş boyutu ve hassasiyetle anahtarlanmış .onnx önbellek yolu."""
+    directory = cache_dir or str(getattr(Settings, "ONNX_CACHE_DIR", ""))
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    suffix = "" if precision == "fp32" else f"-{precision}"
+    return os.path.join(
+        directory, f"{stem}-{model_file_hash(model_path)[:16]}-{int(imgsz)}{suffix}.onnx"
+    )
+
+
+def to_input_blob(
+    image: np.ndarray,
+    size: int,
+    stride: int,
+    stage: Optional[np.ndarray] = None,
+    blob: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Kare letterbox + BGR→RGB + HWC→CHW + /255 → (1, 3, size, size) float32.
+
+    ``stage``/``blob`` verilirse (1, size, size, 3) uint8 / (1, 3, size, size) float32
+    buffer'lar yeniden kullanılır.
+    """
+    if stage is None:
+        stage = np.empty((1, size, size, 3), dtype=np.uint8)
+    if blob is None:
+        blob = np.empty((1, 3, size, size), dtype=np.float32)
+    new_unpad, pad, _ = letterbox_geometry(image.shape[:2], (size, size), stride, False)
+    letterbox_into(image, stage[0], new_unpad, pad)
+    np.divide(stage[..., ::-1].transpose(0, 3, 1, 2), np.float32(255.0), out=blob, dtype=np.float32)
+    return blob
+
+
+def export_onnx(
+    model_path: str, imgsz: int, cache_dir: Optional[str] = None, force: bool = False
+) -> str:
+    """MODEL_PATH'i sabit (1, 3, imgsz, imgsz) girişli .onnx olarak önbelleğe export eder.
+
+    Önbellekte aynı hash + imgsz varsa export atlanır. Sabit şekil ORT CPU
+    graph optimizasyonlarının tamamını açar; farklı imgsz'ler ayrı dosyalardır.
+    """
+    target = onnx_cache_path(model_path, imgsz, cache_dir)
+    if os.path.exists(target) and not force:
+        return target
+    from ultralytics import YOLO
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    exported = YOLO(model_path).export(
+        format="onnx",
+        imgsz=int(imgsz),
+        batch=1,
+        dynamic=False,
+        half=False,
+        simplify=bool(getattr(Settings, "ONNX_EXPORT_SIMPLIFY", True)),
+        opset=getattr(Settings, "ONNX_EXPORT_OPSET", None),
+    )
+    # export .pt'nin yanına yazar; yarım kalmış dosya görülmesin diye atomik taşı
+    tmp_path = f"{target}.tmp"
+    shutil.move(str(exported), tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+class EngineBoxes:
+    """_parse_results_batch'in okuduğu ``boxes.data`` (N, 6) arayüzü."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Any) -> None:
+        self.data = data
+
+
+class EngineResult:
+    __slots__ = ("boxes",)
+
+    def __init__(self, data: Any) -> None:
+        self.boxes = EngineBoxes(data)
+
+
+class DirectTorchEngine:
+    """YOLO modelinin içindeki DetectionModel'i doğrudan çağıran inference motoru."""
+
+    name = "direct"
+
+    def __init__(self, yolo: Any, device: str, half: bool) -> None:
+        module = yolo.model
+        if hasattr(module, "fuse"):
+            # predict() de AutoBackend(fuse=True) ile aynı modülü yerinde birleştirir
+            module = module.fuse(verbose=False)
+        module = module.to(device)
+        module = module.half() if half else module.float()
+        module.eval()
+        self._module = module
+        self.device = device
+        self._dtype = torch.float16 if half else torch.float32
+        self.stride = max(int(module.stride.max()), 32)
+        self._stage: Optional[np.ndarray] = None
+        self._input: Optional[Any] = None
+
+    def input_size(self, imgsz: int) -> int:
+        """check_imgsz ile aynı: stride katına yukarı yuvarlanmış kare giriş."""
+        return int(math.ceil(int(imgsz) / self.stride) * self.stride)
+
+    def _staging(self, count: int, out_shape: Tuple[int, int]) -> np.ndarray:
+        shape = (count, out_shape[0], out_shape[1], 3)
+        if self._stage is None or self._stage.shape != shape:
+            self._stage = np.empty(shape, dtype=np.uint8)
+        return self._stage
+
+    def _to_tensor(self, stage: np.ndarray) -> Any:
+        raw = torch.from_numpy(stage).to(self.device, non_blocking=True)
+        shape = (stage.shape[0], 3, stage.shape[1], stage.shape[2])
+        if self._input is None or tuple(self._input.shape) != shape:
+            self._input = torch.empty(shape, dtype=self._dtype, device=self.device)
+        # BGR→RGB, HWC→CHW ve dtype dönüşümü tek kopya ile
+        self._input.copy_(raw.permute(0, 3, 1, 2).flip(1))
+        self._input.div_(255.0)
+        return self._input
+
+    def predict(
+        self,
+        source: Union[np.ndarray, Sequence[np.ndarray]],
+        imgsz: int,
+        conf: float,
+        iou: float,
+        classes: Optional[List[int]] = None,
+        agnostic_nms: bool = False,
+        max_det: int = 300,
+        **_: Any,
+    ) -> List[EngineResult]:
+        from ultralytics.utils import ops
+
+        images = list(source) if isinstance(source, (list, tuple)) else [source]
+        if not images:
+            return []
+        size = self.input_size(imgsz)
+        # predict() ile aynı: tüm kaynaklar aynı boyuttaysa minimum dikdörtgen dolgu
+        auto = len({img.shape for img in images}) == 1
+        geometries = [
+            letterbox_geometry(img.shape[:2], (size, size), self.stride, auto) for img in images
+        ]
+        out_shape = geometries[0][2]
+        stage = self._staging(len(images), out_shape)
+        for idx, (img, (new_unpad, pad, _)) in enumerate(zip(images, geometries)):
+            letterbox_into(img, stage[idx], new_unpad, pad)
+
+        with torch.inference_mode():
+            tensor = self._to_tensor(stage)
+            preds = self._module(tensor)
+            detections = ops.non_max_suppression(
+                preds,
+                float(conf),
+                float(iou),
+                classes=classes,
+                agnostic=bool(agnostic_nms),
+                max_det=int(max_det),
+            )
+            results: List[EngineResult] = []
+            for img, det in zip(images, detections):
+                if len(det):
+                    det[:, :4] = ops.scale_boxes(tensor.shape[2:], det[:, :4], img.shape)
+                results.append(EngineResult(det))
+        return results
+
+
+class OnnxRuntimeEngine:
+    """Export edilmiş YOLOv8 .onnx modelini ONNX Runtime CPU oturumunda çalıştırır.
+
+    Her (giriş boyutu, hassasiyet) için ayrı sabit şekilli oturum tutulur; tile'lar tek
+    tek çalışır. Kare letterbox (auto=False) ultralytics'in ONNX AutoBackend davranışıyla
+    aynıdır. ``precision="int8"`` tools/quantize_int8.py çıktısını kullanır; dosya yoksa
+    fp32 oturumuna düşülür.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, intra_op_threads: Optional[int] = None) -> None:
+        import onnxruntime
+
+        self._ort = onnxruntime
+        self.model_path = model_path
+        # Detektörün seçtiği thread sayısı (gecikme tablosu); None ise Settings'ten okunur
+        self.intra_op_threads = intra_op_threads
+        self._sessions: Dict[Tuple[int, str], Tuple[Any, str]] = {}
+        self._stage: Optional[np.ndarray] = None
+        self._blob: Optional[np.ndarray] = None
+        self._missing_precisions: Dict[Tuple[int, str], bool] = {}
+        self.stride = 32
+        self.log = Logger("OnnxEngine")
+
+    def input_size(self, imgsz: int) -> int:
+        return int(math.ceil(int(imgsz) / self.stride) * self.stride)
+
+    def _session_options(self) -> Any:
+        options = self._ort.SessionOptions()
+        intra = int(self.intra_op_threads or 0)
+        if intra <= 0:
+            intra = int(getattr(Settings, "ONNX_INTRA_OP_THREADS", 0))
+        if intra <= 0:
+            intra = int(getattr(Settings, "NON_CUDA_CPU_THREADS", os.cpu_count() or 1))
+        options.intra_op_num_threads = max(1, intra)
+        options.inter_op_num_threads = max(1, int(getattr(Settings, "ONNX_INTER_OP_THREADS", 1)))
+        level = str(getattr(Settings, "ONNX_GRAPH_OPTIMIZATION", "all")).strip().lower()
+        options.graph_optimization_level = getattr(
+            self._ort.GraphOptimizationLevel,
+            _GRAPH_OPTIMIZATION_LEVELS.get(level, "ORT_ENABLE_ALL"),
+        )
+        return options
+
+    def _model_file(self, size: int, precision: str) -> str:
+        if precision != "fp32":
+            path = onnx_cache_path(self.model_path, size, precision=precision)
+            if os.path.exists(path):
+                return path
+            if not self._missing_precisions.get((size, precision)):
+                self._missing_precisions[(size, precision)] = True
+                self.log.warn(
+                    f"{precision} modeli yok ({path}); fp32 kullanılıyor "
+                    f"(python tools/quantize_int8.py --imgsz {size})"
+                )
+        path = onnx_cache_path(self.model_path, size)
+        if os.path.exists(path):
+            return path
+        if not bool(getattr(Settings, "ONNX_AUTO_EXPORT", True)):
+            raise FileNotFoundError(
+                f"ONNX modeli yok: {path} (python tools/export_onnx.py --imgsz {size})"
+            )
+        return export_onnx(self.model_path, size)
+
+    def _session(self, size: int, precision: str = "fp32") -> Tuple[Any, str]:
+        entry = self._sessions.get((size, precision))
+        if entry is not None:
+            return entry
+        session = self._ort.InferenceSession(
+            self._model_file(size, precision),
+            sess_options=self._session_options(),
+            providers=["CPUExecutionProvider"],
+        )
+        metadata = session.get_modelmeta().custom_metadata_map or {}
+        self.stride = max(int(metadata.get("stride", self.stride)), 32)
+        entry = (session, session.get_inputs()[0].name)
+        self._sessions[(size, precision)] = entry
+        return entry
+
+    def _prepare(self, image: np.ndarray, size: int) -> np.ndarray:
+        if self._stage is None or self._stage.shape[1] != size:
+            self._stage = np.empty((1, size, size, 3), dtype=np.uint8)
+            self._blob = np.empty((1, 3, size, size), dtype=np.float32)
+        return to_input_blob(image, size, self.stride, self._stage, self._blob)
+
+    def predict(
+        self,
+        source: Union[np.ndarray, Sequence[np.ndarray]],
+        imgsz: int,
+        conf: float,
+        iou: float,
+        classes: Optional[List[int]] = None,
+        agnostic_nms: bool = False,
+        max_det: int = 300,
+        precision: str = "fp32",
+        **_: Any,
+    ) -> List[EngineResult]:
+        images = list(source) if isinstance(source, (list, tuple)) else [source]
+        size = self.input_size(imgsz)
+        session, input_name = self._session(size, str(precision or "fp32").lower())
+        results: List[EngineResult] = []
+        for img in images:
+            blob = self._prepare(img, size)
+            pred = session.run(None, {input_name: blob})[0][0]
+            det = decode_predictions(pred, conf, iou, classes, agnostic_nms, max_det)
+            if len(det):
+                scale_boxes_to_source((size, size), det, img.shape)
+            results.append(EngineResult(det))
+        return results
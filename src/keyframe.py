@@ -0,0 +1,351 @@
+"""Keyframe zamanlayıcısı: tam tespit her N karede bir, aradaki kareler optik akışla taşınır.
+
+Keyframe'de ObjectDetector.detect() çalışır. Ara karelerde son tespitler
+(1) arka plan noktalarından RANSAC homografisi (kamera hareketi) ve
+(2) her kutunun kendi LK nokta akışı ile yeni konuma taşınır.
+Sahne değişimi, düşük iz güveni veya UAP/UAİ iniş durumu belirsizliği keyframe'i zorlar.
+Keyframe aralığı sabit değildir: ölçülen keyframe / taşıma gecikmelerinden
+KEYFRAME_LATENCY_BUDGET_MS bütçesini karşılayan en küçük aralık seçilir.
+"""
+
+import copy
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config.settings import Settings
+from src.utils import Logger
+
+_LANDING_CLASSES = ("2", "3")
+_LK_CRITERIA = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+
+
+def transform_boxes(boxes: np.ndarray, homography: np.ndarray) -> np.ndarray:
+    """(N, 4) xyxy kutuların dört köşesini homografiyle taşıyıp eksen hizalı kutuya çevirir."""
+    if len(boxes) == 0:
+        return boxes.reshape(0, 4)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    corners = np.stack(
+        [np.stack([x1, y1], 1), np.stack([x2, y1], 1), np.stack([x2, y2], 1), np.stack([x1, y2], 1)],
+        axis=1,
+    ).reshape(-1, 1, 2)
+    moved = cv2.perspectiveTransform(corners.astype(np.float64), homography).reshape(-1, 4, 2)
+    return np.concatenate([moved.min(axis=1), moved.max(axis=1)], axis=1)
+
+
+def adaptive_interval(key_ms: float, prop_ms: float, budget_ms: float, max_interval: int) -> int:
+    """Ortalama kare süresini bütçe altında tutan en küçük keyframe aralığı.
+
+    N karelik döngünün ortalaması (key + (N - 1) * prop) / N ≤ budget olmalıdır.
+    Bütçe yoksa (≤ 0) üst sınır kullanılır; keyframe zaten bütçeye sığıyorsa her kare keyframe'dir.
+    """
+    max_interval = max(1, int(max_interval))
+    if budget_ms <= 0.0:
+        return max_interval
+    if key_ms <= budget_ms:
+        return 1
+    if prop_ms >= budget_ms:
+        return max_interval
+    return int(min(max_interval, max(1, math.ceil((key_ms - prop_ms) / (budget_ms - prop_ms)))))
+
+
+class KeyframeScheduler:
+    """ObjectDetector'ü saran keyframe/taşıma zamanlayıcısı (detector arayüzünü korur)."""
+
+    def __init__(self, detector: Any) -> None:
+        self._detector = detector
+        self.log = Logger("Keyframe")
+        self._scale = float(min(1.0, max(0.1, getattr(Settings, "KEYFRAME_FLOW_SCALE", 0.5))))
+        self._prev_gray: Optional[np.ndarray] = None
+        self._frame_shape: Optional[Tuple[int, ...]] = None
+        self._detections: List[Dict] = []
+        self._boxes = np.zeros((0, 4), dtype=np.float64)
+        self._track_points: List[np.ndarray] = []
+        self._bg_points: Optional[np.ndarray] = None
+        self._since_keyframe = 0
+        self._interval = max(1, int(getattr(Settings, "KEYFRAME_MAX_INTERVAL", 4)))
+        self._key_ms: Optional[float] = None
+        self._prop_ms: Optional[float] = None
+        self._last_metrics: Dict[str, Any] = {}
+        self.last_was_keyframe = True
+
+    def __getattr__(self, name: str) -> Any:
+        # Sarılmış detector'ün diğer öznitelikleri (prefers_light_profile, _last_guardrail_stats, ...)
+        return getattr(self._detector, name)
+
+    @property
+    def interval(self) -> int:
+        return self._interval
+
+    def detect(
+        self,
+        frame: np.ndarray,
+        runtime_profile: str = "default",
+        frame_ctx: Any = None,
+        **kwargs: Any,
+    ) -> List[Dict]:
+        start = time.perf_counter()
+        full_gray = frame_ctx.gray if frame_ctx is not None else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = self._downscale(full_gray)
+
+        reason = self._scheduled_reason(frame.shape)
+        propagated: Optional[List[Dict]] = None
+        if reason is None:
+            propagated, reason = self._propagate(gray, frame.shape)
+
+        if reason is not None:
+            detections = self._detector.detect(
+                frame, runtime_profile=runtime_profile, frame_ctx=frame_ctx, **kwargs
+            )
+            self._on_keyframe(gray, frame.shape, detections)
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            self._key_ms = self._ema(self._key_ms, elapsed_ms)
+            self.last_was_keyframe = True
+        else:
+            detections = propagated or []
+            self._since_keyframe += 1
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            self._prop_ms = self._ema(self._prop_ms, elapsed_ms)
+            self.last_was_keyframe = False
+
+        self._prev_gray = gray
+        self._interval = adaptive_interval(
+            self._key_ms or 0.0,
+            self._prop_ms or 0.0,
+            float(getattr(Settings, "KEYFRAME_LATENCY_BUDGET_MS", 0.0)),
+            int(getattr(Settings, "KEYFRAME_MAX_INTERVAL", 4)),
+        )
+        self._last_metrics = {
+            "keyframe": self.last_was_keyframe,
+            "keyframe_reason": reason or "propagated",
+            "keyframe_interval": self._interval,
+            "keyframe_ms": round(self._key_ms or 0.0, 3),
+            "propagate_ms": round(self._prop_ms or 0.0, 3),
+        }
+        if not self.last_was_keyframe:
+            self._last_metrics["stage_timings"] = [("keyframe_propagate", round(elapsed_ms, 3))]
+        return detections
+
+    def get_last_pipeline_metrics(self) -> Dict[str, Any]:
+        """Keyframe'de detector metrikleri + zamanlayıcı alanları; ara karede yalnızca zamanlayıcı alanları."""
+        metrics: Dict[str, Any] = {}
+        if self.last_was_keyframe:
+            getter = getattr(self._detector, "get_last_pipeline_metrics", None)
+            if callable(getter):
+                metrics = dict(getter() or {})
+        metrics.update(self._last_metrics)
+        return metrics
+
+    # ------------------------------------------------------------------ #
+    def _downscale(self, gray: np.ndarray) -> np.ndarray:
+        if self._scale >= 1.0:
+            return gray
+        h, w = gray.shape[:2]
+        return cv2.resize(
+            gray,
+            (max(32, int(round(w * self._scale))), max(32, int(round(h * self._scale)))),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    @staticmethod
+    def _ema(previous: Optional[float], value: float) -> float:
+        alpha = float(getattr(Settings, "KEYFRAME_EMA_ALPHA", 0.2))
+        return value if previous is None else (1.0 - alpha) * previous + alpha * value
+
+    def _scheduled_reason(self, shape: Tuple[int, ...]) -> Optional[str]:
+        if self._prev_gray is None:
+            return "first_frame"
+        if shape != self._frame_shape:
+            return "shape_changed"
+        if self._since_keyframe + 1 >= self._interval:
+            return "interval"
+        return None
+
+    def _on_keyframe(self, gray: np.ndarray, shape: Tuple[int, ...], detections: List[Dict]) -> None:
+        self._frame_shape = shape
+        self._since_keyframe = 0
+        self._detections = [dict(det) for det in detections]
+        self._boxes = np.array(
+            [self._det_box(det) for det in detections], dtype=np.float64
+        ).reshape(-1, 4)
+        self._track_points = [self._seed_points(gray, box * self._scale) for box in self._boxes]
+        self._bg_points = self._seed_background(gray)
+
+    @staticmethod
+    def _det_box(det: Dict) -> Tuple[float, float, float, float]:
+        bbox = det.get("bbox")
+        if bbox is not None and len(bbox) == 4:
+            return tuple(float(v) for v in bbox)
+        return (
+            float(det.get("top_left_x", 0.0)),
+            float(det.get("top_left_y", 0.0)),
+            float(det.get("bottom_right_x", 0.0)),
+            float(det.get("bottom_right_y", 0.0)),
+        )
+
+    @staticmethod
+    def _seed_points(gray: np.ndarray, box: np.ndarray) -> np.ndarray:
+        """Kutu içindeki köşe noktaları (küçük kutularda yalnızca merkez)."""
+        h, w = gray.shape[:2]
+        x1, y1 = int(max(0, math.floor(box[0]))), int(max(0, math.floor(box[1])))
+        x2, y2 = int(min(w, math.ceil(box[2]))), int(min(h, math.ceil(box[3])))
+        center = np.array([[[(box[0] + box[2]) / 2.0, (box[1] + box[3]) / 2.0]]], dtype=np.float32)
+        if x2 - x1 < 6 or y2 - y1 < 6:
+            return center
+        corners = cv2.goodFeaturesToTrack(
+            gray[y1:y2, x1:x2],
+            maxCorners=max(1, int(getattr(Settings, "KEYFRAME_POINTS_PER_TRACK", 8))),
+            qualityLevel=0.01,
+            minDistance=2,
+        )
+        if corners is None:
+            return center
+        corners = corners.astype(np.float32) + np.array([x1, y1], dtype=np.float32)
+        return np.concatenate([center, corners], axis=0)
+
+    def _seed_background(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        return cv2.goodFeaturesToTrack(
+            gray,
+            maxCorners=Settings.MOTION_COMP_MAX_CORNERS,
+            qualityLevel=Settings.MOTION_COMP_QUALITY_LEVEL,
+            minDistance=max(1, int(Settings.MOTION_COMP_MIN_DISTANCE * self._scale)),
+        )
+
+    def _track(self, gray: np.ndarray, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """İleri-geri LK: (yeni noktalar, geçerlilik maskesi)."""
+        win = int(Settings.MOTION_COMP_WIN_SIZE)
+        nxt, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, gray, points, None, winSize=(win, win), maxLevel=3, criteria=_LK_CRITERIA
+        )
+        if nxt is None or status is None:
+            return points, np.zeros(len(points), dtype=bool)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(
+            gray, self._prev_gray, nxt, None, winSize=(win, win), maxLevel=3, criteria=_LK_CRITERIA
+        )
+        valid = status.reshape(-1) == 1
+        if back is not None and back_status is not None:
+            fb_error = np.linalg.norm((back - points).reshape(-1, 2), axis=1)
+            fb_max = float(getattr(Settings, "MOTION_COMP_FB_MAX_ERROR", 1.5))
+            valid &= (back_status.reshape(-1) == 1) & (fb_error <= fb_max)
+        return nxt, valid
+
+    def _propagate(
+        self, gray: np.ndarray, shape: Tuple[int, ...]
+    ) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """Son tespitleri bu kareye taşır; keyframe gerekiyorsa (None, sebep) döndürür."""
+        bg = self._bg_points
+        if bg is None or len(bg) < int(getattr(Settings, "KEYFRAME_MIN_INLIERS", 12)):
+            bg = self._seed_background(self._prev_gray)
+        if bg is None:
+            return None, "camera_lost"
+
+        counts = [len(p) for p in self._track_points]
+        all_points = np.concatenate([bg.astype(np.float32)] + self._track_points, axis=0)
+        moved, valid = self._track(gray, all_points)
+        bg_old = all_points[: len(bg)].reshape(-1, 2)
+        bg_new = moved[: len(bg)].reshape(-1, 2)
+        bg_valid = valid[: len(bg)]
+
+        min_inliers = int(getattr(Settings, "KEYFRAME_MIN_INLIERS", 12))
+        homography = None
+        if int(bg_valid.sum()) >= max(4, min_inliers):
+            homography, mask = cv2.findHomography(
+                bg_old[bg_valid], bg_new[bg_valid], cv2.RANSAC, 3.0
+            )
+            if mask is None or int(mask.sum()) < min_inliers or not np.all(np.isfinite(homography)):
+                homography = None
+        if homography is None:
+            return None, "camera_lost"
+
+        aligned = cv2.warpPerspective(
+            self._prev_gray, homography, (gray.shape[1], gray.shape[0]), borderValue=0
+        )
+        overlap = cv2.warpPerspective(
+            np.full_like(self._prev_gray, 255), homography, (gray.shape[1], gray.shape[0])
+        ) > 0
+        if not overlap.any():
+            return None, "scene_change"
+        residual = float(cv2.absdiff(aligned, gray)[overlap].mean())
+        if residual > float(getattr(Settings, "KEYFRAME_SCENE_CHANGE_DIFF", 18.0)):
+            return None, "scene_change"
+
+        # Kutular: önce kamera homografisi, sonra kutunun kendi akışının artık hareketi
+        full_h = homography.copy()
+        full_h[:2, 2] /= self._scale
+        full_h[2, :2] *= self._scale
+        boxes = transform_boxes(self._boxes, full_h)
+        min_points = int(getattr(Settings, "KEYFRAME_TRACK_MIN_POINTS", 3))
+        min_conf = float(getattr(Settings, "KEYFRAME_TRACK_MIN_CONFIDENCE", 0.5))
+        low_confidence = 0
+        new_track_points: List[np.ndarray] = []
+        offset = len(bg)
+        for idx, count in enumerate(counts):
+            old = all_points[offset: offset + count].reshape(-1, 2)
+            new = moved[offset: offset + count].reshape(-1, 2)
+            ok = valid[offset: offset + count]
+            offset += count
+            if count >= min_points and float(ok.mean()) < min_conf:
+                low_confidence += 1
+            if int(ok.sum()) >= min(count, min_points):
+                predicted = cv2.perspectiveTransform(
+                    old[ok].reshape(-1, 1, 2).astype(np.float64), homography
+                ).reshape(-1, 2)
+                residual_motion = np.median(new[ok] - predicted, axis=0) / self._scale
+                boxes[idx, [0, 2]] += residual_motion[0]
+                boxes[idx, [1, 3]] += residual_motion[1]
+                new_track_points.append(new[ok].reshape(-1, 1, 2).astype(np.float32))
+            else:
+                new_track_points.append(self._seed_points(gray, boxes[idx] * self._scale))
+
+        ratio = float(getattr(Settings, "KEYFRAME_LOW_CONFIDENCE_RATIO", 0.25))
+        if counts and low_confidence / len(counts) > ratio:
+            return None, "low_track_confidence"
+
+        h, w = shape[:2]
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0.0, float(w))
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0.0, float(h))
+        detections = self._build_detections(boxes)
+        if self._landing_uncertain(detections, w, h):
+            return None, "landing_uncertain"
+
+        self._boxes = boxes
+        self._track_points = new_track_points
+        keep = bg_valid & np.isfinite(bg_new).all(axis=1)
+        self._bg_points = bg_new[keep].reshape(-1, 1, 2).astype(np.float32)
+        if len(self._bg_points) < int(Settings.MOTION_COMP_MIN_FEATURES) // 2:
+            self._bg_points = self._seed_background(gray)
+        self._detections = [dict(det) for det in detections]
+        return detections, None
+
+    def _build_detections(self, boxes: np.ndarray) -> List[Dict]:
+        detections: List[Dict] = []
+        rounded = np.round(boxes, 2).tolist()
+        for det, box, rbox in zip(self._detections, boxes.tolist(), rounded):
+            moved = copy.copy(det)
+            moved.pop("motion_status", None)
+            moved["top_left_x"], moved["top_left_y"] = rbox[0], rbox[1]
+            moved["bottom_right_x"], moved["bottom_right_y"] = rbox[2], rbox[3]
+            moved["bbox"] = (box[0], box[1], box[2], box[3])
+            detections.append(moved)
+        return detections
+
+    def _landing_uncertain(self, detections: List[Dict], frame_w: int, frame_h: int) -> bool:
+        """UAP/UAİ varken iniş durumu taşınan kutularla değişiyorsa veya güven düşükse keyframe."""
+        landing = [det for det in detections if str(det.get("cls")) in _LANDING_CLASSES]
+        if not landing:
+            return False
+        min_conf = float(getattr(Settings, "KEYFRAME_UAP_UAI_MIN_CONF", 0.35))
+        if any(float(det.get("confidence", 1.0)) < min_conf for det in landing):
+            return True
+        from src.uap_uai import determine_landing_status
+
+        before = [str(det.get("landing_status", "")) for det in detections]
+        probe = [dict(det) for det in detections]
+        determine_landing_status(probe, frame_w, frame_h)
+        return any(
+            str(det.get("cls")) in _LANDING_CLASSES and str(det.get("landing_status")) != prev
+            for det, prev in zip(probe, before)
+        )
@@ -0,0 +1,252 @@
+"""Kare başı gecikme bütçesi kontrolcüsü (eski low-FPS guard'ın yerine).
+
+Ana thread her kare için değişmez bir ``RuntimePlan`` üretir; plan fetch/detect thread'ine
+argüman olarak geçer, ``Settings``'e yazılmaz. Seviyeler ``LATENCY_QUALITY_LEVELS``'ta en
+kalitelinden en ucuza sıralıdır. Aşama başına (``detect`` seviye anahtarlı, ``other`` = fetch +
+iletişim, seviyeden bağımsız) EMA gecikme modeli öğrenilir; henüz ölçülmemiş seviyeler ölçülmüş
+en yakın seviyeden göreli piksel maliyetiyle tahmin edilir; eski ölçümler yaşlandıkça aktif
+seviyeden ölçeklenen tahmine doğru kayar. Tahmini kare süresi bütçeyi
+aşarsa bir seviye düşülür; bir üst seviyenin tahmini bütçenin histerezis payına sığarsa
+bir seviye çıkılır. Her seviyede geçen süre ve kare sayısı kaydedilir. Kalibrasyon tablosu
+(``src/latency_table.py``) varsa seviyeler onun Pareto sınırından kurulur.
+"""
+
+import math
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from config.settings import Settings
+
+# Ölçülmemiş seviye tahmini için kaba göreli maliyet çarpanları (ilk ölçümle değişir)
+_SAHI_COST = 2.5
+_AUGMENT_COST = 2.0
+
+
+@dataclass(frozen=True)
+class RuntimePlan:
+    """Tek kare için değişmez çalışma planı; ``None`` alanlar profil değerini korur."""
+
+    level: int
+    name: str
+    sahi_enabled: bool = True
+    augment: bool = True
+    focused_pass: bool = True
+    imgsz: Optional[int] = None
+    max_det: Optional[int] = None
+    conf_floor: Optional[float] = None
+    uap_uai_conf_floor: Optional[float] = None
+    degrade_send_interval: Optional[int] = None
+    budget_ms: float = 0.0
+    predicted_ms: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class LatencyController:
+    """Öğrenilen aşama gecikmelerine göre kalite seviyesini kademeli ayarlar."""
+
+    def __init__(
+        self,
+        levels: Optional[Sequence[Dict[str, Any]]] = None,
+        budget_ms: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        levels = levels if levels is not None else getattr(Settings, "LATENCY_QUALITY_LEVELS", ())
+        self._levels: List[Dict[str, Any]] = [dict(level) for level in levels] or [{"name": "full"}]
+        if budget_ms is None:
+            budget_ms = float(getattr(Settings, "LATENCY_FRAME_BUDGET_MS", 0.0))
+        if budget_ms <= 0.0:
+            budget_ms = 1000.0 / max(1e-3, float(getattr(Settings, "LOW_FPS_GUARD_THRESHOLD", 1.0)))
+        self.budget_ms = float(budget_ms)
+        # Çıkış eşiği: üst seviye tahmini bu bütçeye sığmalı (eski guard'ın recovery FPS'i)
+        recovery_fps = float(getattr(Settings, "LOW_FPS_GUARD_RECOVERY_THRESHOLD", 1.4))
+        guard_fps = float(getattr(Settings, "LOW_FPS_GUARD_THRESHOLD", 1.0))
+        self.upgrade_budget_ms = self.budget_ms * min(1.0, guard_fps / max(1e-3, recovery_fps))
+        self._alpha = min(1.0, max(0.01, float(getattr(Settings, "LATENCY_MODEL_EMA_ALPHA", 0.2))))
+        self._down_streak_needed = max(1, int(getattr(Settings, "LATENCY_DOWNGRADE_STREAK", 2)))
+        self._up_streak_needed = max(1, int(getattr(Settings, "LOW_FPS_GUARD_RECOVERY_STREAK", 12)))
+        self._min_dwell = max(0, int(getattr(Settings, "LATENCY_MIN_DWELL_FRAMES", 5)))
+        self._stale_frames = max(1.0, float(getattr(Settings, "LATENCY_MODEL_STALE_FRAMES", 30)))
+
+        self._clock = clock
+        self._level = 0
+        self._model: Dict[tuple, float] = {}
+        self._observations = 0
+        self._last_seen: Dict[int, int] = {}
+        self._down_streak = 0
+        self._up_streak = 0
+        self._frames_since_change = 0
+        self._level_since = clock()
+        self._time_at_level = [0.0] * len(self._levels)
+        self._frames_at_level = [0] * len(self._levels)
+        # Kalibrasyon tablosundan gelen seviyeler ölçülmüş gecikmeyle tohumlanır
+        for idx, spec in enumerate(self._levels):
+            if spec.get("measured_ms"):
+                self._model[("detect", idx)] = float(spec["measured_ms"])
+                self._last_seen[idx] = 0
+        self._plan = self._build_plan(0)
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    def current_plan(self) -> RuntimePlan:
+        """Bir sonraki kare için değişmez plan (seviye değişene kadar aynı nesne)."""
+        return self._plan
+
+    def plans(self) -> List[RuntimePlan]:
+        """Tüm seviyelerin planları, en kaliteliden en ucuza."""
+        return [self._build_plan(level) for level in range(len(self._levels))]
+
+    def _build_plan(self, level: int) -> RuntimePlan:
+        spec = self._levels[level]
+        return RuntimePlan(
+            level=level,
+            name=str(spec.get("name", f"level{level}")),
+            sahi_enabled=bool(spec.get("sahi_enabled", True)),
+            augment=bool(spec.get("augment", True)),
+            focused_pass=bool(spec.get("focused_pass", True)),
+            imgsz=spec.get("imgsz"),
+            max_det=spec.get("max_det"),
+            conf_floor=spec.get("conf_floor"),
+            uap_uai_conf_floor=spec.get("uap_uai_conf_floor"),
+            degrade_send_interval=spec.get("degrade_send_interval"),
+            budget_ms=self.budget_ms,
+            predicted_ms=self.predict_ms(level),
+        )
+
+    def _relative_cost(self, level: int) -> float:
+        spec = self._levels[level]
+        if spec.get("measured_ms"):
+            return float(spec["measured_ms"])
+        imgsz = float(spec.get("imgsz") or Settings.INFERENCE_SIZE)
+        imgsz = min(imgsz, float(Settings.INFERENCE_SIZE))
+        cost = imgsz * imgsz
+        if bool(spec.get("sahi_enabled", True)) and bool(getattr(Settings, "SAHI_ENABLED", False)):
+            cost *= _SAHI_COST
+        if bool(spec.get("augment", True)) and bool(getattr(Settings, "AUGMENTED_INFERENCE", False)):
+            cost *= _AUGMENT_COST
+        return cost
+
+    def _scaled_detect_ms(self, level: int, source: int) -> float:
+        return self._model[("detect", source)] * (
+            self._relative_cost(level) / max(1.0, self._relative_cost(source))
+        )
+
+    def predict_ms(self, level: int) -> Optional[float]:
+        """Seviye için tahmini kare süresi (detect + other); hiç ölçüm yoksa None.
+
+        Ölçülmemiş seviye en yakın ölçülmüş seviyeden maliyet oranıyla tahmin edilir.
+        Eski ölçüm (yük/sahne değişmiş olabilir) yaşlandıkça aktif seviyeden ölçeklenen
+        tahmine doğru kayar; aksi halde tek bir yavaş kare üst seviyeyi kalıcı kilitler.
+        """
+        detect = self._detect_estimate(level)
+        if detect is None:
+            return None
+        return detect + self._model.get(("other", None), 0.0)
+
+    def _detect_estimate(self, level: int) -> Optional[float]:
+        measured = [lvl for (stage, lvl) in self._model if stage == "detect"]
+        if not measured:
+            return None
+        detect = self._model.get(("detect", level))
+        if detect is None:
+            nearest = min(measured, key=lambda lvl: abs(lvl - level))
+            detect = self._scaled_detect_ms(level, nearest)
+        elif level != self._level and ("detect", self._level) in self._model:
+            age = self._observations - self._last_seen.get(level, self._observations)
+            weight = math.exp(-age / self._stale_frames)
+            detect = weight * detect + (1.0 - weight) * self._scaled_detect_ms(level, self._level)
+        return detect
+
+    def _update_model(self, key: tuple, value_ms: float) -> None:
+        prev = self._model.get(key)
+        self._model[key] = value_ms if prev is None else prev + self._alpha * (value_ms - prev)
+
+    def observe(self, plan: RuntimePlan, frame_ms: float, detect_ms: Optional[float]) -> Optional[str]:
+        """Tamamlanan karenin gecikmesini modele işler; seviye değiştiyse "down"/"up" döner."""
+        self._frames_at_level[plan.level] += 1
+        if detect_ms is None:
+            return None
+        self._observations += 1
+        self._last_seen[plan.level] = self._observations
+        self._update_model(("detect", plan.level), max(0.0, float(detect_ms)))
+        self._update_model(("other", None), max(0.0, float(frame_ms) - float(detect_ms)))
+        self._frames_since_change += 1
+        if self._frames_since_change < self._min_dwell:
+            return None
+
+        current = self.predict_ms(self._level)
+        if current is not None and current > self.budget_ms:
+            self._down_streak += 1
+        else:
+            self._down_streak = 0
+        if self._down_streak >= self._down_streak_needed and self._level < len(self._levels) - 1:
+            self._set_level(self._level + 1)
+            return "down"
+
+        if self._level > 0:
+            upper = self.predict_ms(self._level - 1)
+            if upper is not None and upper <= self.upgrade_budget_ms:
+                self._up_streak += 1
+            else:
+                self._up_streak = 0
+            if self._up_streak >= self._up_streak_needed:
+                self._set_level(self._level - 1)
+                return "up"
+        return None
+
+    def _set_level(self, level: int) -> None:
+        # Geçilen seviyenin eski ölçümü harmanlanmış tahminle yeniden tohumlanır
+        if ("detect", level) in self._model:
+            self._model[("detect", level)] = self._detect_estimate(level)
+        now = self._clock()
+        self._time_at_level[self._level] += now - self._level_since
+        self._level_since = now
+        self._level = level
+        self._down_streak = 0
+        self._up_streak = 0
+        self._frames_since_change = 0
+        self._plan = self._build_plan(level)
+
+    def time_at_level(self) -> Dict[str, Dict[str, float]]:
+        """Seviye adı → {"sec", "frames"} (aktif seviyenin süresi şu ana kadar)."""
+        elapsed = list(self._time_at_level)
+        elapsed[self._level] += self._clock() - self._level_since
+        return {
+            str(spec.get("name", f"level{idx}")): {
+                "sec": round(elapsed[idx], 3),
+                "frames": int(self._frames_at_level[idx]),
+            }
+            for idx, spec in enumerate(self._levels)
+        }
+
+
+def table_quality_levels(table: Any, **filters: Any) -> List[Dict[str, Any]]:
+    """Gecikme tablosunun Pareto sınırından kalite seviyeleri (PROTECTIVE_* sabitleri yerine)."""
+    levels: List[Dict[str, Any]] = []
+    for idx, row in enumerate(table.pareto_levels(**filters)):
+        name = f"{int(row['imgsz'])}{'+sahi' if row['sahi'] else ''}{'+focus' if row['focused'] else ''}"
+        level = {
+            "name": name,
+            "imgsz": int(row["imgsz"]),
+            "sahi_enabled": bool(row["sahi"]),
+            "focused_pass": bool(row["focused"]),
+            "measured_ms": float(row["p50_ms"]),
+        }
+        if idx:
+            level["augment"] = False
+        levels.append(level)
+    return levels
+
+
+def session_quality_levels(filters: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Bu makine için gecikme tablosu varsa onun seviyeleri, yoksa None (LATENCY_QUALITY_LEVELS)."""
+    from src.latency_table import load_latency_table
+
+    table = load_latency_table()
+    if table is None:
+        return None
+    return table_quality_levels(table, **filters) or None
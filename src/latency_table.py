@@ -0,0 +1,330 @@
+"""Makineye özgü inference gecikme tablosu (kalibrasyon taraması + seçim).
+
+``tools/calibrate_latency.py`` (veya LATENCY_TABLE_CALIBRATE_ON_STARTUP) detektörü datasets/
+kareleri üzerinde imgsz × SAHI × odaklı geçiş × half × thread ızgarasında zamanlar ve
+sonucu LATENCY_TABLE_DIR altında ``<model>-<sha256[:16]>-<donanım[:12]>.json`` olarak yazar.
+Donanım ya da model dosyası değişince anahtar değişir ve eski tablo kullanılmaz.
+
+Tüketiciler:
+- ``ObjectDetector._build_inference_config`` light profile'da LIGHT_PROFILE_* sabitleri yerine
+  bütçeye sığan en kaliteli ölçülmüş konfigürasyonu seçer.
+- ``LatencyController`` kalite seviyelerini tablonun Pareto sınırından kurar ve gecikme
+  modelini ölçülmüş değerlerle tohumlar.
+"""
+
+import hashlib
+import json
+import os
+import platform
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import Settings
+from src.utils import Logger
+
+TABLE_VERSION = 1
+
+_table_cache: Dict[str, Optional["LatencyTable"]] = {}
+_fingerprint_hash: Optional[str] = None
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def hardware_fingerprint() -> Dict[str, Any]:
+    """Gecikmeyi belirleyen donanım özellikleri (CPU modeli/çekirdek, GPU adı/bellek)."""
+    info: Dict[str, Any] = {
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "cpu": _cpu_model(),
+        "cpu_count": int(os.cpu_count() or 1),
+        "gpu": None,
+    }
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            props = torch.cuda.get_device_properties(0)
+            info["gpu"] = f"{torch.cuda.get_device_name(0)}/{int(props.total_memory) >> 20}MB"
+    except Exception:
+        pass
+    return info
+
+
+def fingerprint_hash(info: Optional[Dict[str, Any]] = None) -> str:
+    """Donanım parmak izinin SHA-256'sı; bu makine için süreç içinde bir kez hesaplanır."""
+    global _fingerprint_hash
+    if info is None and _fingerprint_hash is not None:
+        return _fingerprint_hash
+    payload = json.dumps(info or hardware_fingerprint(), sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    if info is None:
+        _fingerprint_hash = digest
+    return digest
+
+
+def latency_table_path(model_path: str, table_dir: Optional[str] = None) -> str:
+    from src.inference_engine import model_file_hash
+
+    directory = table_dir or str(getattr(Settings, "LATENCY_TABLE_DIR", "model/latency_tables"))
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(
+        directory, f"{stem}-{model_file_hash(model_path)[:16]}-{fingerprint_hash()[:12]}.json"
+    )
+
+
+def detection_budget_ms() -> float:
+    """Tespite ayrılan kare başı bütçe: kare bütçesinin LATENCY_TABLE_DETECT_SHARE payı."""
+    budget = float(getattr(Settings, "LATENCY_FRAME_BUDGET_MS", 0.0))
+    if budget <= 0.0:
+        budget = 1000.0 / max(1e-3, float(getattr(Settings, "LOW_FPS_GUARD_THRESHOLD", 1.0)))
+    share = min(1.0, max(0.05, float(getattr(Settings, "LATENCY_TABLE_DETECT_SHARE", 0.8))))
+    return budget * share
+
+
+def _quality_key(entry: Dict[str, Any]) -> tuple:
+    # Kalite sırası: çözünürlük > SAHI > odaklı geçiş
+    return (int(entry["imgsz"]), bool(entry["sahi"]), bool(entry["focused"]))
+
+
+class LatencyTable:
+    """Ölçülmüş konfigürasyon satırları: imgsz, sahi, focused, half, threads, backend, p50/p90 ms."""
+
+    def __init__(self, entries: Sequence[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> None:
+        self.entries: List[Dict[str, Any]] = [dict(entry) for entry in entries]
+        self.meta: Dict[str, Any] = dict(meta or {})
+
+    def candidates(
+        self,
+        half: Optional[bool] = None,
+        backend: Optional[str] = None,
+        max_imgsz: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Koşullara uyan satırlar; aynı kalite anahtarında en hızlı thread sayısı kalır."""
+        best: Dict[tuple, Dict[str, Any]] = {}
+        for entry in self.entries:
+            if half is not None and bool(entry.get("half", False)) != bool(half):
+                continue
+            if backend is not None and str(entry.get("backend", backend)) != backend:
+                continue
+            if max_imgsz is not None and int(entry["imgsz"]) > int(max_imgsz):
+                continue
+            key = _quality_key(entry)
+            if key not in best or float(entry["p90_ms"]) < float(best[key]["p90_ms"]):
+                best[key] = entry
+        return sorted(best.values(), key=_quality_key, reverse=True)
+
+    def select(self, budget_ms: float, **filters: Any) -> Optional[Dict[str, Any]]:
+        """p90'ı bütçeye sığan en kaliteli satır; hiçbiri sığmıyorsa en hızlısı."""
+        rows = self.candidates(**filters)
+        if not rows:
+            return None
+        for entry in rows:
+            if float(entry["p90_ms"]) <= float(budget_ms):
+                return entry
+        return min(rows, key=lambda entry: float(entry["p90_ms"]))
+
+    def pareto_levels(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Kaliteden ucuza, her biri bir öncekinden ölçülü olarak hızlı olan satırlar."""
+        levels: List[Dict[str, Any]] = []
+        for entry in self.candidates(**filters):
+            if levels and float(entry["p50_ms"]) >= float(levels[-1]["p50_ms"]):
+                continue
+            levels.append(entry)
+        return levels
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": TABLE_VERSION, "meta": self.meta, "entries": self.entries}
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.to_dict(), handle, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        _table_cache.clear()
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LatencyTable"]:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if int(data.get("version", 0)) != TABLE_VERSION:
+            return None
+        return cls(data.get("entries", []), data.get("meta", {}))
+
+
+def load_latency_table(model_path: Optional[str] = None) -> Optional[LatencyTable]:
+    """Bu makine + model için tablo (yoksa / kapalıysa None); süreç içinde önbelleklenir."""
+    if not bool(getattr(Settings, "LATENCY_TABLE_ENABLED", False)):
+        return None
+    model_path = model_path or Settings.MODEL_PATH
+    try:
+        path = latency_table_path(model_path)
+    except OSError:
+        return None
+    if path not in _table_cache:
+        _table_cache[path] = LatencyTable.load(path)
+    return _table_cache[path]
+
+
+def calibration_grid(
+    sizes: Iterable[int],
+    half_options: Iterable[bool],
+    thread_options: Iterable[int],
+    sahi_options: Iterable[bool] = (False, True),
+    focused_options: Iterable[bool] = (False, True),
+) -> List[Dict[str, Any]]:
+    return [
+        {"imgsz": int(size), "sahi": bool(sahi), "focused": bool(focused), "half": bool(half), "threads": int(threads)}
+        for size in sizes
+        for sahi in sahi_options
+        for focused in focused_options
+        for half in half_options
+        for threads in thread_options
+    ]
+
+
+def default_grid(
+    device: str,
+    sizes: Optional[Sequence[int]] = None,
+    threads: Optional[Sequence[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Cihaza uygun ızgara: half ve odaklı geçiş yalnızca CUDA'da anlamlıdır."""
+    cuda = device == "cuda"
+    sizes = sizes or tuple(getattr(Settings, "LATENCY_CALIBRATION_SIZES", (512, 640, 960, 1280)))
+    if not threads:
+        threads = tuple(getattr(Settings, "LATENCY_CALIBRATION_THREADS", ())) or (
+            int(getattr(Settings, "NON_CUDA_CPU_THREADS", os.cpu_count() or 1)),
+        )
+    return calibration_grid(
+        sizes=sorted({int(size) for size in sizes}),
+        half_options=(False, True) if cuda else (False,),
+        thread_options=sorted({max(1, int(t)) for t in threads}),
+        focused_options=(False, True) if cuda else (False,),
+    )
+
+
+def calibrate_and_save(
+    detector: Any,
+    frame_count: Optional[int] = None,
+    grid: Optional[Sequence[Dict[str, Any]]] = None,
+    repeat: int = 1,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Optional[str]:
+    """datasets/ sekanslarından eşit aralıklı kareleri kullanıp taramayı çalıştırır ve yazar."""
+    from src.quantization import sample_frames
+
+    count = int(frame_count or getattr(Settings, "LATENCY_CALIBRATION_FRAMES", 8))
+    stride = max(1, int(getattr(Settings, "INT8_FRAME_STRIDE", 10)))
+    frames = [sample["frame"] for sample in sample_frames(count, stride)]
+    if not frames:
+        Logger("LatencyCal").warn("Kalibrasyon karesi bulunamadı (datasets/ boş mu?)")
+        return None
+    table = run_calibration_sweep(
+        detector, frames, grid or default_grid(detector.device), repeat=repeat, progress=progress
+    )
+    return table.save(latency_table_path(Settings.MODEL_PATH))
+
+
+def run_calibration_sweep(
+    detector: Any,
+    frames: Sequence[np.ndarray],
+    grid: Sequence[Dict[str, Any]],
+    repeat: int = 1,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> LatencyTable:
+    """Her ızgara noktasında ``detector.detect()`` kare süresini ölçer.
+
+    Konfigürasyon, bu sürecin Settings'ine yazılarak uygulanır (kalibrasyon çevrimdışı /
+    oturum öncesi çalışır) ve tarama sonunda eski değerlere döndürülür; detektörün oturum
+    durumu ``reset_session_state`` ile sıfırlanır.
+    """
+    import torch
+
+    log = Logger("LatencyCal")
+    keys = (
+        "INFERENCE_SIZE",
+        "SAHI_ENABLED",
+        "UAP_UAI_FOCUSED_PASS_ENABLED",
+        "CASCADE_ENABLED",
+        "ALTITUDE_PLAN_ENABLED",
+    )
+    saved = {key: getattr(Settings, key, None) for key in keys}
+    saved_half = bool(getattr(detector, "_use_half", False))
+    saved_cpu_threads = getattr(detector, "_cpu_threads", None)
+    try:
+        saved_threads = int(torch.get_num_threads())
+    except Exception:
+        saved_threads = None
+
+    backend = str(getattr(Settings, "INFERENCE_BACKEND", "ultralytics")).strip().lower()
+    entries: List[Dict[str, Any]] = []
+    try:
+        Settings.CASCADE_ENABLED = False
+        Settings.ALTITUDE_PLAN_ENABLED = False
+        for config in grid:
+            Settings.INFERENCE_SIZE = int(config["imgsz"])
+            Settings.SAHI_ENABLED = bool(config["sahi"])
+            Settings.UAP_UAI_FOCUSED_PASS_ENABLED = bool(config["focused"])
+            detector._cpu_threads = int(config["threads"])  # ONNX motoru detektörden okur
+            detector._use_half = bool(config["half"])
+            detector._inference_engine = None  # thread/half değişikliği motoru yeniden kurar
+            detector._inference_engine_failed = False
+            try:
+                torch.set_num_threads(int(config["threads"]))
+            except Exception:
+                pass
+
+            detector.detect(frames[0])  # ısınma (oturum/plan kurulumu)
+            timings: List[float] = []
+            for _ in range(max(1, int(repeat))):
+                for frame in frames:
+                    start = time.perf_counter()
+                    detector.detect(frame)
+                    timings.append((time.perf_counter() - start) * 1000.0)
+            entry = dict(
+                config,
+                backend=backend,
+                p50_ms=round(float(np.percentile(timings, 50)), 3),
+                p90_ms=round(float(np.percentile(timings, 90)), 3),
+                frames=len(timings),
+            )
+            entries.append(entry)
+            if progress is not None:
+                progress(entry)
+    finally:
+        for key, value in saved.items():
+            setattr(Settings, key, value)
+        detector._use_half = saved_half
+        detector._cpu_threads = saved_cpu_threads
+        detector._inference_engine = None
+        if saved_threads is not None:
+            try:
+                torch.set_num_threads(saved_threads)
+            except Exception:
+                pass
+        # Kalibrasyon kareleri (sayaç, zamansal geçmiş, tile cache, ...) oturuma taşınmasın
+        detector.reset_session_state()
+
+    log.info(f"Kalibrasyon tamamlandı: {len(entries)} konfigürasyon")
+    meta = {
+        "hardware": hardware_fingerprint(),
+        "model": os.path.basename(Settings.MODEL_PATH),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "frames": len(frames),
+    }
+    return LatencyTable(entries, meta)
@@ -0,0 +1,312 @@
+"""Sınıf-duyarlı / sınıf-agnostik NMS backend'leri.
+
+Backend'ler (Settings.NMS_BACKEND):
+- greedy      : Sınıf başına while-döngüsü (referans implementasyon)
+- numpy       : Sınıf başına tek IoU matrisi + maske tabanlı greedy çözüm. Koordinat
+                offset'i eklenmez: sınıf blokları aynı ayrımı sağlar ve float32 IoU
+                değerleri referansla bit düzeyinde aynı kalır
+- torchvision : torchvision.ops.batched_nms (koordinat-offset hilesiyle tek çağrı, modelin cihazında)
+
+Tüm backend'ler çıktıyı referansla aynı sıraya getirir: sınıf id artan,
+sınıf içinde skor azalan (eşit skorda büyük indeks önce).
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import Settings
+from src.utils import Logger
+
+VALID_BACKENDS = ("greedy", "numpy", "torchvision")
+
+
+def greedy_nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> List[int]:
+    x1 = boxes[:, 0]
+    y1 = boxes[:, 1]
+    x2 = boxes[:, 2]
+    y2 = boxes[:, 3]
+    areas = np.maximum((x2 - x1) * (y2 - y1), 1e-6)
+
+    order = np.argsort(scores, kind="stable")[::-1]
+    keep: List[int] = []
+
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+
+        if order.size == 1:
+            break
+
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+
+        inter_w = np.maximum(0.0, xx2 - xx1)
+        inter_h = np.maximum(0.0, yy2 - yy1)
+        intersection = inter_w * inter_h
+
+        union = areas[i] + areas[order[1:]] - intersection
+        iou = intersection / np.maximum(union, 1e-6)
+
+        remaining = np.where(iou <= iou_threshold)[0]
+        order = order[remaining + 1]
+
+    return keep
+
+
+def class_aware_greedy_nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    iou_threshold: float,
+) -> np.ndarray:
+    """Referans: her sınıf için ayrı greedy_nms çağrısı."""
+    boxes = np.asarray(boxes, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    keep_indices: List[int] = []
+    for cls_id in np.unique(class_ids):
+        cls_indices = np.flatnonzero(class_ids == cls_id)
+        nms_keep = greedy_nms(boxes[cls_indices], scores[cls_indices], iou_threshold)
+        keep_indices.extend(cls_indices[nms_keep].tolist())
+    return np.asarray(keep_indices, dtype=np.int64)
+
+
+def pairwise_iou_f32(boxes: np.ndarray) -> np.ndarray:
+    """(N, N) float32 IoU matrisi; greedy_nms ile aynı işlem sırası."""
+    boxes = np.asarray(boxes, dtype=np.float32)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum((x2 - x1) * (y2 - y1), 1e-6)
+    inter_w = np.maximum(
+        0.0, np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :])
+    )
+    inter_h = np.maximum(
+        0.0, np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :])
+    )
+    intersection = inter_w * inter_h
+    union = areas[:, None] + areas[None, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+
+def _canonical_order(keep: np.ndarray, class_ids: Optional[np.ndarray]) -> np.ndarray:
+    """Skor sıralı keep dizisini referans çıktı sırasına getirir."""
+    if class_ids is None or len(keep) == 0:
+        return keep
+    return keep[np.argsort(class_ids[keep], kind="stable")]
+
+
+def matrix_nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: Optional[np.ndarray],
+    iou_threshold: float,
+    iou_matrix: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """IoU matrisiyle greedy NMS (class_ids=None → sınıf-agnostik).
+
+    Sınıflar skor sırasını koruyan bloklara ayrılır; bloklar arası çiftler hiç
+    hesaplanmaz. iou_matrix verilirse (giriş sırasında, pairwise_iou_f32 çıktısı)
+    yeniden hesaplanmaz; hybrid modda iki geçiş aynı matrisi paylaşır.
+    """
+    if len(scores) == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(np.asarray(scores, dtype=np.float32), kind="stable")[::-1]
+    if class_ids is None:
+        groups = [order]
+    else:
+        ordered_cls = np.asarray(class_ids)[order]
+        groups = [order[ordered_cls == cls_id] for cls_id in np.unique(ordered_cls)]
+
+    boxes = np.asarray(boxes)
+    keep_parts: List[np.ndarray] = []
+    for members in groups:
+        if iou_matrix is None:
+            iou = pairwise_iou_f32(boxes[members])
+        else:
+            iou = iou_matrix[np.ix_(members, members)]
+        # Satır a yalnızca kendisinden sonra gelen (daha düşük skorlu) kutuları bastırır
+        suppresses = np.triu(iou > iou_threshold, k=1)
+        removed = np.zeros(len(members), dtype=bool)
+        for anchor in np.flatnonzero(suppresses.any(axis=1)):
+            if not removed[anchor]:
+                removed |= suppresses[anchor]
+        keep_parts.append(members[~removed])
+    return np.concatenate(keep_parts).astype(np.int64)
+
+
+def weighted_box_fusion(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    iou_threshold: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sınıf-duyarlı WBF: kümele ve skor ağırlıklı ortala.
+
+    Kümeler matrix_nms ile aynı greedy sırayla kurulur (en yüksek skorlu kutu
+    çapa, IoU > eşik olan aynı sınıf kutular üyesi); kutu koordinatları skor
+    ağırlıklı ortalama, skor küme ortalamasıdır.
+
+    Returns:
+        (çapa indeksleri, birleşik kutular (K, 4) float64, birleşik skorlar (K,))
+    """
+    count = len(scores)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4)), np.zeros(0)
+    boxes = np.asarray(boxes, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(scores.astype(np.float32), kind="stable")[::-1]
+    ordered_cls = np.asarray(class_ids)[order]
+
+    cluster_of = np.arange(count, dtype=np.int64)  # satır → çapa satırı
+    anchors: List[np.ndarray] = []
+    for cls_id in np.unique(ordered_cls):
+        members = order[ordered_cls == cls_id]
+        joins = np.triu(pairwise_iou_f32(boxes[members]) > iou_threshold, k=1)
+        absorbed = np.zeros(len(members), dtype=bool)
+        for pos in np.flatnonzero(joins.any(axis=1)):
+            if absorbed[pos]:
+                continue
+            followers = joins[pos] & ~absorbed
+            absorbed |= followers
+            cluster_of[members[followers]] = members[pos]
+        anchors.append(members[~absorbed])
+    anchor_idx = np.concatenate(anchors).astype(np.int64)
+
+    # Küme toplamları: her satır kendi çapasının slotuna eklenir
+    slot = np.full(count, -1, dtype=np.int64)
+    slot[anchor_idx] = np.arange(len(anchor_idx))
+    row_slot = slot[cluster_of]
+    weight_sum = np.bincount(row_slot, weights=scores, minlength=len(anchor_idx))
+    member_count = np.bincount(row_slot, minlength=len(anchor_idx))
+    fused_boxes = np.zeros((len(anchor_idx), 4), dtype=np.float64)
+    np.add.at(fused_boxes, row_slot, boxes * scores[:, None])
+    fused_boxes /= np.maximum(weight_sum, 1e-12)[:, None]
+    fused_scores = weight_sum / np.maximum(member_count, 1)
+
+    # Tekil kümeler birebir korunur (ortalama yuvarlama hatası taşımasın)
+    single = member_count == 1
+    fused_boxes[single] = boxes[anchor_idx[single]]
+    fused_scores[single] = scores[anchor_idx[single]]
+    return anchor_idx, fused_boxes, fused_scores
+
+
+def torchvision_nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: Optional[np.ndarray],
+    iou_threshold: float,
+    device: str = "cpu",
+) -> np.ndarray:
+    """torchvision.ops.(batched_)nms; ImportError dışarı taşınır."""
+    import torch
+    import torchvision
+
+    if len(scores) == 0:
+        return np.zeros(0, dtype=np.int64)
+    boxes_t = torch.as_tensor(np.asarray(boxes, dtype=np.float32), device=device)
+    scores_t = torch.as_tensor(np.asarray(scores, dtype=np.float32), device=device)
+    if class_ids is None:
+        keep_t = torchvision.ops.nms(boxes_t, scores_t, float(iou_threshold))
+    else:
+        idxs_t = torch.as_tensor(np.asarray(class_ids, dtype=np.int64), device=device)
+        keep_t = torchvision.ops.batched_nms(boxes_t, scores_t, idxs_t, float(iou_threshold))
+    keep = np.asarray(keep_t.detach().cpu().numpy(), dtype=np.int64)
+    return _canonical_order(keep, class_ids)
+
+
+class NmsRunner:
+    """Ayarlı backend'i çalıştırır; doğrulama modunda referansla karşılaştırır."""
+
+    def __init__(self, device: str = "cpu") -> None:
+        self.log = Logger("NMS")
+        self.device = device
+        self.verify_checks = 0
+        self.verify_mismatches = 0
+        self._warned_backend: Optional[str] = None
+
+    def backend(self) -> str:
+        backend = str(getattr(Settings, "NMS_BACKEND", "numpy")).strip().lower()
+        if backend not in VALID_BACKENDS:
+            self._warn_once(
+                backend, f"Geçersiz NMS_BACKEND='{backend}', fallback=numpy uygulanıyor."
+            )
+            return "numpy"
+        return backend
+
+    def run(
+        self,
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        class_ids: Optional[np.ndarray],
+        iou_threshold: float,
+        iou_matrix: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Korunan satır indeksleri (referans sırasıyla)."""
+        backend = self.backend()
+        if backend == "numpy" and len(scores) > int(
+            getattr(Settings, "NMS_MATRIX_MAX_BOXES", 2048)
+        ):
+            # N² bellek sınırı: çok kalabalık karelerde referans döngüye düş
+            backend = "greedy"
+
+        if backend == "torchvision":
+            try:
+                keep = torchvision_nms(boxes, scores, class_ids, iou_threshold, self.device)
+            except ImportError:
+                self._warn_once(
+                    "torchvision", "torchvision bulunamadı; NMS_BACKEND=numpy kullanılıyor."
+                )
+                keep = matrix_nms(boxes, scores, class_ids, iou_threshold, iou_matrix)
+        elif backend == "numpy":
+            keep = matrix_nms(boxes, scores, class_ids, iou_threshold, iou_matrix)
+        else:
+            keep = self._reference(boxes, scores, class_ids, iou_threshold)
+
+        if backend != "greedy" and bool(getattr(Settings, "NMS_VERIFY_BACKEND", False)):
+            keep = self._verify(keep, boxes, scores, class_ids, iou_threshold, backend)
+        return keep
+
+    @staticmethod
+    def _reference(
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        class_ids: Optional[np.ndarray],
+        iou_threshold: float,
+    ) -> np.ndarray:
+        if class_ids is None:
+            keep = greedy_nms(
+                np.asarray(boxes, dtype=np.float32),
+                np.asarray(scores, dtype=np.float32),
+                float(iou_threshold),
+            )
+            return np.asarray(keep, dtype=np.int64)
+        return class_aware_greedy_nms(boxes, scores, class_ids, float(iou_threshold))
+
+    def _verify(
+        self,
+        keep: np.ndarray,
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        class_ids: Optional[np.ndarray],
+        iou_threshold: float,
+        backend: str,
+    ) -> np.ndarray:
+        reference = self._reference(boxes, scores, class_ids, iou_threshold)
+        self.verify_checks += 1
+        if np.array_equal(keep, reference):
+            return keep
+        self.verify_mismatches += 1
+        if self.verify_mismatches == 1 or self.verify_mismatches % 100 == 0:
+            self.log.warn(
+                f"NMS backend={backend} referanstan farklı "
+                f"(backend={len(keep)} ref={len(reference)}, "
+                f"mismatch={self.verify_mismatches}/{self.verify_checks}); referans kullanılıyor."
+            )
+        return reference
+
+    def _warn_once(self, key: str, message: str) -> None:
+        if self._warned_backend == key:
+            return
+        self._warned_backend = key
+        self.log.warn(message)
@@ -6,9 +6,11 @@ ASSUMPTION: Guardrail eşikleri deneysel olarak belirlenmiştir;
 config ile kapatılabilir (GUARDRAILS_ENABLED=False).
 """
 import logging
-from typing import Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 from config.settings import Settings
+from src.detection_batch import DetectionBatch, class_ids_from_keys
 from src.utils import Logger
 
 log = Logger("Postprocess")
@@ -20,26 +22,48 @@ def _cfg(attr: str, default):
     return getattr(Settings, attr, default)
 
 
-# ─── IoU helper ──────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class GuardrailParams:
+    """Çözümlenmiş guardrail eşikleri (detect aşama grafiği kurulurken bir kez okunur)."""
+
+    exempt_ids: np.ndarray
+    overlap_area_ratio: float
+    overlap_iou: float
+    scene_outlier_factor: float
+    scene_min_samples: int
+    crowd_threshold: int
+    crowd_conf_boost: float
+    base_conf: float
+
+
+def resolve_guardrail_params() -> GuardrailParams:
+    return GuardrailParams(
+        exempt_ids=class_ids_from_keys(_cfg("GUARDRAIL_EXEMPT_CLASSES", ("2", "3"))),
+        overlap_area_ratio=float(_cfg("GUARDRAIL_OVERLAP_AREA_RATIO", 5.0)),
+        overlap_iou=float(_cfg("GUARDRAIL_OVERLAP_IOU", 0.15)),
+        scene_outlier_factor=float(_cfg("GUARDRAIL_SCENE_OUTLIER_FACTOR", 8.0)),
+        scene_min_samples=int(_cfg("GUARDRAIL_SCENE_MIN_SAMPLES", 3)),
+        crowd_threshold=int(_cfg("GUARDRAIL_CROWD_THRESHOLD", 30)),
+        crowd_conf_boost=float(_cfg("GUARDRAIL_CROWD_CONF_BOOST", 0.15)),
+        base_conf=float(_cfg("CONFIDENCE_THRESHOLD", 0.40)),
+    )
 
-def _iou(a: Tuple[float, ...], b: Tuple[float, ...]) -> float:
-    """Intersection-over-Union for two (x1, y1, x2, y2) boxes."""
-    x1 = max(a[0], b[0])
-    y1 = max(a[1], b[1])
-    x2 = min(a[2], b[2])
-    y2 = min(a[3], b[3])
-    inter = max(0, x2 - x1) * max(0, y2 - y1)
-    if inter == 0:
-        return 0.0
-    area_a = max(1, (a[2] - a[0]) * (a[3] - a[1]))
-    area_b = max(1, (b[2] - b[0]) * (b[3] - b[1]))
-    return inter / (area_a + area_b - inter)
 
+# ─── Box helpers ─────────────────────────────────────────────────────────────
 
-def _area(det: Dict) -> float:
-    w = float(det["bottom_right_x"]) - float(det["top_left_x"])
-    h = float(det["bottom_right_y"]) - float(det["top_left_y"])
-    return max(1.0, w * h)
+def _pairwise_iou(boxes: np.ndarray, areas: np.ndarray) -> np.ndarray:
+    """(n, n) IoU matrisi; alanlar çağıran tarafından en az 1 px² kırpılmış verilir."""
+    inter_w = np.maximum(
+        0.0,
+        np.minimum(boxes[:, None, 2], boxes[None, :, 2]) - np.maximum(boxes[:, None, 0], boxes[None, :, 0]),
+    )
+    inter_h = np.maximum(
+        0.0,
+        np.minimum(boxes[:, None, 3], boxes[None, :, 3]) - np.maximum(boxes[:, None, 1], boxes[None, :, 1]),
+    )
+    inter = inter_w * inter_h
+    union = areas[:, None] + areas[None, :] - inter
+    return np.where(inter > 0, inter / union, 0.0)
 
 
 def _bbox(det: Dict) -> Tuple[float, float, float, float]:
@@ -53,34 +77,84 @@ def _bbox(det: Dict) -> Tuple[float, float, float, float]:
 
 # ─── Public API ──────────────────────────────────────────────────────────────
 
-def apply_guardrails(detections: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+def apply_guardrails(
+    detections: List[Dict], params: Optional[GuardrailParams] = None
+) -> Tuple[List[Dict], Dict[str, int]]:
     """Return (filtered detections, stats dict with elimination reasons).
 
     Stats keys: 'overlap_suppressed', 'scene_outlier', 'crowd_trimmed', 'total_input'.
+    ``params`` verilirse Settings okunmaz (GUARDRAILS_ENABLED kontrolü çağırana aittir).
     """
-    if not _cfg("GUARDRAILS_ENABLED", True):
-        return detections, {"total_input": len(detections)}
+    if params is None:
+        if not _cfg("GUARDRAILS_ENABLED", True):
+            return detections, {"total_input": len(detections)}
+        params = resolve_guardrail_params()
+
+    boxes = np.array([_bbox(d) for d in detections], dtype=np.float64).reshape(-1, 4)
+    class_ids = np.array([_class_id(d) for d in detections], dtype=np.int64)
+    scores = np.array(
+        [float(d.get("confidence", 1.0)) for d in detections], dtype=np.float64
+    )
+    keep, stats = _run_guardrails(boxes, class_ids, scores, params)
+    if len(keep) != len(detections):
+        detections = [detections[i] for i in keep.tolist()]
+    return detections, stats
+
+
+def apply_guardrails_batch(
+    batch: DetectionBatch, params: Optional[GuardrailParams] = None
+) -> Tuple[DetectionBatch, Dict[str, int]]:
+    """apply_guardrails'in kolonsal karşılığı; aynı istatistikleri döndürür."""
+    if params is None:
+        if not _cfg("GUARDRAILS_ENABLED", True):
+            return batch, {"total_input": len(batch)}
+        params = resolve_guardrail_params()
+    # Kurallar payload'a yazılan (2 haneye yuvarlanmış) koordinatlar üzerinde çalışır
+    keep, stats = _run_guardrails(
+        np.round(batch.boxes, 2), batch.class_ids, batch.scores, params
+    )
+    if len(keep) != len(batch):
+        batch = batch.select(keep)
+    return batch, stats
 
+
+def _class_id(det: Dict) -> int:
+    try:
+        return int(str(det.get("cls", "")))
+    except ValueError:
+        return -1
+
+
+def _run_guardrails(
+    boxes: np.ndarray,
+    class_ids: np.ndarray,
+    scores: np.ndarray,
+    params: GuardrailParams,
+) -> Tuple[np.ndarray, Dict[str, int]]:
     stats: Dict[str, int] = {
-        "total_input": len(detections),
+        "total_input": int(len(class_ids)),
         "overlap_suppressed": 0,
         "scene_outlier": 0,
         "crowd_trimmed": 0,
     }
-
-    result = detections
+    keep = np.arange(len(class_ids))
+    areas = np.maximum(1.0, (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]))
+    exempt = np.isin(class_ids, params.exempt_ids)
 
     # 1. Overlap Resolution: dev taşıt bbox + normal insan bbox → büyük olan bastırılır
-    result, n_overlap = _overlap_resolution(result)
-    stats["overlap_suppressed"] = n_overlap
+    suppressed = _overlap_resolution(boxes[keep], areas[keep], exempt[keep], params)
+    stats["overlap_suppressed"] = n_overlap = int(np.count_nonzero(suppressed))
+    keep = keep[~suppressed]
 
     # 2. Scene Consistency: aynı sınıf içinde outlier boyut → bastır
-    result, n_outlier = _scene_consistency(result)
-    stats["scene_outlier"] = n_outlier
+    suppressed = _scene_consistency(areas[keep], class_ids[keep], exempt[keep], params)
+    stats["scene_outlier"] = n_outlier = int(np.count_nonzero(suppressed))
+    keep = keep[~suppressed]
 
     # 3. Crowd Adaptivity: çok fazla tespit → düşük conf olanları kes
-    result, n_crowd = _crowd_adaptivity(result)
-    stats["crowd_trimmed"] = n_crowd
+    suppressed = _crowd_adaptivity(scores[keep], exempt[keep], params)
+    stats["crowd_trimmed"] = n_crowd = int(np.count_nonzero(suppressed))
+    keep = keep[~suppressed]
 
     total_removed = n_overlap + n_outlier + n_crowd
     if total_removed > 0:
@@ -89,109 +163,89 @@ def apply_guardrails(detections: List[Dict]) -> Tuple[List[Dict], Dict[str, int]
             f"(overlap={n_overlap}, outlier={n_outlier}, crowd={n_crowd})"
         )
 
-    return result, stats
+    return keep, stats
 
 
 # ─── Internal rules ──────────────────────────────────────────────────────────
+# Her kural bastırılacak satırlar için boolean maske döndürür.
 
-def _overlap_resolution(detections: List[Dict]) -> Tuple[List[Dict], int]:
+def _overlap_resolution(
+    boxes: np.ndarray, areas: np.ndarray, exempt: np.ndarray, params: GuardrailParams
+) -> np.ndarray:
     """İnsan bbox'u düzgünken dev Taşıt bbox'ı aynı bölgede → büyüğünü bastır.
 
     Şartname: Satır 149-150 - motosiklet sürücüsü Taşıt olmalı.
     Burada sadece MANTIK DIŞI boyut farkı olan çakışmayı çözeriz.
     """
-    area_ratio_threshold = float(_cfg("GUARDRAIL_OVERLAP_AREA_RATIO", 5.0))
-    iou_threshold = float(_cfg("GUARDRAIL_OVERLAP_IOU", 0.15))
+    suppressed = np.zeros(len(areas), dtype=bool)
+    idx = np.flatnonzero(~exempt)
+    if len(idx) < 2:
+        return suppressed
+
+    # Muaf olmayan kutular için tek IoU + alan oranı matrisi; üst üçgen = (i, j>i) çiftleri
+    sub_areas = areas[idx]
+    ratio = np.maximum(sub_areas[:, None], sub_areas[None, :]) / np.maximum(
+        np.minimum(sub_areas[:, None], sub_areas[None, :]), 1.0
+    )
+    conflict = (_pairwise_iou(boxes[idx], sub_areas) >= params.overlap_iou) & (
+        ratio >= params.overlap_area_ratio
+    )
+    conflict &= np.triu(np.ones_like(conflict), k=1)
+    # Satırdaki çiftte küçük olan i ise j, değilse i bastırılır (eşit alanda j)
+    i_larger = sub_areas[:, None] > sub_areas[None, :]
+
+    # Açgözlü sıra korunur: i satırı işlenirken i'den önce bastırılan j'ler atlanır;
+    # satır içinde yalnızca i ve o anki j değiştiği için satır tek maske güncellemesidir.
+    sub_suppressed = np.zeros(len(idx), dtype=bool)
+    for i in np.flatnonzero(conflict.any(axis=1)).tolist():
+        if sub_suppressed[i]:
+            continue
+        row = conflict[i] & ~sub_suppressed
+        sub_suppressed |= row & ~i_larger[i]
+        if bool((row & i_larger[i]).any()):
+            sub_suppressed[i] = True
+    suppressed[idx] = sub_suppressed
+    return suppressed
 
-    suppress_ids = set()
-    n = len(detections)
 
-    exempt = frozenset(str(c) for c in _cfg("GUARDRAIL_EXEMPT_CLASSES", ("2", "3")))
-    for i in range(n):
-        if i in suppress_ids:
-            continue
-        for j in range(i + 1, n):
-            if j in suppress_ids:
-                continue
-            di, dj = detections[i], detections[j]
-            if str(di.get("cls", "")) in exempt or str(dj.get("cls", "")) in exempt:
-                continue
-            bi, bj = _bbox(di), _bbox(dj)
-            overlap = _iou(bi, bj)
-            if overlap < iou_threshold:
-                continue
-            ai, aj = _area(di), _area(dj)
-            ratio = max(ai, aj) / max(min(ai, aj), 1.0)
-            if ratio >= area_ratio_threshold:
-                if ai > aj:
-                    suppress_ids.add(i)
-                else:
-                    suppress_ids.add(j)
-
-    removed = len(suppress_ids)
-    if removed:
-        detections = [d for idx, d in enumerate(detections) if idx not in suppress_ids]
-    return detections, removed
-
-
-def _scene_consistency(detections: List[Dict]) -> Tuple[List[Dict], int]:
+def _scene_consistency(
+    areas: np.ndarray, class_ids: np.ndarray, exempt: np.ndarray, params: GuardrailParams
+) -> np.ndarray:
     """Aynı sınıf içinde median alanın N katını aşan tespit → outlier.
 
     Örnek: 4 araba ~2000px², biri 50000px² → outlier.
     """
-    outlier_factor = float(_cfg("GUARDRAIL_SCENE_OUTLIER_FACTOR", 8.0))
-    min_samples = int(_cfg("GUARDRAIL_SCENE_MIN_SAMPLES", 3))
-
-    # Sınıf bazında alanları topla
-    class_areas: Dict[str, List[Tuple[int, float]]] = {}
-    for idx, det in enumerate(detections):
-        cls = str(det.get("cls", ""))
-        a = _area(det)
-        class_areas.setdefault(cls, []).append((idx, a))
-
-    exempt = frozenset(str(c) for c in _cfg("GUARDRAIL_EXEMPT_CLASSES", ("2", "3")))
-    suppress_ids = set()
-    for cls, items in class_areas.items():
-        if cls in exempt:
-            continue
-        if len(items) < min_samples:
-            continue
-        areas = [a for _, a in items]
-        median_area = float(np.median(areas))
-        if median_area < 1.0:
-            continue
-        threshold = median_area * outlier_factor
-        for idx, a in items:
-            if a > threshold:
-                suppress_ids.add(idx)
-
-    removed = len(suppress_ids)
-    if removed:
-        detections = [d for idx, d in enumerate(detections) if idx not in suppress_ids]
-    return detections, removed
+    suppressed = np.zeros(len(areas), dtype=bool)
+    if not bool((~exempt).any()):
+        return suppressed
+
+    # Sınıf başına median: (sınıf, alan) sıralaması üzerinde grup ortası
+    order = np.lexsort((areas, class_ids))
+    sorted_areas = areas[order]
+    _, starts, inverse, counts = np.unique(
+        class_ids[order], return_index=True, return_inverse=True, return_counts=True
+    )
+    medians = (sorted_areas[starts + (counts - 1) // 2] + sorted_areas[starts + counts // 2]) / 2.0
+    eligible = (counts >= params.scene_min_samples) & (medians >= 1.0)
+
+    row_group = np.empty(len(areas), dtype=np.int64)
+    row_group[order] = inverse.reshape(-1)
+    suppressed = (
+        ~exempt
+        & eligible[row_group]
+        & (areas > medians[row_group] * params.scene_outlier_factor)
+    )
+    return suppressed
 
 
-def _crowd_adaptivity(detections: List[Dict]) -> Tuple[List[Dict], int]:
+def _crowd_adaptivity(
+    scores: np.ndarray, exempt: np.ndarray, params: GuardrailParams
+) -> np.ndarray:
     """Tespit sayısı çok fazlaysa düşük conf olanları kes.
 
     Şartname max limit: RESULT_MAX_OBJECTS = 100 (per frame).
     Bunun altında bile olsa 30+ taşıt → gürültü olabilir.
     """
-    crowd_threshold = int(_cfg("GUARDRAIL_CROWD_THRESHOLD", 30))
-    crowd_conf_boost = float(_cfg("GUARDRAIL_CROWD_CONF_BOOST", 0.15))
-
-    if len(detections) <= crowd_threshold:
-        return detections, 0
-
-    exempt = frozenset(str(c) for c in _cfg("GUARDRAIL_EXEMPT_CLASSES", ("2", "3")))
-    base_conf = float(_cfg("CONFIDENCE_THRESHOLD", 0.40))
-    elevated_conf = base_conf + crowd_conf_boost
-
-    before = len(detections)
-    detections = [
-        d for d in detections
-        if str(d.get("cls", "")) in exempt
-        or float(d.get("confidence", 1.0)) >= elevated_conf
-    ]
-    removed = before - len(detections)
-    return detections, removed
+    if len(scores) <= params.crowd_threshold:
+        return np.zeros(len(scores), dtype=bool)
+    return ~exempt & (scores < params.base_conf + params.crowd_conf_boost)
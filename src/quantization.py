@@ -0,0 +1,295 @@
+"""INT8 post-training quantization (ONNX Runtime static QDQ) ve FP32'ye karşı değerlendirme.
+
+Kalibrasyon kareleri datasets/ altındaki tüm sekanslardan (DatasetLoader) eşit aralıklı
+örneklenir; değerlendirme kareleri aynı sekanslardan kalibrasyonla çakışmayacak şekilde
+kaydırılarak alınır. Karşılaştırma sınıf başına AP@0.5 ve kare başı gecikme üzerinden yapılır.
+Etiket yoksa FP32 tespitleri referans kabul edilir (FP32 AP = 1.0).
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import Settings
+from src.inference_engine import export_onnx, onnx_cache_path, to_input_blob
+from src.utils import Logger
+
+_CALIBRATION_METHODS = {
+    "minmax": "MinMax",
+    "entropy": "Entropy",
+    "percentile": "Percentile",
+}
+
+
+def sample_frames(
+    count: int, stride: int, offset: int = 0, sequences: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Her sekanstan ``offset + k*stride`` indeksli kareleri, toplam ``count`` olacak şekilde toplar.
+
+    Dönen öğeler: {"frame", "sequence", "frame_idx", "label_path"}.
+    """
+    from src.data_loader import DatasetLoader, get_available_sequences
+
+    available = get_available_sequences()
+    keys = list(sequences) if sequences else sorted(available)
+    if not keys or count <= 0:
+        return []
+    per_sequence = max(1, int(np.ceil(count / len(keys))))
+    stride = max(1, int(stride))
+    samples: List[Dict[str, Any]] = []
+    for key in keys:
+        info = available.get(key, {})
+        files = info.get("files") or []
+        loader = DatasetLoader(prefer_vid=True, seed=0, sequence=key)
+        taken = 0
+        for item in loader:
+            idx = int(item["frame_idx"])
+            if idx < offset or (idx - offset) % stride:
+                continue
+            label_path = yolo_label_path(files[idx]) if idx < len(files) else None
+            samples.append(
+                {
+                    "frame": item["frame"],
+                    "sequence": key,
+                    "frame_idx": idx,
+                    "label_path": label_path,
+                }
+            )
+            taken += 1
+            if taken >= per_sequence or len(samples) >= count:
+                break
+        if len(samples) >= count:
+            break
+    return samples
+
+
+def yolo_label_path(image_path: str) -> Optional[str]:
+    """``.../images/x.jpg`` → ``.../labels/x.txt`` (yoksa aynı dizindeki ``x.txt``)."""
+    stem = os.path.splitext(image_path)[0]
+    parts = stem.split(os.sep)
+    candidates = []
+    if "images" in parts:
+        idx = len(parts) - 1 - parts[::-1].index("images")
+        candidates.append(os.sep.join(parts[:idx] + ["labels"] + parts[idx + 1:]) + ".txt")
+    candidates.append(stem + ".txt")
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def load_yolo_labels(label_path: str, shape: Tuple[int, ...]) -> np.ndarray:
+    """YOLO txt (cls cx cy w h, normalize) → (N, 5) [x1, y1, x2, y2, cls] piksel."""
+    h, w = shape[:2]
+    rows = np.loadtxt(label_path, ndmin=2, dtype=np.float64)
+    if rows.size == 0:
+        return np.zeros((0, 5), dtype=np.float64)
+    cx, cy, bw, bh = rows[:, 1] * w, rows[:, 2] * h, rows[:, 3] * w, rows[:, 4] * h
+    return np.stack(
+        [cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2, rows[:, 0]], axis=1
+    )
+
+
+def _box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float64)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def average_precision_per_class(
+    predictions: Sequence[np.ndarray],
+    ground_truths: Sequence[np.ndarray],
+    iou_threshold: float = 0.5,
+) -> Dict[int, float]:
+    """Kare listeleri üzerinde sınıf başına AP (VOC all-point interpolasyon).
+
+    predictions: kare başına (N, 6) [x1, y1, x2, y2, conf, cls]
+    ground_truths: kare başına (M, 5) [x1, y1, x2, y2, cls]
+    Yalnızca referansta bulunan sınıflar raporlanır.
+    """
+    classes = sorted(
+        {int(c) for gt in ground_truths for c in np.asarray(gt).reshape(-1, 5)[:, 4]}
+    )
+    ap: Dict[int, float] = {}
+    for cls_id in classes:
+        scores: List[float] = []
+        hits: List[bool] = []
+        total_gt = 0
+        for pred, gt in zip(predictions, ground_truths):
+            pred = np.asarray(pred, dtype=np.float64).reshape(-1, 6)
+            gt = np.asarray(gt, dtype=np.float64).reshape(-1, 5)
+            p = pred[pred[:, 5] == cls_id]
+            g = gt[gt[:, 4] == cls_id]
+            total_gt += len(g)
+            if len(p) == 0:
+                continue
+            p = p[np.argsort(-p[:, 4], kind="stable")]
+            iou = _box_iou(p[:, :4], g[:, :4])
+            taken = np.zeros(len(g), dtype=bool)
+            for row in range(len(p)):
+                scores.append(float(p[row, 4]))
+                if len(g) == 0:
+                    hits.append(False)
+                    continue
+                candidates = np.where(taken, -1.0, iou[row])
+                best = int(candidates.argmax())
+                if candidates[best] >= iou_threshold:
+                    taken[best] = True
+                    hits.append(True)
+                else:
+                    hits.append(False)
+        if total_gt == 0:
+            continue
+        order = np.argsort(-np.asarray(scores), kind="stable")
+        tp = np.asarray(hits, dtype=np.float64)[order]
+        tp_cum = np.cumsum(tp)
+        fp_cum = np.cumsum(1.0 - tp)
+        recall = np.concatenate([[0.0], tp_cum / total_gt, [1.0]])
+        precision = np.concatenate([[1.0], tp_cum / np.maximum(tp_cum + fp_cum, 1e-9), [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        changed = np.flatnonzero(recall[1:] != recall[:-1])
+        ap[cls_id] = float(np.sum((recall[changed + 1] - recall[changed]) * precision[changed + 1]))
+    return ap
+
+
+class FrameCalibrationReader:
+    """onnxruntime.quantization.CalibrationDataReader arayüzü (get_next / rewind)."""
+
+    def __init__(self, frames: Sequence[np.ndarray], input_name: str, size: int, stride: int = 32) -> None:
+        self._frames = list(frames)
+        self._input_name = input_name
+        self._size = int(size)
+        self._stride = int(stride)
+        self._iter: Iterator[np.ndarray] = iter(self._frames)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        frame = next(self._iter, None)
+        if frame is None:
+            return None
+        return {self._input_name: to_input_blob(frame, self._size, self._stride)}
+
+    def rewind(self) -> None:
+        self._iter = iter(self._frames)
+
+
+def excluded_nodes(onnx_path: str, prefixes: Sequence[str]) -> List[str]:
+    if not prefixes:
+        return []
+    import onnx
+
+    graph = onnx.load(onnx_path).graph
+    return [node.name for node in graph.node if any(node.name.startswith(p) for p in prefixes)]
+
+
+def quantize_int8(
+    model_path: str,
+    imgsz: int,
+    calibration_frames: Sequence[np.ndarray],
+    cache_dir: Optional[str] = None,
+    force: bool = False,
+) -> str:
+    """FP32 .onnx'i (gerekirse export eder) kalibrasyon kareleriyle statik INT8 QDQ'ya çevirir."""
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    log = Logger("Quantize")
+    target = onnx_cache_path(model_path, imgsz, cache_dir, precision="int8")
+    if os.path.exists(target) and not force:
+        log.info(f"INT8 modeli önbellekte: {target}")
+        return target
+    if not calibration_frames:
+        raise ValueError("INT8 kalibrasyonu için kare bulunamadı (datasets/ boş mu?)")
+    fp32_path = export_onnx(model_path, imgsz, cache_dir)
+
+    source_path = fp32_path
+    prep_path = f"{target}.prep.onnx"
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        quant_pre_process(fp32_path, prep_path, skip_symbolic_shape=True)
+        source_path = prep_path
+    except Exception as exc:
+        log.warn(f"quant_pre_process atlandı: {exc}")
+
+    import onnxruntime
+
+    input_name = onnxruntime.InferenceSession(
+        source_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+    method_key = str(getattr(Settings, "INT8_CALIBRATION_METHOD", "minmax")).strip().lower()
+    method = getattr(CalibrationMethod, _CALIBRATION_METHODS.get(method_key, "MinMax"))
+    prefixes = tuple(getattr(Settings, "INT8_EXCLUDE_NODE_PREFIXES", ()))
+    log.info(
+        f"INT8 kalibrasyonu: {len(calibration_frames)} kare, method={method_key}, imgsz={imgsz}"
+    )
+    tmp_path = f"{target}.tmp"
+    try:
+        quantize_static(
+            model_input=source_path,
+            model_output=tmp_path,
+            calibration_data_reader=FrameCalibrationReader(calibration_frames, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=bool(getattr(Settings, "INT8_PER_CHANNEL", True)),
+            calibrate_method=method,
+            nodes_to_exclude=excluded_nodes(source_path, prefixes),
+        )
+        os.replace(tmp_path, target)
+    finally:
+        for leftover in (tmp_path, prep_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return target
+
+
+def evaluate_precisions(
+    engine: Any,
+    samples: Sequence[Dict[str, Any]],
+    imgsz: int,
+    conf: float,
+    iou: float,
+    precisions: Sequence[str] = ("fp32", "int8"),
+) -> Dict[str, Any]:
+    """Aynı karelerde her hassasiyetin tespitlerini, AP'sini ve kare başı gecikmesini ölçer."""
+    predictions: Dict[str, List[np.ndarray]] = {}
+    latency_ms: Dict[str, float] = {}
+    for precision in precisions:
+        engine.predict(samples[0]["frame"], imgsz=imgsz, conf=conf, iou=iou, precision=precision)
+        outputs: List[np.ndarray] = []
+        timings: List[float] = []
+        for sample in samples:
+            start = time.perf_counter()
+            result = engine.predict(
+                sample["frame"], imgsz=imgsz, conf=conf, iou=iou, precision=precision
+            )[0]
+            timings.append(time.perf_counter() - start)
+            outputs.append(np.asarray(result.boxes.data, dtype=np.float64).reshape(-1, 6))
+        predictions[precision] = outputs
+        latency_ms[precision] = float(np.median(timings)) * 1000.0
+
+    labelled = all(sample.get("label_path") for sample in samples)
+    if labelled:
+        references = [
+            load_yolo_labels(sample["label_path"], sample["frame"].shape) for sample in samples
+        ]
+    else:
+        references = [pred[:, [0, 1, 2, 3, 5]] for pred in predictions[precisions[0]]]
+    ap = {
+        precision: average_precision_per_class(outputs, references)
+        for precision, outputs in predictions.items()
+    }
+    return {
+        "reference": "labels" if labelled else precisions[0],
+        "ap": ap,
+        "latency_ms": latency_ms,
+        "frames": len(samples),
+    }
@@ -0,0 +1,96 @@
+"""detect() forward sonrası işleme zinciri için derlenmiş aşama grafiği.
+
+Graf ``ObjectDetector._build_postprocess_graph`` içinde bir kez kurulur: her aşamanın
+Settings parametreleri o anda çözümlenir, modül importları yapılır ve kapalı aşamalar
+grafa hiç eklenmez. Kare başına yalnızca aşama fonksiyonları sırayla çağrılır. Graf
+anahtarı (runtime profile + gecikme planı) değişince yeniden kurulur.
+
+Her aşamadan sonra isteğe bağlı ``hook(stage_name, batch, elapsed_ms)`` çağrılır;
+stage_trace sayımları ve aşama süreleri bu kancadan beslenir. ``StageLatencyWindow``
+aşama sürelerini oturum boyunca halka tamponda tutar ve özet için yüzdelik üretir.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import Settings
+from src.detection_batch import DetectionBatch
+
+# (batch, kare girdileri) → batch
+StageFn = Callable[[DetectionBatch, Dict[str, Any]], DetectionBatch]
+StageHook = Callable[[str, DetectionBatch, float], None]
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: StageFn
+
+
+class StageGraph:
+    """Sıralı, parametreleri çözümlenmiş aşama listesi."""
+
+    def __init__(self, stages: Sequence[Stage], key: Hashable = None) -> None:
+        self.stages: Tuple[Stage, ...] = tuple(stages)
+        self.key = key
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(stage.name for stage in self.stages)
+
+    def run(
+        self,
+        batch: DetectionBatch,
+        frame_inputs: Dict[str, Any],
+        hook: Optional[StageHook] = None,
+    ) -> DetectionBatch:
+        if hook is None:
+            for stage in self.stages:
+                batch = stage.run(batch, frame_inputs)
+            return batch
+        for stage in self.stages:
+            start = time.perf_counter()
+            batch = stage.run(batch, frame_inputs)
+            hook(stage.name, batch, (time.perf_counter() - start) * 1000.0)
+        return batch
+
+
+class StageLatencyWindow:
+    """Aşama başına son N süre örneği (ms); ekleme O(1), yüzdelikler yalnızca özet anında."""
+
+    def __init__(self, size: Optional[int] = None) -> None:
+        if size is None:
+            size = int(getattr(Settings, "PIPELINE_STAGE_TIMING_WINDOW", 1000))
+        self._size = max(8, int(size))
+        self._buffers: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+
+    def add(self, stage: str, elapsed_ms: float) -> None:
+        buffer = self._buffers.get(stage)
+        if buffer is None:
+            buffer = self._buffers[stage] = np.empty(self._size, dtype=np.float64)
+            self._counts[stage] = 0
+        count = self._counts[stage]
+        buffer[count % self._size] = float(elapsed_ms)
+        self._counts[stage] = count + 1
+
+    def add_many(self, samples: Iterable[Tuple[str, float]]) -> None:
+        for stage, elapsed_ms in samples:
+            self.add(str(stage), elapsed_ms)
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """Aşama → {"p50", "p95", "p99", "count"} (count = oturumdaki toplam örnek)."""
+        out: Dict[str, Dict[str, float]] = {}
+        for stage, buffer in self._buffers.items():
+            count = self._counts[stage]
+            p50, p95, p99 = np.percentile(buffer[: min(count, self._size)], (50, 95, 99))
+            out[stage] = {
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+                "count": int(count),
+            }
+        return out
@@ -1,12 +1,19 @@
 """Zamansal tutarlılık filtresi: anlık FP (1–2 kare görünüp kaybolan) bastırma.
-Gerçek nesnelere odaklanmak için son N karede en az K kez görünen tespitleri kabul eder."""
+Gerçek nesnelere odaklanmak için son N karede en az K kez görünen tespitleri kabul eder.
+
+Geçmiş, kare başına sınıf → (k, 4) kutu dizisi olarak WINDOW boyutlu halka tamponda tutulur.
+Eşleşme sayımı sınıf başına tek seferde yapılır: sınıfın geçmişteki tüm kutuları kare
+numarasıyla birlikte birleştirilir, küçük kümelerde tam IoU matrisi, kalabalıkta x1'e göre
+sıralı süpürme indeksiyle yalnızca x ekseninde örtüşebilen çiftler hesaplanır.
+"""
 
 from collections import deque
-from typing import Deque, Dict, List, Tuple
+from typing import Deque, Dict, List, Optional, Tuple
 
 import numpy as np
 
 from config.settings import Settings
+from src.detection_batch import DetectionBatch, class_ids_from_keys
 from src.utils import Logger
 
 log = Logger("TemporalFilter")
@@ -21,78 +28,158 @@ def _bbox(det: Dict) -> Tuple[float, float, float, float]:
     )
 
 
-def _iou(a: Tuple[float, ...], b: Tuple[float, ...]) -> float:
-    x1 = max(a[0], b[0])
-    y1 = max(a[1], b[1])
-    x2 = min(a[2], b[2])
-    y2 = min(a[3], b[3])
-    inter = max(0, x2 - x1) * max(0, y2 - y1)
-    if inter == 0:
-        return 0.0
-    area_a = max(1, (a[2] - a[0]) * (a[3] - a[1]))
-    area_b = max(1, (b[2] - b[0]) * (b[3] - b[1]))
-    return inter / (area_a + area_b - inter)
+# Bu çift sayısının (aday × geçmiş kutu) üstünde tam matris yerine süpürme indeksi kullanılır
+_DENSE_MAX_PAIRS = 16384
+
+
+def _pairwise_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Satır satır eşlenmiş iki kutu dizisinin IoU'su (alanlar en az 1 px² kabul edilir)."""
+    inter_w = np.maximum(
+        0.0, np.minimum(boxes_a[:, 2], boxes_b[:, 2]) - np.maximum(boxes_a[:, 0], boxes_b[:, 0])
+    )
+    inter_h = np.maximum(
+        0.0, np.minimum(boxes_a[:, 3], boxes_b[:, 3]) - np.maximum(boxes_a[:, 1], boxes_b[:, 1])
+    )
+    inter = inter_w * inter_h
+    area_a = np.maximum(1.0, (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1]))
+    area_b = np.maximum(1.0, (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1]))
+    return np.where(inter > 0, inter / (area_a + area_b - inter), 0.0)
+
+
+def _candidate_pairs(query: np.ndarray, history: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """IoU > 0 olabilecek (sorgu, geçmiş) çiftleri; geçmiş x1'e göre sıralı süpürülür.
+
+    Örtüşme için ``h.x1 < q.x2`` ve ``h.x2 > q.x1`` gerekir; ikincisi
+    ``h.x1 > q.x1 - max_genişlik`` demektir. Aralık iki ``searchsorted`` ile bulunur.
+    """
+    if len(query) * len(history) <= _DENSE_MAX_PAIRS:
+        q_idx, h_idx = np.divmod(np.arange(len(query) * len(history)), len(history))
+        return q_idx, h_idx
+    order = np.argsort(history[:, 0], kind="stable")
+    x1_sorted = history[order, 0]
+    max_width = float(np.max(history[:, 2] - history[:, 0]))
+    lo = np.searchsorted(x1_sorted, query[:, 0] - max_width, side="left")
+    hi = np.searchsorted(x1_sorted, query[:, 2], side="left")
+    counts = np.maximum(0, hi - lo)
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    q_idx = np.repeat(np.arange(len(query)), counts)
+    # Her sorgunun [lo, hi) aralığı düz bir indeks dizisine açılır
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    h_idx = order[np.repeat(lo, counts) + offsets]
+    return q_idx, h_idx
+
+
+def _class_id(det: Dict) -> int:
+    try:
+        return int(str(det.get("cls", det.get("cls_int", ""))))
+    except ValueError:
+        return -1
 
 
 class TemporalConsistencyFilter:
     """Anlık yanlış tespitleri bastırmak için zamansal tutarlılık filtresi."""
 
     def __init__(self) -> None:
-        self._history: Deque[List[Dict]] = deque(
+        # Halka tampon: her kare için sınıf id → o sınıfın (k, 4) kutu dizisi
+        self._history: Deque[Dict[int, np.ndarray]] = deque(
             maxlen=max(2, int(getattr(Settings, "TEMPORAL_FILTER_WINDOW_FRAMES", 5)))
         )
         self._min_appearances = max(1, int(getattr(Settings, "TEMPORAL_FILTER_MIN_APPEARANCES", 2)))
         self._iou_threshold = float(getattr(Settings, "TEMPORAL_FILTER_IOU_THRESHOLD", 0.3))
         self._conf_exempt = float(getattr(Settings, "TEMPORAL_FILTER_CONFIDENCE_EXEMPT", 0.7))
-        self._exempt_classes = frozenset(
-            str(c) for c in getattr(Settings, "TEMPORAL_FILTER_EXEMPT_CLASSES", ("2", "3"))
+        self._exempt_class_ids = class_ids_from_keys(
+            getattr(Settings, "TEMPORAL_FILTER_EXEMPT_CLASSES", ("2", "3"))
         )
         self._suppressed_count = 0
 
     def filter(self, detections: List[Dict]) -> List[Dict]:
-        if not getattr(Settings, "TEMPORAL_FILTER_ENABLED", True):
-            self._history.append(detections)
+        class_ids = np.array([_class_id(d) for d in detections], dtype=np.int64)
+        boxes = np.array([_bbox(d) for d in detections], dtype=np.float64).reshape(-1, 4)
+        scores = np.array(
+            [float(d.get("confidence", d.get("_confidence", 0.0))) for d in detections],
+            dtype=np.float64,
+        )
+        keep = self._filter_arrays(class_ids, boxes, scores)
+        if keep is None:
             return detections
-
-        if not detections:
-            self._history.append([])
-            return []
-
-        result: List[Dict] = []
-        for det in detections:
-            if self._is_exempt(det):
-                result.append(det)
+        return [det for det, kept in zip(detections, keep.tolist()) if kept]
+
+    def filter_batch(self, batch: DetectionBatch) -> DetectionBatch:
+        """filter()'in kolonsal karşılığı; geçmiş iki yol arasında ortaktır."""
+        # Eşleşme payload'a yazılan (2 haneye yuvarlanmış) koordinatlarla yapılır
+        keep = self._filter_arrays(batch.class_ids, np.round(batch.boxes, 2), batch.scores)
+        if keep is None or bool(keep.all()):
+            return batch
+        return batch.select(keep)
+
+    def _filter_arrays(
+        self,
+        class_ids: np.ndarray,
+        boxes: np.ndarray,
+        scores: np.ndarray,
+    ) -> Optional[np.ndarray]:
+        """Korunacak satırlar için maske döndürür (filtre kapalıysa None)."""
+        if not getattr(Settings, "TEMPORAL_FILTER_ENABLED", True):
+            self._remember(class_ids, boxes)
+            return None
+
+        keep = self._is_exempt(class_ids, scores)
+        candidates = np.flatnonzero(~keep)
+        if len(candidates):
+            matches = self._count_matches(boxes[candidates], class_ids[candidates])
+            passed = matches >= self._min_appearances - 1
+            keep[candidates[passed]] = True
+            self._suppressed_count += int(len(candidates) - np.count_nonzero(passed))
+
+        self._remember(class_ids, boxes)
+        return keep
+
+    def _is_exempt(self, class_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        return np.isin(class_ids, self._exempt_class_ids) | (scores >= self._conf_exempt)
+
+    def _remember(self, class_ids: np.ndarray, boxes: np.ndarray) -> None:
+        frame: Dict[int, np.ndarray] = {}
+        if len(class_ids):
+            order = np.argsort(class_ids, kind="stable")
+            sorted_ids = class_ids[order]
+            classes, starts = np.unique(sorted_ids, return_index=True)
+            for cls_id, rows in zip(classes.tolist(), np.split(order, starts[1:])):
+                frame[int(cls_id)] = np.ascontiguousarray(boxes[rows], dtype=np.float64)
+        self._history.append(frame)
+
+    def _count_matches(self, boxes: np.ndarray, class_ids: np.ndarray) -> np.ndarray:
+        """Her kutu için aynı sınıftan IoU >= eşik bir kutu içeren geçmiş kare sayısı."""
+        counts = np.zeros(len(boxes), dtype=np.int64)
+        if not self._history:
+            return counts
+        window = len(self._history)
+        for cls_id in np.unique(class_ids).tolist():
+            parts = [
+                (frame_idx, frame[cls_id])
+                for frame_idx, frame in enumerate(self._history)
+                if cls_id in frame
+            ]
+            if not parts:
                 continue
-
-            cls_key = str(det.get("cls", det.get("cls_int", "")))
-            matches = self._count_matches(det, cls_key)
-            if matches >= self._min_appearances - 1:
-                result.append(det)
+            rows = np.flatnonzero(class_ids == cls_id)
+            history = np.concatenate([part for _, part in parts])
+            frame_of = np.repeat(
+                np.array([frame_idx for frame_idx, _ in parts], dtype=np.int64),
+                [len(part) for _, part in parts],
+            )
+            query = boxes[rows]
+            if self._iou_threshold > 0.0:
+                q_idx, h_idx = _candidate_pairs(query, history)
             else:
-                self._suppressed_count += 1
-
-        self._history.append(list(detections))
-        return result
-
-    def _is_exempt(self, det: Dict) -> bool:
-        cls_key = str(det.get("cls", det.get("cls_int", "")))
-        if cls_key in self._exempt_classes:
-            return True
-        conf = float(det.get("confidence", det.get("_confidence", 0.0)))
-        return conf >= self._conf_exempt
-
-    def _count_matches(self, det: Dict, cls_key: str) -> int:
-        box = _bbox(det)
-        count = 0
-        for frame_dets in self._history:
-            for prev in frame_dets:
-                if str(prev.get("cls", prev.get("cls_int", ""))) != cls_key:
-                    continue
-                prev_box = _bbox(prev)
-                if _iou(box, prev_box) >= self._iou_threshold:
-                    count += 1
-                    break
-        return count
+                # Eşik 0 iken örtüşmeyen çiftler de eşleşir; süpürme budaması uygulanamaz
+                q_idx, h_idx = np.divmod(np.arange(len(query) * len(history)), len(history))
+            hit = _pairwise_iou(query[q_idx], history[h_idx]) >= self._iou_threshold
+            # (sorgu, kare) başına en az bir eşleşme → kare sayısı
+            matched = np.unique(q_idx[hit] * window + frame_of[h_idx[hit]])
+            counts[rows] = np.bincount(matched // window, minlength=len(rows))
+        return counts
 
     def get_stats(self) -> Dict[str, int]:
         return {"temporal_suppressed": self._suppressed_count}
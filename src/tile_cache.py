@@ -0,0 +1,141 @@
+"""SAHI tile tekrar kullanımı: değişmeyen tile'ların tespitleri bir önceki kareden taşınır.
+Drone havada asılı (hover) veya yavaş pan yaparken ardışık kareler neredeyse aynıdır;
+yalnızca kamera kaymasıyla hizalandıktan sonra değişen tile'lar yeniden inference'a girer."""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config.settings import Settings
+from src.detection_batch import DetectionBatch
+
+
+def window_means(values: np.ndarray, windows: np.ndarray, scale: float) -> np.ndarray:
+    """Küçültülmüş 2B dizide her (x1, y1, x2, y2) penceresinin ortalamasını döndürür.
+
+    Pencereler tam çözünürlük koordinatındadır; ``scale`` ile küçük ızgaraya taşınır.
+    Integral image sayesinde tile sayısından bağımsız tek geçiş yapılır.
+    """
+    if len(windows) == 0:
+        return np.zeros(0, dtype=np.float64)
+    integral = cv2.integral(np.ascontiguousarray(values, dtype=np.float32), sdepth=cv2.CV_64F)
+    sh, sw = values.shape[:2]
+    x1 = np.clip(np.floor(windows[:, 0] * scale).astype(np.int64), 0, sw - 1)
+    y1 = np.clip(np.floor(windows[:, 1] * scale).astype(np.int64), 0, sh - 1)
+    x2 = np.clip(np.ceil(windows[:, 2] * scale).astype(np.int64), x1 + 1, sw)
+    y2 = np.clip(np.ceil(windows[:, 3] * scale).astype(np.int64), y1 + 1, sh)
+    sums = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+    return sums / ((x2 - x1) * (y2 - y1)).astype(np.float64)
+
+
+def downscaled_gray(frame: np.ndarray, scale: float) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    h, w = gray.shape[:2]
+    return cv2.resize(
+        gray,
+        (max(1, int(round(w * scale))), max(1, int(round(h * scale)))),
+        interpolation=cv2.INTER_AREA,
+    )
+
+
+class TileReuseCache:
+    """Tile başına önceki kare tespitlerini ve değişim ölçümünü tutar."""
+
+    def __init__(self) -> None:
+        self._prev_thumb: Optional[np.ndarray] = None
+        self._windows: Optional[np.ndarray] = None
+        self._covered = np.zeros(0, dtype=bool)
+        self._batch = DetectionBatch.empty()
+        self._tile_index = np.zeros(0, dtype=np.int64)
+        self._last_frame_index: Optional[int] = None
+        self._refresh_frame_index: Optional[int] = None
+        self._shift: Tuple[float, float] = (0.0, 0.0)
+        self.last_tile_diff = np.zeros(0, dtype=np.float64)
+
+    @property
+    def shift(self) -> Tuple[float, float]:
+        """Son plan() çağrısında ölçülen kamera kayması (tam çözünürlük piksel)."""
+        return self._shift
+
+    def plan(self, frame: np.ndarray, windows: np.ndarray, frame_index: int) -> np.ndarray:
+        """Bu karede tekrar kullanılabilecek tile'lar için maske döndürür.
+
+        Önceki karede kapsanmış, kamera kaymasıyla hizalandıktan sonra ortalama gri
+        farkı eşiğin altında kalan tile'lar tekrar kullanılabilir. Kare atlandıysa,
+        grid değiştiyse, kayma çok büyükse veya zorunlu tazeleme zamanıysa hepsi yeniden çalışır.
+        """
+        scale = min(1.0, max(0.05, float(getattr(Settings, "SAHI_TILE_REUSE_SCALE", 0.25))))
+        thumb = downscaled_gray(frame, scale)
+        prev_thumb = self._prev_thumb
+        prev_frame_index = self._last_frame_index
+        self._prev_thumb = thumb
+        self._last_frame_index = int(frame_index)
+        self._shift = (0.0, 0.0)
+        self.last_tile_diff = np.full(len(windows), np.inf, dtype=np.float64)
+        reuse = np.zeros(len(windows), dtype=bool)
+
+        # Zorunlu tazeleme gerçek kare indeksiyle sayılır (detect çağrısıyla değil)
+        refresh_interval = max(1, int(getattr(Settings, "SAHI_TILE_REUSE_REFRESH_INTERVAL", 10)))
+        if (
+            prev_thumb is None
+            or prev_thumb.shape != thumb.shape
+            or prev_frame_index is None
+            or int(frame_index) != prev_frame_index + 1
+            or self._windows is None
+            or not np.array_equal(self._windows, windows)
+            or len(self._covered) != len(windows)
+            or self._refresh_frame_index is None
+            or int(frame_index) - self._refresh_frame_index >= refresh_interval
+        ):
+            self._windows = np.array(windows, copy=True)
+            self._refresh_frame_index = int(frame_index)
+            return reuse
+
+        prev_f = prev_thumb.astype(np.float32)
+        cur_f = thumb.astype(np.float32)
+        (dx, dy), response = cv2.phaseCorrelate(prev_f, cur_f)
+        if not np.isfinite(dx) or not np.isfinite(dy) or response < float(
+            getattr(Settings, "SAHI_TILE_REUSE_MIN_RESPONSE", 0.05)
+        ):
+            dx = dy = 0.0
+        max_shift = float(getattr(Settings, "SAHI_TILE_REUSE_MAX_SHIFT_PX", 64.0))
+        if max(abs(dx), abs(dy)) / scale > max_shift:
+            return reuse
+        self._shift = (float(dx) / scale, float(dy) / scale)
+
+        # Önceki küçük kareyi kayma kadar ötele; içeri giren kenar bölgeleri farkı büyütür
+        aligned = cv2.warpAffine(
+            prev_f,
+            np.float32([[1, 0, dx], [0, 1, dy]]),
+            (cur_f.shape[1], cur_f.shape[0]),
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=-255.0,
+        )
+        diff = np.minimum(np.abs(cur_f - aligned), 255.0)
+        self.last_tile_diff = window_means(diff, windows, scale)
+        threshold = float(getattr(Settings, "SAHI_TILE_REUSE_DIFF_THRESHOLD", 3.0))
+        reuse = self._covered & (self.last_tile_diff < threshold)
+        return reuse
+
+    def reused(self, reuse_mask: np.ndarray) -> Tuple[DetectionBatch, np.ndarray]:
+        """Tekrar kullanılan tile'ların tespitlerini kamera kaymasıyla ötelenmiş döndürür."""
+        if len(self._tile_index) == 0 or not bool(reuse_mask.any()):
+            return DetectionBatch.empty(), np.zeros(0, dtype=np.int64)
+        rows = reuse_mask[self._tile_index]
+        batch = self._batch.select(rows)
+        dx, dy = self._shift
+        batch.boxes = batch.boxes + np.array([dx, dy, dx, dy], dtype=np.float64)
+        return batch, self._tile_index[rows]
+
+    def commit(
+        self, covered: np.ndarray, batch: DetectionBatch, tile_index: np.ndarray
+    ) -> None:
+        """Bu karede kapsanan tile'ları ve (tile etiketli) tespitlerini saklar."""
+        self._covered = np.array(covered, dtype=bool, copy=True)
+        self._batch = batch
+        self._tile_index = np.asarray(tile_index, dtype=np.int64)
+
+    def reset(self) -> None:
+        self.__init__()
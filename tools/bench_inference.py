@@ -0,0 +1,127 @@
+"""Inference backend parite testi ve çağrı başı overhead benchmark'ı.
+
+Kullanım:
+    python tools/bench_inference.py                          # ilk sekanstan 20 kare
+    python tools/bench_inference.py --sequence img:VID/seq1 --frames 50 --backend direct
+    python tools/bench_inference.py --tiles                  # SAHI tile batch'i de ölç
+
+Kayıtlı kareler (DatasetLoader) üzerinde ultralytics predict() referansı ile seçilen
+backend aynı argümanlarla çalıştırılır; satır/sınıf eşleşmesi ve maksimum kutu/conf farkı
+raporlanır, ardından her iki yolun medyan çağrı süresi karşılaştırılır.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.settings import Settings  # noqa: E402
+
+
+def load_frames(sequence: str, count: int) -> List[np.ndarray]:
+    from src.data_loader import DatasetLoader
+
+    loader = DatasetLoader(prefer_vid=True, seed=0, sequence=sequence or None)
+    frames: List[np.ndarray] = []
+    for item in loader:
+        frames.append(item["frame"])
+        if len(frames) >= count:
+            break
+    return frames
+
+
+def _time_call(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # ısınma
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000.0
+
+
+def _tile_sources(detector: Any, frame: np.ndarray) -> List[np.ndarray]:
+    h, w = frame.shape[:2]
+    windows = detector._compute_slice_windows(
+        h, w, int(Settings.SAHI_SLICE_SIZE), float(Settings.SAHI_OVERLAP_RATIO)
+    )
+    batch = max(1, int(getattr(Settings, "SAHI_MAX_BATCH_SIZE", 8)))
+    return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in windows.tolist()[:batch]]
+
+
+def run(detector: Any, frames: List[np.ndarray], tiles: bool, repeat: int) -> bool:
+    engine = detector._get_inference_engine()
+    if engine is None:
+        print("Backend başlatılamadı (INFERENCE_BACKEND / log'a bakın)")
+        return False
+
+    cases: Dict[str, Dict[str, Any]] = {
+        "full_frame": {"imgsz": int(Settings.INFERENCE_SIZE)},
+    }
+    if tiles:
+        cases["sahi_tiles"] = {"imgsz": int(Settings.SAHI_SLICE_SIZE)}
+    base_kwargs = {
+        "conf": float(Settings.CONFIDENCE_THRESHOLD_UAP_UAI or Settings.CONFIDENCE_THRESHOLD),
+        "iou": float(Settings.NMS_IOU_THRESHOLD),
+        "classes": None,
+        "agnostic_nms": detector._resolve_nms_mode() == "agnostic",
+        "max_det": int(Settings.MAX_DETECTIONS),
+    }
+
+    all_ok = True
+    print(f"{'case':>11} {'frames':>7} {'mismatch':>9} {'predict ms':>11} {engine.name + ' ms':>10} {'speedup':>8}")
+    for name, extra in cases.items():
+        kwargs = dict(base_kwargs, **extra)
+        mismatches = 0
+        t_ref: List[float] = []
+        t_eng: List[float] = []
+        for frame in frames:
+            source = _tile_sources(detector, frame) if name == "sahi_tiles" else frame
+            reference = detector._predict_reference(source, **kwargs)
+            ours = engine.predict(source, **kwargs)
+            if not detector._engine_results_match(ours, reference):
+                mismatches += 1
+            t_ref.append(_time_call(lambda: detector._predict_reference(source, **kwargs), repeat))
+            t_eng.append(_time_call(lambda: engine.predict(source, **kwargs), repeat))
+        ref_ms = float(np.median(t_ref))
+        eng_ms = float(np.median(t_eng))
+        all_ok = all_ok and mismatches == 0
+        print(
+            f"{name:>11} {len(frames):>7} {mismatches:>9} {ref_ms:>11.2f} {eng_ms:>10.2f} "
+            f"{ref_ms / max(eng_ms, 1e-9):>7.2f}x"
+        )
+    return all_ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inference backend parite + overhead benchmark")
+    parser.add_argument("--sequence", default="", help="get_available_sequences() anahtarı")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", default="direct")
+    parser.add_argument("--tiles", action="store_true", help="SAHI tile batch'ini de ölç")
+    args = parser.parse_args()
+
+    Settings.DEBUG = False
+    Settings.INFERENCE_BACKEND = args.backend
+    Settings.INFERENCE_BACKEND_VERIFY_INTERVAL = 0
+
+    frames = load_frames(args.sequence, args.frames)
+    if not frames:
+        print("Kayıtlı kare bulunamadı (datasets/ boş mu?)")
+        return 2
+
+    from src.detection import ObjectDetector
+
+    detector = ObjectDetector()
+    return 0 if run(detector, frames, args.tiles, args.repeat) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
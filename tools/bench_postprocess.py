@@ -0,0 +1,403 @@
+"""Post-process aşamaları için mikro benchmark.
+
+Kullanım:
+    python tools/bench_postprocess.py                       # tüm senaryolar
+    python tools/bench_postprocess.py suppress_contained --sizes 50 300 1000
+
+Her senaryo mevcut implementasyonu, döngü tabanlı eski (referans) sürümle
+aynı sentetik sahnede karşılaştırır ve çıktıların birebir aynı olduğunu doğrular.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.settings import Settings  # noqa: E402
+
+
+def synthetic_scene(count: int, seed: int = 0, frame_w: int = 1920, frame_h: int = 1080):
+    """Kümelenmiş, iç içe kutular içeren kalabalık sahne üretir."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, [frame_w, frame_h], size=(max(1, count // 4), 2))
+    picks = centers[rng.integers(0, len(centers), size=count)]
+    xy = picks + rng.normal(0, 12, size=(count, 2))
+    wh = rng.uniform(6, 120, size=(count, 2))
+    boxes = np.hstack([xy, xy + wh])
+    scores = np.trunc(rng.uniform(0.05, 0.99, size=count) * 10000) / 10000
+    class_ids = rng.integers(0, 4, size=count)
+    return boxes, scores, class_ids
+
+
+def synthetic_sequence(count: int, frames: int = 8, seed: int = 0):
+    """Aynı sahnenin titreşimli, rastgele eksilen kareleri (zamansal filtre için)."""
+    boxes, scores, class_ids = synthetic_scene(count, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    sequence = []
+    for _ in range(frames):
+        present = rng.random(count) > 0.25
+        jitter = rng.uniform(-4, 4, size=(int(present.sum()), 4))
+        sequence.append((class_ids[present], np.round(boxes[present] + jitter, 2), scores[present]))
+    return sequence
+
+
+# ─── Referans (eski) implementasyonlar ───────────────────────────────────────
+
+def legacy_suppress_contained(
+    boxes: np.ndarray, cls_ints: np.ndarray, threshold: float = 0.85
+) -> List[int]:
+    """Çapa başına NumPy + çift başına Python döngüsü kullanan eski sürüm."""
+    areas = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1e-6)
+    order = np.argsort(areas, kind="stable")[::-1]
+    keep: List[int] = []
+    is_suppressed = np.zeros(len(boxes), dtype=bool)
+    landing_zone_ids = {Settings.CLASS_UAP, Settings.CLASS_UAI}
+
+    for i_idx, i in enumerate(order):
+        if is_suppressed[i]:
+            continue
+        keep.append(int(i))
+        remaining = order[i_idx + 1:]
+        valid = remaining[~is_suppressed[remaining] & (cls_ints[remaining] == cls_ints[i])]
+        if len(valid) == 0:
+            continue
+        box_a = boxes[i]
+        boxes_b = boxes[valid]
+        inter_w = np.maximum(0.0, np.minimum(box_a[2], boxes_b[:, 2]) - np.maximum(box_a[0], boxes_b[:, 0]))
+        inter_h = np.maximum(0.0, np.minimum(box_a[3], boxes_b[:, 3]) - np.maximum(box_a[1], boxes_b[:, 1]))
+        ios = (inter_w * inter_h) / areas[valid]
+        effective_threshold = (
+            Settings.LANDING_ZONE_CONTAINMENT_IOU if cls_ints[i] in landing_zone_ids else threshold
+        )
+        suppress_mask = np.zeros(len(valid), dtype=bool)
+        for idx_b, b_idx in enumerate(valid):
+            if ios[idx_b] > effective_threshold:
+                if cls_ints[i] in landing_zone_ids and cls_ints[b_idx] not in landing_zone_ids:
+                    continue
+                suppress_mask[idx_b] = True
+        is_suppressed[valid[suppress_mask]] = True
+    return keep
+
+
+def legacy_landing_zone_conflicts(
+    boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray
+) -> np.ndarray:
+    """Sıralı adaylar üzerinde çift başına IoU hesaplayan eski iç içe döngü."""
+    threshold = float(getattr(Settings, "UAP_UAI_CONFLICT_IOU_THRESHOLD", 0.55))
+    min_conf_gap = max(0.0, float(getattr(Settings, "UAP_UAI_CONFLICT_MIN_CONF_GAP", 0.12)))
+    min_area_ratio = max(1.0, float(getattr(Settings, "UAP_UAI_CONFLICT_MIN_AREA_RATIO", 1.30)))
+    keep_mask = np.ones(len(class_ids), dtype=bool)
+    candidates = [i for i in range(len(class_ids)) if class_ids[i] in (Settings.CLASS_UAP, Settings.CLASS_UAI)]
+    if threshold <= 0.0 or len(candidates) < 2:
+        return keep_mask
+
+    def _area(box) -> float:
+        return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+    def _iou(a, b) -> float:
+        inter = max(0.0, min(a[2], b[2]) - max(a[0], b[0])) * max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+        if inter <= 0:
+            return 0.0
+        return inter / max(_area(a) + _area(b) - inter, 1e-6)
+
+    box_list = boxes.tolist()
+    ranked = sorted(candidates, key=lambda i: (float(scores[i]), _area(box_list[i])), reverse=True)
+    for pos, i in enumerate(ranked):
+        if not keep_mask[i]:
+            continue
+        area_i, conf_i = _area(box_list[i]), float(scores[i])
+        for j in ranked[pos + 1:]:
+            if not keep_mask[j] or class_ids[i] == class_ids[j]:
+                continue
+            if _iou(box_list[i], box_list[j]) < threshold:
+                continue
+            area_j, conf_j = _area(box_list[j]), float(scores[j])
+            area_ratio = max(area_i, area_j) / max(min(area_i, area_j), 1e-6)
+            if abs(conf_i - conf_j) < min_conf_gap and area_ratio < min_area_ratio:
+                continue
+            loser = j
+            if conf_j > conf_i or (abs(conf_j - conf_i) <= 1e-6 and area_j > area_i):
+                loser = i
+            keep_mask[loser] = False
+            if loser == i:
+                break
+    return keep_mask
+
+
+def legacy_temporal_filter(sequence) -> Tuple[List[List[bool]], int]:
+    """Aday başına geçmiş kareleri tek tek dolaşan eski zamansal filtre döngüsü."""
+    from collections import deque
+
+    from src.detection_batch import class_ids_from_keys
+
+    history = deque(maxlen=max(2, int(getattr(Settings, "TEMPORAL_FILTER_WINDOW_FRAMES", 5))))
+    min_appearances = max(1, int(getattr(Settings, "TEMPORAL_FILTER_MIN_APPEARANCES", 2)))
+    iou_threshold = float(getattr(Settings, "TEMPORAL_FILTER_IOU_THRESHOLD", 0.3))
+    conf_exempt = float(getattr(Settings, "TEMPORAL_FILTER_CONFIDENCE_EXEMPT", 0.7))
+    exempt_ids = class_ids_from_keys(getattr(Settings, "TEMPORAL_FILTER_EXEMPT_CLASSES", ("2", "3")))
+
+    def _iou_one_to_many(box, boxes):
+        inter_w = np.maximum(0.0, np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]))
+        inter_h = np.maximum(0.0, np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]))
+        inter = inter_w * inter_h
+        area_a = max(1.0, float((box[2] - box[0]) * (box[3] - box[1])))
+        area_b = np.maximum(1.0, (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]))
+        return np.where(inter > 0, inter / (area_a + area_b - inter), 0.0)
+
+    keeps: List[List[bool]] = []
+    suppressed = 0
+    for class_ids, boxes, scores in sequence:
+        keep = np.isin(class_ids, exempt_ids) | (scores >= conf_exempt)
+        for idx in np.flatnonzero(~keep).tolist():
+            matches = 0
+            for prev_class_ids, prev_boxes in history:
+                same_cls = prev_boxes[prev_class_ids == class_ids[idx]]
+                if len(same_cls) and bool((_iou_one_to_many(boxes[idx], same_cls) >= iou_threshold).any()):
+                    matches += 1
+            if matches >= min_appearances - 1:
+                keep[idx] = True
+            else:
+                suppressed += 1
+        history.append((class_ids, boxes))
+        keeps.append(keep.tolist())
+    return keeps, suppressed
+
+
+def legacy_guardrails(
+    boxes: np.ndarray, class_ids: np.ndarray, scores: np.ndarray, params
+) -> Tuple[List[int], Dict[str, int]]:
+    """Çift başına skaler IoU ve sınıf başına liste kuran eski guardrail kuralları."""
+
+    def _iou(a, b) -> float:
+        inter = max(0, min(a[2], b[2]) - max(a[0], b[0])) * max(0, min(a[3], b[3]) - max(a[1], b[1]))
+        if inter == 0:
+            return 0.0
+        area_a = max(1, (a[2] - a[0]) * (a[3] - a[1]))
+        area_b = max(1, (b[2] - b[0]) * (b[3] - b[1]))
+        return inter / (area_a + area_b - inter)
+
+    box_list = boxes.tolist()
+    areas = [max(1.0, (b[2] - b[0]) * (b[3] - b[1])) for b in box_list]
+    exempt = np.isin(class_ids, params.exempt_ids).tolist()
+    cls_list = class_ids.tolist()
+    score_list = scores.tolist()
+    stats = {"total_input": len(box_list), "overlap_suppressed": 0, "scene_outlier": 0, "crowd_trimmed": 0}
+
+    keep = list(range(len(box_list)))
+    suppressed = [False] * len(keep)
+    for pos, i in enumerate(keep):
+        if suppressed[pos] or exempt[i]:
+            continue
+        for pos_j in range(pos + 1, len(keep)):
+            j = keep[pos_j]
+            if suppressed[pos_j] or exempt[j]:
+                continue
+            if _iou(box_list[i], box_list[j]) < params.overlap_iou:
+                continue
+            ai, aj = areas[i], areas[j]
+            if max(ai, aj) / max(min(ai, aj), 1.0) >= params.overlap_area_ratio:
+                if ai > aj:
+                    suppressed[pos] = True
+                else:
+                    suppressed[pos_j] = True
+    stats["overlap_suppressed"] = sum(suppressed)
+    keep = [i for i, s in zip(keep, suppressed) if not s]
+
+    by_class: Dict[int, List[int]] = {}
+    for i in keep:
+        if not exempt[i]:
+            by_class.setdefault(cls_list[i], []).append(i)
+    outliers = set()
+    for cls, members in by_class.items():
+        if len(members) < params.scene_min_samples:
+            continue
+        median_area = float(np.median([areas[i] for i in members]))
+        if median_area < 1.0:
+            continue
+        outliers.update(i for i in members if areas[i] > median_area * params.scene_outlier_factor)
+    stats["scene_outlier"] = len(outliers)
+    keep = [i for i in keep if i not in outliers]
+
+    if len(keep) > params.crowd_threshold:
+        elevated = params.base_conf + params.crowd_conf_boost
+        trimmed = [i for i in keep if not exempt[i] and score_list[i] < elevated]
+        stats["crowd_trimmed"] = len(trimmed)
+        keep = [i for i in keep if exempt[i] or score_list[i] >= elevated]
+    return keep, stats
+
+
+def legacy_landing_status(
+    boxes: np.ndarray, class_ids: np.ndarray, frame_w: int, frame_h: int
+) -> List[int]:
+    """İniş alanı başına engel ve diğer alanlarla skaler kesişim döngüsü (Hough hariç)."""
+
+    def _intersection_area(a, b) -> float:
+        return max(0.0, min(a[2], b[2]) - max(a[0], b[0])) * max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+
+    landing = np.isin(class_ids, (Settings.CLASS_UAP, Settings.CLASS_UAI))
+    obstacle = ~landing if getattr(Settings, "UNKNOWN_OBJECTS_AS_OBSTACLES", True) else np.isin(class_ids, (0, 1))
+    box_list = np.round(boxes, 2).tolist()
+    obstacles = [box_list[i] for i in np.flatnonzero(obstacle).tolist()]
+    zones = [(i, box_list[i]) for i in np.flatnonzero(landing).tolist()]
+    edge_w = int(frame_w * getattr(Settings, "EDGE_MARGIN_RATIO", 0.005))
+    edge_h = int(frame_h * getattr(Settings, "EDGE_MARGIN_RATIO", 0.005))
+    margin = getattr(Settings, "LANDING_PROXIMITY_MARGIN", 0.15)
+    statuses = [-1] * len(box_list)
+    for idx, (x1, y1, x2, y2) in zones:
+        if x1 <= edge_w or y1 <= edge_h or x2 >= frame_w - edge_w or y2 >= frame_h - edge_h:
+            statuses[idx] = 0
+            continue
+        dx, dy = (x2 - x1) * margin, (y2 - y1) * margin
+        expanded = (x1 - dx, y1 - dy, x2 + dx, y2 + dy)
+        clear = not any(_intersection_area(expanded, obs) > 0 for obs in obstacles)
+        if clear:
+            clear = not any(
+                _intersection_area(expanded, other) > 0 for other_idx, other in zones if other_idx != idx
+            )
+        statuses[idx] = 1 if clear else 0
+    return statuses
+
+
+# ─── Senaryolar ──────────────────────────────────────────────────────────────
+
+def _case_suppress_contained(count: int) -> Tuple[Callable[[], object], Callable[[], object]]:
+    from src.detection import ObjectDetector
+
+    boxes, _, class_ids = synthetic_scene(count)
+    current = lambda: ObjectDetector._suppress_contained_indices(boxes, class_ids)  # noqa: E731
+    legacy = lambda: legacy_suppress_contained(boxes, class_ids)  # noqa: E731
+    return current, legacy
+
+
+def _case_landing_zone_conflicts(count: int) -> Tuple[Callable[[], object], Callable[[], object]]:
+    from src.detection import ObjectDetector
+    from src.utils import Logger
+
+    boxes, scores, _ = synthetic_scene(count)
+    # Odaklı geçiş/SAHI taşması: tüm adaylar UAP/UAİ
+    class_ids = np.where(np.arange(count) % 2 == 0, Settings.CLASS_UAP, Settings.CLASS_UAI)
+    detector = ObjectDetector.__new__(ObjectDetector)
+    detector.log = Logger("Bench")
+    current = lambda: detector._landing_zone_conflict_keep_mask(boxes, scores, class_ids).tolist()  # noqa: E731
+    legacy = lambda: legacy_landing_zone_conflicts(boxes, scores, class_ids).tolist()  # noqa: E731
+    return current, legacy
+
+
+def _case_class_aware_nms(count: int) -> Tuple[Callable[[], object], Callable[[], object]]:
+    from src.nms import class_aware_greedy_nms, matrix_nms
+
+    boxes, scores, class_ids = synthetic_scene(count)
+    iou = float(Settings.SAHI_MERGE_IOU)
+    current = lambda: matrix_nms(boxes, scores, class_ids, iou).tolist()  # noqa: E731
+    legacy = lambda: class_aware_greedy_nms(boxes, scores, class_ids, iou).tolist()  # noqa: E731
+    return current, legacy
+
+
+def _case_guardrails(count: int) -> Tuple[Callable[[], object], Callable[[], object]]:
+    from src.postprocess import _run_guardrails, resolve_guardrail_params
+
+    boxes, scores, class_ids = synthetic_scene(count)
+    boxes = np.round(boxes, 2)
+    params = resolve_guardrail_params()
+
+    def current():
+        keep, stats = _run_guardrails(boxes, class_ids, scores, params)
+        return keep.tolist(), stats
+
+    return current, lambda: legacy_guardrails(boxes, class_ids, scores, params)
+
+
+def _case_landing_status(count: int) -> Tuple[Callable[[], object], Callable[[], object]]:
+    from src.detection_batch import DetectionBatch
+    from src.uap_uai import determine_landing_status_batch
+
+    # Park alanı çevresinde kalabalık: kutuların ~%5'i UAP/UAİ, kalanı engel
+    boxes, scores, class_ids = synthetic_scene(count)
+    class_ids = np.where(np.arange(count) % 20 == 0, Settings.CLASS_UAP, np.minimum(class_ids, 1))
+    batch = DetectionBatch(
+        boxes=boxes,
+        scores=scores,
+        class_ids=class_ids,
+        source_class_ids=class_ids.copy(),
+        trace_frames=np.zeros(count, dtype=np.int64),
+        trace_seqs=np.arange(count, dtype=np.int64),
+    )
+    current = lambda: determine_landing_status_batch(batch, 1920, 1080).tolist()  # noqa: E731
+    legacy = lambda: legacy_landing_status(boxes, class_ids, 1920, 1080)  # noqa: E731
+    return current, legacy
+
+
+def _case_temporal_filter(count: int) -> Tuple[Callable[[], object], Callable[[], object]]:
+    from src.temporal_filter import TemporalConsistencyFilter
+
+    # Süre 8 karelik dizinin toplamıdır; pencere dolduktan sonra kare başı maliyet sabittir
+    sequence = synthetic_sequence(count)
+
+    def current():
+        temporal = TemporalConsistencyFilter()
+        keeps = [temporal._filter_arrays(*frame).tolist() for frame in sequence]
+        return keeps, temporal.get_stats()["temporal_suppressed"]
+
+    return current, lambda: legacy_temporal_filter(sequence)
+
+
+CASES: Dict[str, Callable[[int], Tuple[Callable[[], object], Callable[[], object]]]] = {
+    "suppress_contained": _case_suppress_contained,
+    "landing_zone_conflicts": _case_landing_zone_conflicts,
+    "class_aware_nms": _case_class_aware_nms,
+    "temporal_filter": _case_temporal_filter,
+    "guardrails": _case_guardrails,
+    "landing_status": _case_landing_status,
+}
+
+
+def _time_call(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # ısınma
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000.0
+
+
+def run(case_names: List[str], sizes: List[int], repeat: int) -> bool:
+    all_equal = True
+    for name in case_names:
+        print(f"\n[{name}]")
+        print(f"{'boxes':>7} {'current ms':>11} {'legacy ms':>10} {'speedup':>8}  parity")
+        for count in sizes:
+            current, legacy = CASES[name](count)
+            same = current() == legacy()
+            all_equal = all_equal and same
+            t_cur = _time_call(current, repeat)
+            t_leg = _time_call(legacy, repeat)
+            print(
+                f"{count:>7} {t_cur:>11.3f} {t_leg:>10.3f} {t_leg / max(t_cur, 1e-9):>7.1f}x  "
+                f"{'ok' if same else 'MISMATCH'}"
+            )
+    return all_equal
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Post-process mikro benchmark")
+    parser.add_argument("cases", nargs="*", help=f"Senaryolar: {', '.join(sorted(CASES))}")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    Settings.DEBUG = False  # debug log satırları tabloyu bölmesin
+    unknown = sorted(set(args.cases) - set(CASES))
+    if unknown:
+        parser.error(f"bilinmeyen senaryo: {', '.join(unknown)}")
+    case_names = args.cases or sorted(CASES)
+    return 0 if run(case_names, args.sizes, args.repeat) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Bu makinede detektör gecikmesini konfigürasyon ızgarası üzerinde ölçer ve tabloya yazar.
+
+Kullanım:
+    python tools/calibrate_latency.py                               # LATENCY_CALIBRATION_* varsayılanları
+    python tools/calibrate_latency.py --imgsz 512 640 960 1280 --threads 1 2 4 8
+    python tools/calibrate_latency.py --frames 16 --repeat 2 --backend onnx
+
+Izgara: imgsz × SAHI açık/kapalı × odaklı UAP/UAİ geçişi açık/kapalı × half × thread
+(odaklı geçiş ve half yalnızca CUDA'da). Kareler datasets/ altındaki tüm sekanslardan eşit
+aralıklı örneklenir. Tablo LATENCY_TABLE_DIR altında ``<model>-<sha256[:16]>-<donanım[:12]>.json``
+adını alır; ``LATENCY_TABLE_ENABLED=True`` iken light profile seçimi ve gecikme kontrolcüsünün
+kalite seviyeleri bu tablodan gelir.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.settings import Settings  # noqa: E402
+
+
+def _print_entry(entry: Dict[str, Any]) -> None:
+    print(
+        f"imgsz={entry['imgsz']:>5} sahi={'on ' if entry['sahi'] else 'off'} "
+        f"focused={'on ' if entry['focused'] else 'off'} half={'on ' if entry['half'] else 'off'} "
+        f"threads={entry['threads']:>2}  p50={entry['p50_ms']:>8.1f} ms  p90={entry['p90_ms']:>8.1f} ms",
+        flush=True,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Konfigürasyon başına gecikme kalibrasyonu")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=None)
+    parser.add_argument("--threads", type=int, nargs="+", default=None, help="CPU thread sayıları")
+    parser.add_argument("--frames", type=int, default=int(Settings.LATENCY_CALIBRATION_FRAMES))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--backend", default=None, help="INFERENCE_BACKEND override")
+    args = parser.parse_args()
+
+    Settings.DEBUG = False
+    if args.backend:
+        Settings.INFERENCE_BACKEND = args.backend
+    Settings.INFERENCE_BACKEND_VERIFY_INTERVAL = 0
+    Settings.LATENCY_TABLE_ENABLED = False  # Ölçüm sırasında eski tablo kullanılmasın
+
+    from src.detection import ObjectDetector
+    from src.latency_table import calibrate_and_save, default_grid, latency_table_path
+
+    if not Path(Settings.MODEL_PATH).is_file():
+        print(f"Model dosyası bulunamadı: {Settings.MODEL_PATH}")
+        return 2
+    detector = ObjectDetector()
+    grid = default_grid(detector.device, sizes=args.imgsz, threads=args.threads)
+    print(f"{len(grid)} konfigürasyon × {args.frames} kare ölçülecek -> {latency_table_path(Settings.MODEL_PATH)}")
+    path = calibrate_and_save(
+        detector, frame_count=args.frames, grid=grid, repeat=args.repeat, progress=_print_entry
+    )
+    if path is None:
+        print("Kalibrasyon karesi bulunamadı (datasets/ boş mu?)")
+        return 2
+    print(f"Tablo yazıldı: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""MODEL_PATH'i ONNX Runtime CPU backend'i için önbelleğe export eder.
+
+Kullanım:
+    python tools/export_onnx.py                       # INFERENCE_SIZE + SAHI_SLICE_SIZE + ONNX light profile (+ irtifa planı)
+    python tools/export_onnx.py --imgsz 640 1280      # yalnızca verilen boyutlar
+    python tools/export_onnx.py --force               # önbellekte olsa da yeniden export et
+
+Çıktı dosyaları ONNX_CACHE_DIR altında ``<model>-<sha256[:16]>-<imgsz>.onnx`` adını alır;
+model dosyası değişince hash değişir ve eski dosyalar kullanılmaz.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.settings import Settings  # noqa: E402
+
+
+def default_sizes() -> List[int]:
+    sizes = {
+        int(Settings.INFERENCE_SIZE),
+        int(getattr(Settings, "ONNX_LIGHT_PROFILE_INFERENCE_SIZE", Settings.INFERENCE_SIZE)),
+    }
+    if bool(getattr(Settings, "SAHI_ENABLED", False)):
+        sizes.add(int(Settings.SAHI_SLICE_SIZE))
+    if bool(getattr(Settings, "ALTITUDE_PLAN_ENABLED", False)):
+        for _, imgsz, sahi, slice_size, _ in getattr(Settings, "ALTITUDE_PLAN_TABLE", ()):
+            sizes.add(int(imgsz))
+            if sahi:
+                sizes.add(int(slice_size))
+    if bool(getattr(Settings, "UAP_UAI_FOCUSED_PASS_ENABLED", False)):
+        sizes.add(int(getattr(Settings, "UAP_UAI_FOCUSED_PASS_IMG_SIZE", Settings.INFERENCE_SIZE)))
+    return sorted(sizes)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="YOLO modelini önbellekli ONNX'e export et")
+    parser.add_argument("--model", default=Settings.MODEL_PATH)
+    parser.add_argument("--imgsz", type=int, nargs="+", default=None)
+    parser.add_argument("--cache-dir", default=Settings.ONNX_CACHE_DIR)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    from src.inference_engine import export_onnx, onnx_cache_path
+
+    if not Path(args.model).is_file():
+        print(f"Model dosyası bulunamadı: {args.model}")
+        return 2
+    for size in args.imgsz or default_sizes():
+        cached = Path(onnx_cache_path(args.model, size, args.cache_dir)).exists()
+        path = export_onnx(args.model, size, args.cache_dir, force=args.force)
+        state = "önbellekte" if cached and not args.force else "export edildi"
+        print(f"imgsz={size:>5}  {state:<13}  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
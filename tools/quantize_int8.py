@@ -0,0 +1,93 @@
+"""Detektörü datasets/ kareleriyle kalibre ederek INT8'e quantize eder ve FP32 ile karşılaştırır.
+
+Kullanım:
+    python tools/quantize_int8.py                          # INFERENCE_SIZE, tüm sekanslar
+    python tools/quantize_int8.py --imgsz 640 --calib 128 --eval 64
+    python tools/quantize_int8.py --sequence img:VID/seq1 --report int8_report.json
+    python tools/quantize_int8.py --eval-only              # mevcut INT8 modelini yeniden ölç
+
+Çıktı ONNX_CACHE_DIR altında ``<model>-<sha256[:16]>-<imgsz>-int8.onnx`` olarak yazılır ve
+``INFERENCE_BACKEND="onnx"`` + ``ONNX_PRECISION="int8"`` (veya ``ONNX_LIGHT_PROFILE_PRECISION``)
+ile seçilir. Rapor sınıf başına AP@0.5 farkını (INT8 − FP32) ve medyan kare gecikmesini verir;
+YOLO etiketleri (labels/*.txt) yoksa referans FP32 tespitleridir.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.settings import Settings  # noqa: E402
+
+
+def print_report(report: Dict[str, Any], names: Dict[int, str]) -> None:
+    fp32_ap = report["ap"]["fp32"]
+    int8_ap = report["ap"]["int8"]
+    print(f"\nReferans: {report['reference']}  |  kare: {report['frames']}")
+    print(f"{'sınıf':<20} {'AP fp32':>8} {'AP int8':>8} {'delta':>8}")
+    for cls_id in sorted(set(fp32_ap) | set(int8_ap)):
+        a = fp32_ap.get(cls_id, 0.0)
+        b = int8_ap.get(cls_id, 0.0)
+        label = f"{cls_id}:{names.get(cls_id, '?')}"
+        print(f"{label:<20} {a:>8.3f} {b:>8.3f} {b - a:>+8.3f}")
+    lat = report["latency_ms"]
+    print(
+        f"\nMedyan gecikme: fp32={lat['fp32']:.1f} ms  int8={lat['int8']:.1f} ms  "
+        f"hızlanma={lat['fp32'] / max(lat['int8'], 1e-9):.2f}x"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization + FP32 karşılaştırması")
+    parser.add_argument("--model", default=Settings.MODEL_PATH)
+    parser.add_argument("--imgsz", type=int, default=int(Settings.INFERENCE_SIZE))
+    parser.add_argument("--calib", type=int, default=int(Settings.INT8_CALIBRATION_FRAMES))
+    parser.add_argument("--eval", type=int, default=int(Settings.INT8_EVAL_FRAMES))
+    parser.add_argument("--stride", type=int, default=int(Settings.INT8_FRAME_STRIDE))
+    parser.add_argument("--sequence", action="append", default=None, help="Tekrarlanabilir; varsayılan tüm sekanslar")
+    parser.add_argument("--conf", type=float, default=0.05, help="AP için düşük conf (PR eğrisi)")
+    parser.add_argument("--report", default="", help="JSON rapor yolu")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--eval-only", action="store_true")
+    args = parser.parse_args()
+
+    Settings.DEBUG = False
+    from src.inference_engine import OnnxRuntimeEngine
+    from src.quantization import evaluate_precisions, quantize_int8, sample_frames
+
+    if not Path(args.model).is_file():
+        print(f"Model dosyası bulunamadı: {args.model}")
+        return 2
+    stride = max(2, args.stride)
+    if not args.eval_only:
+        calib = sample_frames(args.calib, stride, offset=0, sequences=args.sequence)
+        quantize_int8(
+            args.model, args.imgsz, [s["frame"] for s in calib], force=args.force
+        )
+    # Değerlendirme kareleri kalibrasyon karelerinin arasından (ayrık) seçilir
+    samples = sample_frames(args.eval, stride, offset=stride // 2, sequences=args.sequence)
+    if not samples:
+        print("Değerlendirme karesi bulunamadı (datasets/ boş mu?)")
+        return 2
+
+    engine = OnnxRuntimeEngine(args.model)
+    report = evaluate_precisions(
+        engine, samples, args.imgsz, conf=args.conf, iou=float(Settings.NMS_IOU_THRESHOLD)
+    )
+    from ultralytics import YOLO
+
+    names = {int(k): str(v) for k, v in dict(YOLO(args.model).names).items()}
+    print_report(report, names)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+        print(f"Rapor yazıldı: {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())